@@ -1,3 +1,5 @@
+import os
+import sys
 import asyncio
 import aiohttp
 import time
@@ -8,6 +10,9 @@ from typing import Optional, Dict, Union, List
 from datetime import datetime
 import logging
 from concurrent.futures import ThreadPoolExecutor
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "common"))
+from request_latency import RequestLatencyRecorder
+from connection_warm_up import ConnectionWarmUp
 from urllib.parse import urlencode
 
 # Create a dedicated logger for this module
@@ -19,7 +24,9 @@ console_handler.setFormatter(formatter)
 module_logger.addHandler(console_handler)
 module_logger.propagate = False
 
-class MexcOrderManager:
+class MexcOrderManager(ConnectionWarmUp):
+    # cheap unsigned endpoint used to open and keep connections warm
+    WARM_UP_ENDPOINT = "/api/v3/time"
     def __init__(self, api_key: str, api_secret: str, debug: bool = False):
         """Initialize MEXC trading client with async support"""
         if not all([api_key, api_secret]):
@@ -38,6 +45,11 @@ class MexcOrderManager:
         self.executor = ThreadPoolExecutor(max_workers=4)
         self.session = None
 
+        # keep-alive connection pool, warm_up_connections() before release time
+        self._init_warm_up()
+        # per-endpoint phase histograms (sign, connection, send, ttfb, parse)
+        self.latency = RequestLatencyRecorder()
+
     def _get_formatted_time(self) -> Dict[str, str]:
         """Returns current time in human readable format"""
         now = datetime.now()
@@ -45,12 +57,6 @@ class MexcOrderManager:
             "order_sent_time": now.strftime('%H:%M:%S.%f')[:-3],
         }
 
-    async def _init_session(self):
-        """Initialize aiohttp session"""
-        if self.session is None:
-            timeout = aiohttp.ClientTimeout(total=5)
-            self.session = aiohttp.ClientSession(timeout=timeout)
-
     def _generate_signature(self, params: Dict) -> str:
         """Generate signature for MEXC API"""
         try:
@@ -81,8 +87,10 @@ class MexcOrderManager:
         params['recvWindow'] = '5000'
         
         # Generate signature
+        sign_start = time.perf_counter_ns()
         signature = self._generate_signature(params)
         params['signature'] = signature
+        self.latency.time_phase(endpoint, "sign", sign_start)
         
         url = f"{self.base_url}{endpoint}"
         
@@ -93,7 +101,10 @@ class MexcOrderManager:
                 query_string = urlencode(params)
                 url = f"{url}?{query_string}"
                 async with self.session.get(url, headers=headers) as response:
-                    return await response.json()
+                    parse_start = time.perf_counter_ns()
+                    result = await response.json()
+                    self.latency.time_phase(endpoint, "read_parse", parse_start)
+                    return result
             else:  # POST
                 # For POST requests, send parameters in the request body
                 form_data = aiohttp.FormData()
@@ -102,7 +113,10 @@ class MexcOrderManager:
                 
                 headers["Content-Type"] = "application/x-www-form-urlencoded"
                 async with self.session.post(url, headers=headers, data=form_data) as response:
-                    return await response.json()
+                    parse_start = time.perf_counter_ns()
+                    result = await response.json()
+                    self.latency.time_phase(endpoint, "read_parse", parse_start)
+                    return result
 
         except Exception as e:
             module_logger.error(f"Request error: {str(e)}")
@@ -162,8 +176,16 @@ class MexcOrderManager:
 
     # [Rest of the class methods remain the same...]
 
+    def latency_report(self) -> Dict:
+        """Per-endpoint phase histograms of every request made by this manager"""
+        return self.latency.report()
+
     async def close(self):
         """Close the aiohttp session"""
+        if self.latency.histograms:
+            module_logger.info(f"request latency p50/p99: {self.latency.summary()}")
+        if self._keep_alive_task:
+            self._keep_alive_task.cancel()
         if self.session:
             await self.session.close()
         self.executor.shutdown(wait=False)
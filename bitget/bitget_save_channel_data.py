@@ -1,3 +1,4 @@
+import sys
 import asyncio
 import aiohttp
 import orjson
@@ -7,6 +8,12 @@ from typing import Dict, Any, Optional
 import os
 import json
 import traceback
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "common"))
+from receive_time import stamp
+from stream_writer import StreamingRecordWriter
+from tick_store import TickStoreWriter
+from trade_archive import open_session_writer
+from session_catalog import ChannelSummary, record_capture
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -28,7 +35,11 @@ class Bitget_save_ws_data:
                  duration_minutes: float,
                  saving_path: str,
                  channel: str = "ticker",
-                 pre_release_seconds: int = 30):
+                 pre_release_seconds: int = 30,
+                 tick_store_root: Optional[str] = None,
+                 trade_archive_root: Optional[str] = None,
+                 catalog_path: Optional[str] = None,
+                 tag: Optional[str] = None):
         
         # Basic configuration
         self.symbol = symbol
@@ -44,9 +55,15 @@ class Bitget_save_ws_data:
         
         # Data management
         self.queue = asyncio.Queue()
-        self.stored_data = []
         self.messages_processed = 0
         self.saving_path = saving_path
+        # also write typed columns to the parquet tick store when set
+        self.tick_store_root = tick_store_root
+        # trades also go to a fixed-width memory-mappable session file when set
+        self.trade_archive_root = trade_archive_root
+        # every finished capture is added to this SQLite session catalog when set
+        self.catalog_path = catalog_path
+        self.tag = tag
         
         # Timing control
         self.release_time = release_time
@@ -176,9 +193,8 @@ class Bitget_save_ws_data:
                         continue
                     
                     if 'data' in data:
-                        precise_time = datetime.now()
-                        processed_data = data['data'][0]  # BitGet sends array of data
-                        processed_data['time_received'] = self.get_formatted_time(precise_time)
+                        # BitGet sends array of data, integer receive time is formatted at export
+                        processed_data = stamp(data['data'][0])
                         
                         await self.queue.put(processed_data)
                         self.messages_processed += 1
@@ -210,38 +226,78 @@ class Bitget_save_ws_data:
 
 
 
-    async def process_for_saving(self):
-        """Process and save data to a list with optimized batch processing"""
-        batch = []
-        batch_size = 100
+    def capture_path(self, saving_path: str) -> str:
+        saving_dir = f"{self.release_time.strftime('%Y-%m-%d_%H-%M')}_{self.symbol}"
+        return os.path.join(saving_path, saving_dir, f"{self.symbol}_{self.channel}_data.ndjson")
+
+    def capture_header(self) -> Dict[str, Any]:
+        return {
+            "symbol": self.symbol,
+            "channel": self.channel,
+            "start_time": self.get_formatted_time(self.start_time),
+            "release_time": self.get_formatted_time(self.release_time),
+            "end_time": self.get_formatted_time(self.end_time)
+        }
 
+    def open_writer(self, saving_path: str) -> StreamingRecordWriter:
+        sinks = []
+        if self.tick_store_root:
+            sinks.append(TickStoreWriter(self.tick_store_root, "bitget", self.symbol, self.channel, self.release_time))
+        if self.trade_archive_root and self.channel == self.CHANNEL_TRADE:
+            sinks.append(open_session_writer(self.trade_archive_root, "bitget", self.symbol, self.release_time))
+        if self.catalog_path:
+            sinks.append(ChannelSummary(self.release_time))
+        return StreamingRecordWriter(self.capture_path(saving_path), self.capture_header(), sinks=sinks)
+
+    async def process_for_saving(self):
+        """Stream messages to the capture file as they arrive, memory stays flat"""
+        writer = None
         try:
-            while datetime.now() <= self.end_time:
+            writer = self.open_writer(self.saving_path)
+            while datetime.now() <= self.end_time or not self.queue.empty():
                 try:
                     data = await asyncio.wait_for(self.queue.get(), timeout=1.0)
-                    batch.append(data)
-
-                    if len(batch) >= batch_size:
-                        self.stored_data.extend(batch)
-                        batch.clear()
+                    await writer.write(data)
                         
                 except asyncio.TimeoutError:
+                    # quiet market: push what we have to disk
+                    await writer.flush()
                     if self.collection_ended and self.queue.empty():
                         break
                     continue
                 
-            # Process remaining batch
-            if batch:
-                self.stored_data.extend(batch)
-                
-            logger.info(f"Total messages processed and stored: {len(self.stored_data)}")
+            logger.info(f"Total messages processed and stored: {writer.records}")
             
         except Exception as e:
             logger.error(f"Error in data processing: {e}")
         finally:
-            await self.save_data(self.saving_path)
+            if writer is not None:
+                try:
+                    await self.close_writer(writer)
+                except Exception as e:
+                    logger.error(f"Error closing capture file: {e}")
+                    traceback.print_exc()
             await self.cleanup()
 
+    async def close_writer(self, writer: StreamingRecordWriter):
+        """Close the capture with the final snapshot as footer, then catalog it"""
+        final_snapshot = None
+        try:
+            final_snapshot = await self.get_final_snapshot(self.symbol)
+        except Exception as e:
+            logger.error(f"Error getting final snapshot for {self.symbol}: {e}")
+        finally:
+            # the footer and the sinks' closing (parquet footer) must happen whatever the REST call did
+            await writer.close({"final_snapshot": final_snapshot})
+        if not self.catalog_path:
+            return
+        try:
+            await asyncio.get_running_loop().run_in_executor(
+                None, record_capture, self.catalog_path, "bitget", self.symbol, self.channel,
+                self.release_time, self.tag, writer, final_snapshot)
+        except Exception as e:
+            logger.error(f"Error adding {writer.path} to the session catalog: {e}")
+
     async def get_final_snapshot(self, symbol: str):
         """Get final market snapshot from BitGet REST API"""
         api_url = f"https://api.bitget.com/api/v2/spot/market/tickers?symbol={symbol}USDT"
@@ -265,41 +321,6 @@ class Bitget_save_ws_data:
                     logger.error(f"Failed to get snapshot for {symbol}: {response.status}")
                     return None
 
-    async def save_data(self, saving_path: str):
-        """Save the stored data with timing information"""
-        try:
-            saving_dir = f"{self.release_time.strftime('%Y-%m-%d_%H-%M')}_{self.symbol}"
-            full_path = os.path.join(saving_path, saving_dir)
-            os.makedirs(full_path, exist_ok=True)
-
-            filename = os.path.join(full_path, f"{self.symbol}_{self.channel}_data.json")
-            
-            metadata = {
-                "symbol": self.symbol,
-                "channel": self.channel,
-                "start_time": self.get_formatted_time(self.start_time),
-                "release_time": self.get_formatted_time(self.release_time),
-                "end_time": self.get_formatted_time(self.end_time),
-                "total_messages": len(self.stored_data),
-                "final_snapshot": await self.get_final_snapshot(self.symbol)
-            }
-            
-            save_data = {
-                "metadata": metadata,
-                "data": self.stored_data
-            }
-
-            with open(filename, "w") as f:
-                json.dump(save_data, f, indent=2)
-            
-            logger.info(f"Data saved successfully to: {filename}")
-            logger.info(f"Total messages saved: {len(self.stored_data)}")
-            
-        except Exception as e:
-            logger.error(f"Error saving data: {e}")
-            traceback.print_exc()
-
-
     async def cleanup(self):
         """Clean up resources"""
         self.is_running = False
@@ -8,6 +8,8 @@ import traceback
 from datetime import datetime, timedelta
 
 from bitget_websocket_V3 import BitgetWebsocketListen
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "common"))
+from session_catalog import index_archive
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -32,6 +34,7 @@ async def main():
         testing_time_offset = 2  # Time offset for testing
         path_to_save = '/root/trading_systems/bitget/bitget_data_collection_NEW'
         time_span_for_saving = 60  # Time span for saving data after release
+        catalog_path = '/root/trading_systems/sessions.db'  # SQLite index of every recorded session
 
 
         if not testing:
@@ -88,6 +91,13 @@ async def main():
                                 ws_depth.save_data(path_to_save, release_date_time)
                             )
 
+                            # Catalog the new captures, already indexed ones are skipped
+                            try:
+                                await asyncio.get_running_loop().run_in_executor(
+                                    None, index_archive, catalog_path, path_to_save, "bitget", new_pair_dict.get('tag'))
+                            except Exception as e:
+                                logger.error(f"Error updating the session catalog: {e}")
+
                             # Cleanup
                             await asyncio.gather(
                                 ws_trade.cleanup(), 
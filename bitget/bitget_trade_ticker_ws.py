@@ -127,6 +127,8 @@ async def main():
                         # Create object to retrieve price data
                         symbol = basecoin
                         ws = Bitget_websocket_collection()
+                        # open keep-alive sockets to the REST host so the first order skips DNS/TCP/TLS setup
+                        await strategy.trading_client.warm_up_connections()
 
                         # Returns the highest price at release time
                         ws_data = await ws.get_price_by_release_time_ticker(
@@ -134,6 +136,7 @@ async def main():
                             max_wait_time=1,
                             release_time=release_date_time
                         )
+                        strategy.trading_client.stop_keep_alive()
                         if ws_data:
                             logger.debug(f"Successfully retrieved {symbol} data: {ws_data}")
                             retrieved_price = ws_data['bidPr'] if ws_data['bidPr'] else ws_data['askPr']
@@ -170,6 +173,7 @@ async def main():
                         traceback.print_exc()
 
                     finally:
+                        logger.info(f"connection reuse {symbol}: {strategy.trading_client.connection_report()}")
                         await ws.cleanup()
                         await strategy.close_client()
                     logger.info('Breaking loop after processing pair')
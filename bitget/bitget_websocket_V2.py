@@ -1,3 +1,5 @@
+import os
+import sys
 import aiohttp
 import asyncio
 import time
@@ -10,6 +12,8 @@ import traceback
 import base64
 import hmac
 import hashlib
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "common"))
+from exchange_clock import ExchangeClock
 
 logging.basicConfig(
     level=logging.INFO,
@@ -38,6 +42,7 @@ class Bitget_websocket_collection:
         self.ws_connection = None
         self.ws_session = None
         self.ping_task = None
+        self.clock = ExchangeClock("bitget")
 
     def _generate_signature(self, timestamp: str) -> str:
         """
@@ -191,19 +196,15 @@ class Bitget_websocket_collection:
                     pass
 
     async def wait_until_listing(self, release_time: datetime):
-        initiation_time_print_flag = False
-        while True:
-            time_waiting_in_seconds = (release_time - datetime.now()).total_seconds()
-
-            if 25 < time_waiting_in_seconds > 0:
-                if not initiation_time_print_flag:
-                    initiation_time_print_flag = True
-                    logger.info(f'Waiting {time_waiting_in_seconds:.2f} seconds until token release time')
-                await asyncio.sleep(5)
-
-            if 25 > time_waiting_in_seconds > 0:
-                logger.info('25 seconds left until token release')
-                break
+        """Sync to the exchange clock and sleep until 25 seconds before release (exchange time)"""
+        await self.clock.sync()
+        time_waiting_in_seconds = self.clock.seconds_until(release_time)
+        if time_waiting_in_seconds > 25:
+            logger.info(f'Waiting {time_waiting_in_seconds:.2f} seconds until token release time')
+            await self.clock.wait_until(release_time - timedelta(seconds=25), label='T-25s')
+            # re-measure the offset close to release, drift over a long wait is not negligible
+            await self.clock.sync(samples=5)
+        logger.info('25 seconds left until token release')
 
 
     async def get_price_by_release_time_ticker(self, symbol: str, max_wait_time: int = 1, release_time: datetime = None) -> Optional[float]:
@@ -226,8 +227,7 @@ class Bitget_websocket_collection:
         end_time = release_time + timedelta(seconds=max_wait_time)
         await self.wait_until_listing(release_time)
 
-        while datetime.now() < release_time:
-            await asyncio.sleep(0.0001)
+        await self.clock.wait_until(release_time)
 
         try:
             async for msg in self.ws_connection:
@@ -291,8 +291,7 @@ class Bitget_websocket_collection:
         end_time = release_time + timedelta(seconds=max_wait_time)
         await self.wait_until_listing(release_time)
 
-        while datetime.now() < release_time:
-            await asyncio.sleep(0.0001)
+        await self.clock.wait_until(release_time)
 
         try:
             async for msg in self.ws_connection:
@@ -357,8 +356,7 @@ class Bitget_websocket_collection:
         end_time = release_time + timedelta(seconds=max_wait_time)
         await self.wait_until_listing(release_time)
 
-        while datetime.now() < release_time:
-            await asyncio.sleep(0.0001)
+        await self.clock.wait_until(release_time)
 
         try:
             async for msg in self.ws_connection:
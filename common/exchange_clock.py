@@ -0,0 +1,152 @@
+import os
+import asyncio
+import aiohttp
+import orjson
+import logging
+import statistics
+import time
+from datetime import datetime
+from typing import Dict, Any, Optional
+
+# Configure logging
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+console_handler = logging.StreamHandler()
+formatter = logging.Formatter('%(asctime)s.%(msecs)03d - %(levelname)s - %(message)s - %(funcName)s', datefmt='%H:%M:%S')
+console_handler.setFormatter(formatter)
+logger.addHandler(console_handler)
+logger.propagate = False
+
+# same override as kucoin_dir/kucoin_endpoints.py, e.g. to sync against the mock exchange
+KUCOIN_API_URL = os.environ.get("KUCOIN_API_URL", "https://api.kucoin.com").rstrip('/')
+
+# server time endpoint and a parser returning server epoch milliseconds
+SERVER_TIME_ENDPOINTS = {
+    "kucoin": (f"{KUCOIN_API_URL}/api/v1/timestamp", lambda data: int(data['data'])),
+    "bitget": ("https://api.bitget.com/api/v2/public/time", lambda data: int(data['data']['serverTime'])),
+    "mexc": ("https://api.mexc.com/api/v3/time", lambda data: int(data['serverTime'])),
+    "gateio": ("https://api.gateio.ws/api/v4/spot/time", lambda data: int(data['server_time'])),
+}
+
+
+class ExchangeClock:
+    """
+    Offset between the local clock and an exchange's server clock.
+
+    sync() probes the server time endpoint repeatedly and keeps the probes
+    with the lowest round trip (NTP-style min-RTT filter): for those the
+    server timestamp is assumed to be taken at the midpoint of the request.
+    wait_until() fires at a release instant given in exchange time using a
+    coarse asyncio sleep followed by a short spin on time.monotonic_ns().
+    """
+
+    def __init__(self, exchange: str, samples: int = 15, best_samples: int = 3,
+                 spin_window_ms: float = 5.0):
+        if exchange not in SERVER_TIME_ENDPOINTS:
+            raise ValueError(f"Unknown exchange for server time: {exchange}")
+        self.exchange = exchange
+        self.samples = samples
+        self.best_samples = best_samples
+        self.spin_window_ns = int(spin_window_ms * 1_000_000)
+
+        self.offset_ns = 0          # server time - local time
+        self.rtt_ns = None          # round trip of the best probe
+        self.synced = False
+        self.last_sync = None
+        self.trigger_log = []
+
+    async def _probe(self, session: aiohttp.ClientSession, url: str, parse) -> tuple:
+        """One server time probe, returns (offset_ns, rtt_ns)"""
+        wall_start = time.time_ns()
+        mono_start = time.monotonic_ns()
+        async with session.get(url) as response:
+            data = await response.json(loads=orjson.loads)
+        rtt_ns = time.monotonic_ns() - mono_start
+        server_ns = parse(data) * 1_000_000
+        # server ms timestamps truncate, centre them in their millisecond
+        midpoint_ns = wall_start + rtt_ns // 2
+        return server_ns + 500_000 - midpoint_ns, rtt_ns
+
+    async def sync(self, samples: Optional[int] = None) -> Dict[str, Any]:
+        """Estimate the clock offset from repeated probes, keeping the lowest round trips"""
+        url, parse = SERVER_TIME_ENDPOINTS[self.exchange]
+        samples = samples or self.samples
+        probes = []
+        try:
+            async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=5)) as session:
+                # first probe pays DNS/TCP/TLS setup and is discarded
+                await self._probe(session, url, parse)
+                for _ in range(samples):
+                    try:
+                        probes.append(await self._probe(session, url, parse))
+                    except Exception as e:
+                        logger.warning(f"{self.exchange} time probe failed: {e}")
+                    await asyncio.sleep(0.05)
+        except Exception as e:
+            logger.error(f"{self.exchange} clock sync failed, keeping offset {self.offset_ns / 1e6:.3f}ms: {e}")
+            return self.status()
+
+        if probes:
+            best = sorted(probes, key=lambda probe: probe[1])[:self.best_samples]
+            self.offset_ns = int(statistics.median(offset for offset, _ in best))
+            self.rtt_ns = best[0][1]
+            self.synced = True
+            self.last_sync = datetime.now()
+        status = self.status()
+        logger.info(f"{self.exchange} clock offset {status['offset_ms']}ms "
+                    f"(+/- {status['uncertainty_ms']}ms, best rtt {status['best_rtt_ms']}ms, {len(probes)} probes)")
+        return status
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "exchange": self.exchange,
+            "synced": self.synced,
+            "offset_ms": round(self.offset_ns / 1e6, 3),
+            "best_rtt_ms": round(self.rtt_ns / 1e6, 3) if self.rtt_ns else None,
+            # half the best round trip plus the server's 1ms resolution
+            "uncertainty_ms": round(self.rtt_ns / 2e6 + 0.5, 3) if self.rtt_ns else None,
+        }
+
+    def server_time_ns(self) -> int:
+        """Current exchange time in epoch nanoseconds"""
+        return time.time_ns() + self.offset_ns
+
+    def monotonic_deadline_ns(self, release_time: datetime) -> int:
+        """time.monotonic_ns() value at which the exchange clock reaches release_time"""
+        release_server_ns = int(release_time.timestamp() * 1_000_000) * 1000
+        return time.monotonic_ns() + (release_server_ns - self.server_time_ns())
+
+    def seconds_until(self, release_time: datetime) -> float:
+        return (self.monotonic_deadline_ns(release_time) - time.monotonic_ns()) / 1e9
+
+    async def wait_until(self, release_time: datetime, label: str = "release") -> Dict[str, Any]:
+        """
+        Sleep until release_time on the exchange clock.
+        Coarse asyncio sleeps cover all but the last spin window, which is spun on
+        the monotonic clock while still yielding to the event loop.
+        Returns the achieved trigger error.
+        """
+        deadline_ns = self.monotonic_deadline_ns(release_time)
+        while True:
+            remaining_ns = deadline_ns - time.monotonic_ns()
+            if remaining_ns <= self.spin_window_ns:
+                break
+            # sleep overshoots by up to a scheduler tick, re-evaluate in shrinking steps
+            await asyncio.sleep(max((remaining_ns - self.spin_window_ns) / 1e9 * 0.9, 0.0005))
+
+        while time.monotonic_ns() < deadline_ns:
+            await asyncio.sleep(0)
+
+        fired_ns = time.monotonic_ns()
+        result = {
+            "label": label,
+            "exchange": self.exchange,
+            "target": release_time.strftime('%H:%M:%S.%f'),
+            "trigger_error_us": round((fired_ns - deadline_ns) / 1000, 1),
+            "offset_ms": round(self.offset_ns / 1e6, 3),
+            "synced": self.synced
+        }
+        self.trigger_log.append(result)
+        logger.info(f"{label} trigger fired {result['trigger_error_us']}us after target "
+                    f"(clock offset {result['offset_ms']}ms)")
+        return result
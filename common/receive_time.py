@@ -0,0 +1,91 @@
+import time
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+# Receive timestamps are captured as integers on the hot path:
+#   time_received_ns       wall clock, time.time_ns()
+#   time_received_mono_ns  time.monotonic_ns(), for latency maths within one process
+# The legacy 'HH:MM:SS.ffff' string in 'time_received' is only produced at export.
+
+TIME_RECEIVED_NS = 'time_received_ns'
+TIME_RECEIVED_MONO_NS = 'time_received_mono_ns'
+TIME_RECEIVED = 'time_received'
+
+
+def stamp(message: Dict[str, Any]) -> Dict[str, Any]:
+    """Attach integer receive timestamps to a message, returns the message"""
+    message[TIME_RECEIVED_NS] = time.time_ns()
+    message[TIME_RECEIVED_MONO_NS] = time.monotonic_ns()
+    return message
+
+
+def format_ns(timestamp_ns: int, digits: int = 4) -> str:
+    """Epoch ns as local 'HH:MM:SS.f' with `digits` fractional digits (the old time_received format)"""
+    dt = datetime.fromtimestamp(timestamp_ns // 1_000_000_000)
+    microseconds = (timestamp_ns // 1000) % 1_000_000
+    return f"{dt.strftime('%H:%M:%S')}.{microseconds:06d}"[:9 + digits]
+
+
+def time_received(entry: Dict[str, Any], digits: int = 4) -> str:
+    """Compatibility view of the old time_received string, for new and legacy entries"""
+    timestamp_ns = entry.get(TIME_RECEIVED_NS)
+    if timestamp_ns is not None:
+        return format_ns(timestamp_ns, digits)
+    return entry.get(TIME_RECEIVED)
+
+
+def received_datetime(entry: Dict[str, Any], date: Optional[str] = None) -> datetime:
+    """
+    Receive time as local datetime. Legacy entries only carry the time of day and are
+    placed on date ('YYYY-MM-DD', the release date of the capture), on 1900-01-01 without it.
+    """
+    timestamp_ns = entry.get(TIME_RECEIVED_NS)
+    if timestamp_ns is not None:
+        return datetime.fromtimestamp(timestamp_ns // 1_000_000_000).replace(
+            microsecond=(timestamp_ns // 1000) % 1_000_000)
+    if date:
+        return datetime.strptime(f"{date} {entry[TIME_RECEIVED]}", '%Y-%m-%d %H:%M:%S.%f')
+    return datetime.strptime(entry[TIME_RECEIVED], '%H:%M:%S.%f')
+
+
+def received_seconds_of_day(entry: Dict[str, Any]) -> float:
+    """Local seconds since midnight of the receive time, comparable across old and new files"""
+    dt = received_datetime(entry)
+    return dt.hour * 3600 + dt.minute * 60 + dt.second + dt.microsecond / 1e6
+
+
+def received_ns(entry: Dict[str, Any], date: str) -> Optional[int]:
+    """Receive time as epoch ns; legacy 'HH:MM:SS.ffff' strings (time_data_received on bitget) are placed on date"""
+    timestamp_ns = entry.get(TIME_RECEIVED_NS)
+    if timestamp_ns is not None:
+        return timestamp_ns
+    time_of_day = entry.get(TIME_RECEIVED) or entry.get('time_data_received')
+    if not time_of_day:
+        return None
+    hours, minutes, seconds = time_of_day.split(':')
+    whole, _, fraction = seconds.partition('.')
+    midnight = int(datetime.strptime(date, '%Y-%m-%d').timestamp())
+    return (midnight + int(hours) * 3600 + int(minutes) * 60 + int(whole)) * 1_000_000_000 \
+        + int((fraction + '000000000')[:9])
+
+
+def add_time_received(entries: List[Dict[str, Any]], digits: int = 4) -> List[Dict[str, Any]]:
+    """Fill the legacy time_received string from the ns timestamp before export, in place"""
+    for entry in entries:
+        timestamp_ns = entry.get(TIME_RECEIVED_NS)
+        if timestamp_ns is not None and TIME_RECEIVED not in entry:
+            entry[TIME_RECEIVED] = format_ns(timestamp_ns, digits)
+    return entries
+
+
+def select_fields(message: Dict[str, Any], keys: List[str], digits: int = 3) -> Dict[str, Any]:
+    """Pick keys from a message, 'time_received' is resolved through the compatibility view"""
+    selected = {}
+    for key in keys:
+        if key == TIME_RECEIVED:
+            selected[TIME_RECEIVED] = time_received(message, digits)
+            if TIME_RECEIVED_NS in message:
+                selected[TIME_RECEIVED_NS] = message[TIME_RECEIVED_NS]
+        else:
+            selected[key] = message[key]
+    return selected
@@ -0,0 +1,177 @@
+import re
+import time
+import aiohttp
+from typing import Dict, Any, Optional
+
+# path segments that are order ids / client oids, folded so each endpoint gets one histogram
+_ID_SEGMENT = re.compile(r'/(?=[0-9a-fA-F-]*\d)[0-9a-fA-F-]{8,}(?=/|$)')
+
+# request phases in the order they happen
+PHASES = ("sign", "pool_wait", "dns", "connect", "send", "ttfb", "read_parse", "total")
+
+
+def endpoint_label(path: str) -> str:
+    """Endpoint path without query string and with ids replaced by {id}"""
+    return _ID_SEGMENT.sub('/{id}', path.split('?', 1)[0])
+
+
+class LatencyHistogram:
+    """
+    HDR-style histogram of durations in microseconds.
+
+    Values below 2**SUB_BITS are stored exactly, larger values keep their top
+    SUB_BITS bits, so every bucket has the same relative width (< 1%) and
+    recording is O(1) regardless of the range.
+    """
+    SUB_BITS = 7
+
+    def __init__(self):
+        self.counts: Dict[int, int] = {}
+        self.count = 0
+        self.total_us = 0
+        self.min_us = None
+        self.max_us = 0
+
+    def record(self, value_us: int):
+        value_us = max(int(value_us), 0)
+        shift = value_us.bit_length() - self.SUB_BITS
+        bucket = (value_us >> shift) << shift if shift > 0 else value_us
+        self.counts[bucket] = self.counts.get(bucket, 0) + 1
+        self.count += 1
+        self.total_us += value_us
+        if self.min_us is None or value_us < self.min_us:
+            self.min_us = value_us
+        if value_us > self.max_us:
+            self.max_us = value_us
+
+    def _bucket_mid(self, bucket: int) -> float:
+        shift = bucket.bit_length() - self.SUB_BITS
+        return bucket + ((1 << shift) - 1) / 2 if shift > 0 else bucket
+
+    def percentile(self, percent: float) -> Optional[float]:
+        if not self.count:
+            return None
+        rank = max(1, int(round(percent / 100 * self.count)))
+        seen = 0
+        for bucket in sorted(self.counts):
+            seen += self.counts[bucket]
+            if seen >= rank:
+                return min(self._bucket_mid(bucket), self.max_us)
+        return float(self.max_us)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "min_us": self.min_us,
+            "p50_us": self.percentile(50),
+            "p90_us": self.percentile(90),
+            "p99_us": self.percentile(99),
+            "p999_us": self.percentile(99.9),
+            "max_us": self.max_us,
+            "mean_us": round(self.total_us / self.count, 1) if self.count else None,
+            # [bucket lower bound, count], enough to merge histograms across runs
+            "buckets": sorted(self.counts.items())
+        }
+
+
+class RequestLatencyRecorder:
+    """
+    Per-endpoint, per-phase latency histograms for one aiohttp session.
+
+    Network phases come from aiohttp TraceConfig hooks:
+      pool_wait  waiting for a free connection in the connector
+      dns/connect  only when a new socket is opened
+      send  connection ready -> request headers written
+      ttfb  headers written -> response headers received (server processing + RTT)
+      total  request start -> response headers received
+    Order managers add sign (HMAC + headers) and read_parse (body + JSON) around the call.
+    """
+
+    def __init__(self):
+        self.histograms: Dict[str, Dict[str, LatencyHistogram]] = {}
+        self.errors: Dict[str, int] = {}
+
+    def record(self, endpoint: str, phase: str, duration_ns: int):
+        phases = self.histograms.get(endpoint)
+        if phases is None:
+            phases = self.histograms[endpoint] = {}
+        histogram = phases.get(phase)
+        if histogram is None:
+            histogram = phases[phase] = LatencyHistogram()
+        histogram.record(duration_ns // 1000)
+
+    def time_phase(self, endpoint: str, phase: str, start_ns: int):
+        """Record a phase that started at start_ns (time.perf_counter_ns) and ends now"""
+        self.record(endpoint_label(endpoint), phase, time.perf_counter_ns() - start_ns)
+
+    def trace_config(self) -> aiohttp.TraceConfig:
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_request_start.append(self._on_request_start)
+        trace_config.on_connection_queued_start.append(self._on_queued_start)
+        trace_config.on_connection_queued_end.append(self._on_queued_end)
+        trace_config.on_dns_resolvehost_start.append(self._on_dns_start)
+        trace_config.on_dns_resolvehost_end.append(self._on_dns_end)
+        trace_config.on_connection_create_start.append(self._on_connect_start)
+        trace_config.on_connection_create_end.append(self._on_connection_ready)
+        trace_config.on_connection_reuseconn.append(self._on_connection_ready)
+        trace_config.on_request_headers_sent.append(self._on_headers_sent)
+        trace_config.on_request_end.append(self._on_request_end)
+        trace_config.on_request_exception.append(self._on_request_exception)
+        return trace_config
+
+    async def _on_request_start(self, session, ctx, params):
+        ctx.start_ns = time.perf_counter_ns()
+        ctx.endpoint = endpoint_label(params.url.path)
+        ctx.ready_ns = None
+        ctx.sent_ns = None
+
+    async def _on_queued_start(self, session, ctx, params):
+        ctx.queued_ns = time.perf_counter_ns()
+
+    async def _on_queued_end(self, session, ctx, params):
+        self.record(ctx.endpoint, "pool_wait", time.perf_counter_ns() - ctx.queued_ns)
+
+    async def _on_dns_start(self, session, ctx, params):
+        ctx.dns_ns = time.perf_counter_ns()
+
+    async def _on_dns_end(self, session, ctx, params):
+        self.record(ctx.endpoint, "dns", time.perf_counter_ns() - ctx.dns_ns)
+
+    async def _on_connect_start(self, session, ctx, params):
+        ctx.connect_ns = time.perf_counter_ns()
+
+    async def _on_connection_ready(self, session, ctx, params):
+        ctx.ready_ns = time.perf_counter_ns()
+        if hasattr(ctx, 'connect_ns'):
+            self.record(ctx.endpoint, "connect", ctx.ready_ns - ctx.connect_ns)
+
+    async def _on_headers_sent(self, session, ctx, params):
+        ctx.sent_ns = time.perf_counter_ns()
+        self.record(ctx.endpoint, "send", ctx.sent_ns - (ctx.ready_ns or ctx.start_ns))
+
+    async def _on_request_end(self, session, ctx, params):
+        end_ns = time.perf_counter_ns()
+        self.record(ctx.endpoint, "ttfb", end_ns - (ctx.sent_ns or ctx.ready_ns or ctx.start_ns))
+        self.record(ctx.endpoint, "total", end_ns - ctx.start_ns)
+
+    async def _on_request_exception(self, session, ctx, params):
+        self.errors[ctx.endpoint] = self.errors.get(ctx.endpoint, 0) + 1
+
+    def report(self) -> Dict[str, Any]:
+        """Histogram summaries per endpoint and phase, JSON serialisable"""
+        return {
+            endpoint: {
+                **{phase: histogram.to_dict() for phase, histogram in
+                   sorted(self.histograms.get(endpoint, {}).items(), key=lambda item: PHASES.index(item[0]))},
+                "errors": self.errors.get(endpoint, 0)
+            }
+            for endpoint in {**self.histograms, **self.errors}
+        }
+
+    def summary(self) -> Dict[str, Dict[str, Optional[float]]]:
+        """p50/p99 per endpoint and phase, short enough for a log line"""
+        return {
+            endpoint: {f"{phase}_p50/p99_us": (phases[phase].percentile(50), phases[phase].percentile(99))
+                       for phase in PHASES if phase in phases}
+            for endpoint, phases in self.histograms.items()
+        }
@@ -0,0 +1,290 @@
+import logging
+import os
+import re
+import sqlite3
+import sys
+import time
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+import orjson
+from stream_writer import open_capture
+from receive_time import received_ns
+
+# Configure logging
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+console_handler = logging.StreamHandler()
+formatter = logging.Formatter('%(asctime)s.%(msecs)03d - %(levelname)s - %(message)s - %(funcName)s', datefmt='%H:%M:%S')
+console_handler.setFormatter(formatter)
+logger.addHandler(console_handler)
+logger.propagate = False
+
+TAG_INITIAL_LISTING = "initial_listing"
+TAG_RELISTING = "relisting"
+
+# one row per release, one row per recorded channel of it
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id TEXT PRIMARY KEY,
+    exchange TEXT NOT NULL,
+    symbol TEXT NOT NULL,
+    tag TEXT,
+    release_time TEXT NOT NULL,
+    release_time_ns INTEGER NOT NULL,
+    directory TEXT,
+    updated_at TEXT
+);
+CREATE TABLE IF NOT EXISTS channels (
+    session_id TEXT NOT NULL REFERENCES sessions(session_id),
+    channel TEXT NOT NULL,
+    path TEXT,
+    tick_store_path TEXT,
+    trade_archive_path TEXT,
+    file_bytes INTEGER,
+    file_mtime_ns INTEGER,
+    messages INTEGER,
+    messages_first_minute INTEGER,
+    first_received_ns INTEGER,
+    last_received_ns INTEGER,
+    first_message_latency_ms REAL,
+    final_time TEXT,
+    price_high REAL,
+    price_last REAL,
+    price_low REAL,
+    price_avg REAL,
+    vol_value_usdt REAL,
+    final_snapshot TEXT,
+    PRIMARY KEY (session_id, channel)
+);
+CREATE INDEX IF NOT EXISTS sessions_tag_release ON sessions(tag, release_time_ns);
+CREATE INDEX IF NOT EXISTS sessions_symbol ON sessions(symbol);
+CREATE INDEX IF NOT EXISTS channels_first_minute ON channels(channel, messages_first_minute);
+"""
+
+_RELEASE_DIR = re.compile(r'^(\d{4}-\d{2}-\d{2})_(\d{2}-\d{2})_(.+)$')
+
+
+def session_id(exchange: str, symbol: str, release_time: datetime) -> str:
+    """'kucoin:2024-11-25_10-00_RWA', the release folder name prefixed with the exchange"""
+    return f"{exchange}:{release_time.strftime('%Y-%m-%d_%H-%M')}_{symbol}"
+
+
+def _float(value) -> Optional[float]:
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+class ChannelSummary:
+    """
+    Message counts and first-message latency of one channel capture.
+
+    Has the sink interface of StreamingRecordWriter (write_records/close),
+    so a collector gets its catalog numbers on the writer thread.
+    """
+
+    def __init__(self, release_time: datetime, first_window_seconds: float = 60):
+        self.date = release_time.strftime('%Y-%m-%d')
+        self.release_ns = int(release_time.timestamp() * 1e9)
+        self.window_end_ns = self.release_ns + int(first_window_seconds * 1e9)
+        self.messages = 0
+        self.messages_first_minute = 0
+        self.first_received_ns: Optional[int] = None
+        self.last_received_ns: Optional[int] = None
+        # first message received at or after the release
+        self.first_after_release_ns: Optional[int] = None
+
+    def write_records(self, entries: List[Dict[str, Any]]):
+        for entry in entries:
+            self.messages += 1
+            received = received_ns(entry, self.date)
+            if received is None:
+                continue
+            if self.first_received_ns is None:
+                self.first_received_ns = received
+            self.last_received_ns = received
+            if received >= self.release_ns:
+                if self.first_after_release_ns is None:
+                    self.first_after_release_ns = received
+                if received < self.window_end_ns:
+                    self.messages_first_minute += 1
+
+    def close(self):
+        pass
+
+    def to_dict(self) -> Dict[str, Any]:
+        latency = None
+        if self.first_after_release_ns is not None:
+            latency = round((self.first_after_release_ns - self.release_ns) / 1e6, 3)
+        return {
+            "messages": self.messages,
+            "messages_first_minute": self.messages_first_minute,
+            "first_received_ns": self.first_received_ns,
+            "last_received_ns": self.last_received_ns,
+            "first_message_latency_ms": latency
+        }
+
+
+class SessionCatalog:
+    """
+    SQLite index of every recorded session, written by the collectors and by index_archive().
+
+    Lookups go through indexed columns instead of listing release folders
+    and opening each capture for its metadata:
+        catalog = SessionCatalog("/root/trading_systems/sessions.db")
+        catalog.find(tag="initial_listing", channel="match", min_first_minute=5000)
+    WAL mode lets several collector processes write while analyses read.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.connection = sqlite3.connect(path, timeout=30)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def record_channel(self, exchange: str, symbol: str, channel: str, release_time: datetime,
+                       tag: Optional[str], summary: Dict[str, Any],
+                       final_snapshot: Optional[Dict[str, Any]] = None,
+                       paths: Optional[Dict[str, str]] = None, commit: bool = True) -> str:
+        """Insert or replace the session and channel rows of one capture, returns the session id"""
+        paths = paths or {}
+        capture_path = paths.get("capture")
+        file_stat = os.stat(capture_path) if capture_path and os.path.exists(capture_path) else None
+        final_snapshot = final_snapshot or {}
+        sid = session_id(exchange, symbol, release_time)
+
+        self.connection.execute(
+            "INSERT INTO sessions (session_id, exchange, symbol, tag, release_time, release_time_ns, directory, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(session_id) DO UPDATE SET tag = COALESCE(excluded.tag, tag), "
+            "directory = COALESCE(excluded.directory, directory), updated_at = excluded.updated_at",
+            (sid, exchange, symbol, tag, release_time.strftime('%Y-%m-%d %H:%M:%S'),
+             int(release_time.timestamp() * 1e9),
+             os.path.dirname(capture_path) if capture_path else None,
+             datetime.now().strftime('%Y-%m-%d %H:%M:%S')))
+        self.connection.execute(
+            "INSERT OR REPLACE INTO channels VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (sid, channel, capture_path, paths.get("tick_store"), paths.get("trade_archive"),
+             file_stat.st_size if file_stat else None, file_stat.st_mtime_ns if file_stat else None,
+             summary.get("messages"), summary.get("messages_first_minute"),
+             summary.get("first_received_ns"), summary.get("last_received_ns"),
+             summary.get("first_message_latency_ms"),
+             final_snapshot.get("time"), _float(final_snapshot.get("price_high")),
+             _float(final_snapshot.get("price_last")), _float(final_snapshot.get("price_low")),
+             _float(final_snapshot.get("price_avg")), _float(final_snapshot.get("volValue_USDT")),
+             orjson.dumps(final_snapshot).decode() if final_snapshot else None))
+        if commit:
+            self.connection.commit()
+        return sid
+
+    def is_current(self, capture_path: str) -> bool:
+        """True if capture_path is catalogued with its current size and mtime"""
+        row = self.connection.execute("SELECT file_bytes, file_mtime_ns FROM channels WHERE path = ?",
+                                      (capture_path,)).fetchone()
+        if row is None:
+            return False
+        file_stat = os.stat(capture_path)
+        return row["file_bytes"] == file_stat.st_size and row["file_mtime_ns"] == file_stat.st_mtime_ns
+
+    def query(self, sql: str, params: tuple = ()) -> List[Dict[str, Any]]:
+        return [dict(row) for row in self.connection.execute(sql, params)]
+
+    def find(self, exchange: Optional[str] = None, tag: Optional[str] = None, symbol: Optional[str] = None,
+             channel: Optional[str] = None, min_messages: Optional[int] = None,
+             min_first_minute: Optional[int] = None, since: Optional[datetime] = None,
+             until: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """Channel rows joined with their session, filtered on the indexed columns, newest release first"""
+        conditions, params = [], []
+        for column, value in (("s.exchange", exchange), ("s.tag", tag), ("s.symbol", symbol),
+                              ("c.channel", channel)):
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                params.append(value)
+        if min_messages is not None:
+            conditions.append("c.messages >= ?")
+            params.append(min_messages)
+        if min_first_minute is not None:
+            conditions.append("c.messages_first_minute >= ?")
+            params.append(min_first_minute)
+        if since is not None:
+            conditions.append("s.release_time_ns >= ?")
+            params.append(int(since.timestamp() * 1e9))
+        if until is not None:
+            conditions.append("s.release_time_ns < ?")
+            params.append(int(until.timestamp() * 1e9))
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        return self.query(f"SELECT s.*, c.* FROM channels c JOIN sessions s USING (session_id) {where} "
+                          f"ORDER BY s.release_time_ns DESC, c.channel", tuple(params))
+
+
+def record_capture(catalog_path: str, exchange: str, symbol: str, channel: str, release_time: datetime,
+                   tag: Optional[str], writer, final_snapshot: Optional[Dict[str, Any]]) -> str:
+    """Catalog a closed StreamingRecordWriter capture, counts come from its ChannelSummary sink"""
+    paths = {"capture": os.path.abspath(writer.path)}
+    summary = {"messages": writer.records}
+    for sink in writer.sinks:
+        if isinstance(sink, ChannelSummary):
+            summary = sink.to_dict()
+        elif getattr(sink, "path", "").endswith(".parquet"):
+            paths["tick_store"] = os.path.abspath(sink.path)
+        elif getattr(sink, "path", "").endswith(".trades"):
+            paths["trade_archive"] = os.path.abspath(sink.path)
+    with SessionCatalog(catalog_path) as catalog:
+        return catalog.record_channel(exchange, symbol, channel, release_time, tag, summary, final_snapshot, paths)
+
+
+def index_archive(catalog_path: str, source_dir: str, exchange: str, tag: Optional[str] = None) -> int:
+    """Catalog every capture of a release archive, captures already indexed unchanged are skipped"""
+    if tag is None:
+        tag = TAG_RELISTING if "relisting" in os.path.basename(os.path.normpath(source_dir)) else TAG_INITIAL_LISTING
+    indexed = 0
+    started = time.monotonic()
+    with SessionCatalog(catalog_path) as catalog:
+        for release_dir in sorted(os.listdir(source_dir)):
+            match = _RELEASE_DIR.match(release_dir)
+            if not match:
+                continue
+            date, hour_minute, symbol = match.groups()
+            release_time = datetime.strptime(f"{date} {hour_minute}", '%Y-%m-%d %H-%M')
+            # a streamed .ndjson capture wins over a legacy .json one of the same channel
+            captures = {}
+            for filename in sorted(os.listdir(os.path.join(source_dir, release_dir))):
+                file_match = re.match(rf'^{re.escape(symbol)}_(.+)_data\.(nd)?json$', filename)
+                if file_match:
+                    captures[file_match.group(1)] = os.path.abspath(os.path.join(source_dir, release_dir, filename))
+            for channel, path in captures.items():
+                if catalog.is_current(path):
+                    continue
+                try:
+                    summary = ChannelSummary(release_time)
+                    metadata, entries = open_capture(path)
+                    summary.write_records(entries)
+                except Exception as e:
+                    logger.error(f"Skipping unreadable {path}: {e}")
+                    continue
+                catalog.record_channel(exchange, symbol, channel, release_time, tag, summary.to_dict(),
+                                       metadata.get("final_snapshot"), {"capture": path}, commit=False)
+                indexed += 1
+            catalog.connection.commit()
+    logger.info(f"Indexed {indexed} captures of {source_dir} in {time.monotonic() - started:.1f}s")
+    return indexed
+
+
+if __name__ == "__main__":
+    # python common/session_catalog.py <catalog db> <archive dir> [exchange] [tag]
+    #   python common/session_catalog.py /root/trading_systems/sessions.db kucoin_dir/kucoin_release_data_initial kucoin
+    index_archive(sys.argv[1], sys.argv[2], sys.argv[3] if len(sys.argv) > 3 else "kucoin",
+                  sys.argv[4] if len(sys.argv) > 4 else None)
@@ -0,0 +1,211 @@
+import asyncio
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+import orjson
+from receive_time import add_time_received
+
+# Configure logging
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+console_handler = logging.StreamHandler()
+formatter = logging.Formatter('%(asctime)s.%(msecs)03d - %(levelname)s - %(message)s - %(funcName)s', datefmt='%H:%M:%S')
+console_handler.setFormatter(formatter)
+logger.addHandler(console_handler)
+logger.propagate = False
+
+# Capture file layout, one orjson document per line:
+#   {"metadata": {...}}   header, written when the file is opened
+#   {...}                 one line per message
+#   {"footer": {...}}     totals and final snapshot, written on close
+# A crash loses at most the chunk in flight; a torn last line is skipped by the reader.
+HEADER_KEY = "metadata"
+FOOTER_KEY = "footer"
+
+_CLOSE = object()
+
+
+class StreamingRecordWriter:
+    """
+    Append-only NDJSON writer with serialization and file I/O on a background thread.
+
+    write() only appends to the current chunk on the event loop. Full chunks
+    (or any chunk older than flush_interval) are handed to the writer thread
+    over a bounded queue, so resident memory stays at max_pending_chunks
+    chunks whatever the duration. When the thread falls behind, write()
+    waits for room, which propagates backpressure to the caller.
+
+    sinks get every chunk on the writer thread as well (write_records(chunk),
+    close() at the end), e.g. a tick_store.TickStoreWriter.
+    """
+
+    def __init__(self, path: str, header: Dict[str, Any], chunk_records: int = 1000,
+                 flush_interval: float = 1.0, max_pending_chunks: int = 16, time_received_digits: int = 4,
+                 sinks: Optional[list] = None):
+        self.path = path
+        self.sinks = list(sinks or [])
+        self.chunk_records = chunk_records
+        self.flush_interval = flush_interval
+        self.time_received_digits = time_received_digits
+
+        self.records = 0
+        self.bytes_written = 0
+        self.chunks_written = 0
+        self.handoff_waits = 0
+
+        self._chunk: List[Dict[str, Any]] = []
+        self._last_handoff = time.monotonic()
+        self._pending = queue.Queue(maxsize=max_pending_chunks)
+        self._error: Optional[BaseException] = None
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        # a capture is written in one go, a rerun for the same release replaces it like the old json.dump
+        self._file = open(path, "wb")
+        self._write_line({HEADER_KEY: header})
+        self._file.flush()
+        self._thread = threading.Thread(target=self._run, name=f"writer-{os.path.basename(path)}", daemon=True)
+        self._thread.start()
+
+    def _write_line(self, document: Dict[str, Any]):
+        line = orjson.dumps(document, option=orjson.OPT_APPEND_NEWLINE)
+        self._file.write(line)
+        self.bytes_written += len(line)
+
+    def _run(self):
+        while True:
+            chunk = self._pending.get()
+            if type(chunk) is tuple:
+                # (_CLOSE, footer), the last item
+                try:
+                    self._write_line({FOOTER_KEY: chunk[1]})
+                    self._file.flush()
+                    os.fsync(self._file.fileno())
+                except Exception as e:
+                    self._error = e
+                    logger.error(f"Writing footer of {self.path} failed: {e}")
+                self._close_sinks()
+                return
+            try:
+                # the legacy time_received string is produced here, off the event loop
+                add_time_received(chunk, self.time_received_digits)
+                lines = b"".join(orjson.dumps(record, option=orjson.OPT_APPEND_NEWLINE) for record in chunk)
+                self._file.write(lines)
+                self._file.flush()
+                self.bytes_written += len(lines)
+                self.chunks_written += 1
+            except Exception as e:
+                self._error = e
+                logger.error(f"Writing {self.path} failed: {e}")
+            for sink in self.sinks:
+                try:
+                    sink.write_records(chunk)
+                except Exception as e:
+                    logger.error(f"Sink {sink} failed: {e}")
+
+    def _close_sinks(self):
+        for sink in self.sinks:
+            try:
+                sink.close()
+            except Exception as e:
+                logger.error(f"Closing sink {sink} failed: {e}")
+
+    async def write(self, record: Dict[str, Any]):
+        self._chunk.append(record)
+        self.records += 1
+        if len(self._chunk) >= self.chunk_records or time.monotonic() - self._last_handoff >= self.flush_interval:
+            await self.flush()
+
+    async def flush(self):
+        """Hand the current chunk to the writer thread, waits while the thread is behind"""
+        self._last_handoff = time.monotonic()
+        if not self._chunk:
+            return
+        chunk, self._chunk = self._chunk, []
+        while True:
+            try:
+                self._pending.put_nowait(chunk)
+                return
+            except queue.Full:
+                self.handoff_waits += 1
+                await asyncio.sleep(0.005)
+
+    async def close(self, footer: Optional[Dict[str, Any]] = None):
+        """Write the remaining records and the footer, fsync and close the file"""
+        await self.flush()
+        footer = dict(footer or {})
+        footer.setdefault("total_messages", self.records)
+        await asyncio.get_running_loop().run_in_executor(None, self._pending.put, (_CLOSE, footer))
+        await asyncio.get_running_loop().run_in_executor(None, self._thread.join)
+        self._file.close()
+        if self._error is not None:
+            raise self._error
+        logger.info(f"Saved {self.records} messages to {self.path}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "path": self.path,
+            "records": self.records,
+            "bytes_written": self.bytes_written,
+            "chunks_written": self.chunks_written,
+            "pending_chunks": self._pending.qsize(),
+            "handoff_waits": self.handoff_waits
+        }
+
+
+def read_capture(path: str) -> Tuple[Dict[str, Any], Iterator[Dict[str, Any]]]:
+    """
+    Header metadata and a lazy iterator over the messages of a capture file.
+    Footer fields are merged into the metadata dict once the iterator is exhausted.
+    """
+    f = open(path, "rb")
+    first = f.readline()
+    metadata = orjson.loads(first).get(HEADER_KEY, {}) if first else {}
+
+    def records() -> Iterator[Dict[str, Any]]:
+        with f:
+            for line in f:
+                try:
+                    document = orjson.loads(line)
+                except orjson.JSONDecodeError:
+                    # torn last line of an interrupted capture
+                    continue
+                if len(document) == 1:
+                    if FOOTER_KEY in document:
+                        metadata.update(document[FOOTER_KEY])
+                        continue
+                    if HEADER_KEY in document:
+                        # header of a file appended to by an older writer, not a message
+                        continue
+                yield document
+
+    return metadata, records()
+
+
+def open_capture(path: str) -> Tuple[Dict[str, Any], Iterator[Dict[str, Any]]]:
+    """
+    Metadata and messages of a streamed .ndjson or legacy .json capture, bitget's list-of-lists included.
+    Metadata is empty for bitget's list-only files, a streamed footer is merged in once the messages are consumed.
+    """
+    if path.endswith(".ndjson"):
+        return read_capture(path)
+    with open(path, "rb") as f:
+        document = orjson.loads(f.read())
+    if isinstance(document, dict):
+        return document.get("metadata", {}), iter(document["data"])
+    # bitget_websocket_V3 stored each push as a one-element list
+    return {}, (entry[0] if isinstance(entry, list) else entry for entry in document if entry)
+
+
+def capture_entries(path: str) -> List[Dict[str, Any]]:
+    """Messages of any capture, see open_capture"""
+    return list(open_capture(path)[1])
+
+
+def load_capture(path: str) -> Dict[str, Any]:
+    """{"metadata": ..., "data": [...]} for streamed (.ndjson) and legacy (.json) captures"""
+    metadata, records = open_capture(path)
+    data = list(records)  # also merges the footer into metadata
+    return {"metadata": metadata, "data": data}
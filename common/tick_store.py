@@ -0,0 +1,266 @@
+import glob
+import logging
+import os
+import re
+import sys
+import time
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Iterable
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from stream_writer import capture_entries
+from receive_time import received_ns
+
+# Configure logging
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+console_handler = logging.StreamHandler()
+formatter = logging.Formatter('%(asctime)s.%(msecs)03d - %(levelname)s - %(message)s - %(funcName)s', datefmt='%H:%M:%S')
+console_handler.setFormatter(formatter)
+logger.addHandler(console_handler)
+logger.propagate = False
+
+# Tick store layout (hive partitioned, one file per release and channel):
+#   <root>/exchange=kucoin/date=2024-11-25/symbol=RWA/channel=match/10-00.parquet
+# Timestamps are int64 epoch ns: ts_exchange_ns from the message, ts_received_ns
+# from our receive stamp (legacy captures: time of day + the release date, local time).
+
+SIDE = pa.dictionary(pa.int8(), pa.string())
+PRICE_LEVELS = pa.list_(pa.float64())
+
+SCHEMAS = {
+    # match / trade
+    "trades": pa.schema([
+        ("ts_exchange_ns", pa.int64()), ("ts_received_ns", pa.int64()),
+        ("price", pa.float64()), ("size", pa.float64()), ("side", SIDE),
+        ("trade_id", pa.string()), ("sequence", pa.int64()),
+    ]),
+    # ticker / level1: best bid and ask, last trade when the channel has it
+    "quotes": pa.schema([
+        ("ts_exchange_ns", pa.int64()), ("ts_received_ns", pa.int64()),
+        ("price", pa.float64()), ("size", pa.float64()),
+        ("best_bid", pa.float64()), ("best_bid_size", pa.float64()),
+        ("best_ask", pa.float64()), ("best_ask_size", pa.float64()),
+        ("sequence", pa.int64()),
+    ]),
+    # level2Depth5 / books5: full top of book per message as list columns
+    "depth": pa.schema([
+        ("ts_exchange_ns", pa.int64()), ("ts_received_ns", pa.int64()),
+        ("bid_prices", PRICE_LEVELS), ("bid_sizes", PRICE_LEVELS),
+        ("ask_prices", PRICE_LEVELS), ("ask_sizes", PRICE_LEVELS),
+    ]),
+    # level2 increments, exploded: one row per price level change
+    "l2_changes": pa.schema([
+        ("ts_exchange_ns", pa.int64()), ("ts_received_ns", pa.int64()),
+        ("sequence_start", pa.int64()), ("sequence_end", pa.int64()),
+        ("side", SIDE), ("price", pa.float64()), ("size", pa.float64()),
+        ("change_sequence", pa.int64()),
+    ]),
+    # market snapshot
+    "snapshot": pa.schema([
+        ("ts_exchange_ns", pa.int64()), ("ts_received_ns", pa.int64()),
+        ("sequence", pa.int64()), ("price", pa.float64()),
+        ("best_bid", pa.float64()), ("best_ask", pa.float64()),
+        ("high", pa.float64()), ("low", pa.float64()),
+        ("vol", pa.float64()), ("vol_value", pa.float64()), ("change_rate", pa.float64()),
+    ]),
+}
+
+CHANNEL_KINDS = {
+    ("kucoin", "match"): "trades",
+    ("kucoin", "ticker"): "quotes",
+    ("kucoin", "level1"): "quotes",
+    ("kucoin", "level2Depth5"): "depth",
+    ("kucoin", "level2"): "l2_changes",
+    ("kucoin", "snapshot"): "snapshot",
+    ("bitget", "trade"): "trades",
+    ("bitget", "ticker"): "quotes",
+    ("bitget", "books5"): "depth",
+}
+
+PARTITIONING = ds.partitioning(pa.schema([("exchange", pa.string()), ("date", pa.string()),
+                                          ("symbol", pa.string()), ("channel", pa.string())]), flavor="hive")
+
+_RELEASE_DIR = re.compile(r'^(\d{4}-\d{2}-\d{2})_(\d{2}-\d{2})_(.+)$')
+
+
+def _float(value) -> Optional[float]:
+    return None if value is None or value == "" else float(value)
+
+
+def _int(value) -> Optional[int]:
+    return None if value is None or value == "" else int(value)
+
+
+def _ms_to_ns(value) -> Optional[int]:
+    return None if value is None or value == "" else int(value) * 1_000_000
+
+
+def _levels(levels) -> tuple:
+    return [float(level[0]) for level in levels], [float(level[1]) for level in levels]
+
+
+def normalize(exchange: str, channel: str, entries: Iterable[Dict[str, Any]], date: str) -> Dict[str, list]:
+    """Column lists for the channel's schema from raw message dicts"""
+    kind = CHANNEL_KINDS[(exchange, channel)]
+    columns: Dict[str, list] = {name: [] for name in SCHEMAS[kind].names}
+
+    def add(**values):
+        for name, column in columns.items():
+            column.append(values.get(name))
+
+    for entry in entries:
+        received = received_ns(entry, date)
+        if kind == "trades":
+            if exchange == "kucoin":
+                add(ts_exchange_ns=_int(entry.get('time')), ts_received_ns=received,
+                    price=_float(entry['price']), size=_float(entry['size']), side=entry.get('side'),
+                    trade_id=entry.get('tradeId'), sequence=_int(entry.get('sequence')))
+            else:
+                add(ts_exchange_ns=_ms_to_ns(entry.get('ts')), ts_received_ns=received,
+                    price=_float(entry['price']), size=_float(entry['size']), side=entry.get('side'),
+                    trade_id=entry.get('tradeId'))
+        elif kind == "quotes":
+            if exchange == "bitget":
+                add(ts_exchange_ns=_ms_to_ns(entry.get('ts')), ts_received_ns=received,
+                    price=_float(entry.get('lastPr')),
+                    best_bid=_float(entry.get('bidPr')), best_bid_size=_float(entry.get('bidSz')),
+                    best_ask=_float(entry.get('askPr')), best_ask_size=_float(entry.get('askSz')))
+            elif channel == "level1":
+                bid, ask = entry.get('bids') or [None, None], entry.get('asks') or [None, None]
+                add(ts_exchange_ns=_ms_to_ns(entry.get('timestamp')), ts_received_ns=received,
+                    best_bid=_float(bid[0]), best_bid_size=_float(bid[1]),
+                    best_ask=_float(ask[0]), best_ask_size=_float(ask[1]))
+            else:
+                add(ts_exchange_ns=_ms_to_ns(entry.get('time')), ts_received_ns=received,
+                    price=_float(entry.get('price')), size=_float(entry.get('size')),
+                    best_bid=_float(entry.get('bestBid')), best_bid_size=_float(entry.get('bestBidSize')),
+                    best_ask=_float(entry.get('bestAsk')), best_ask_size=_float(entry.get('bestAskSize')),
+                    sequence=_int(entry.get('sequence')))
+        elif kind == "depth":
+            bid_prices, bid_sizes = _levels(entry.get('bids', ()))
+            ask_prices, ask_sizes = _levels(entry.get('asks', ()))
+            add(ts_exchange_ns=_ms_to_ns(entry.get('timestamp') or entry.get('ts')), ts_received_ns=received,
+                bid_prices=bid_prices, bid_sizes=bid_sizes, ask_prices=ask_prices, ask_sizes=ask_sizes)
+        elif kind == "l2_changes":
+            changes = entry.get('changes', {})
+            for side, key in (("buy", 'bids'), ("sell", 'asks')):
+                for change in changes.get(key, ()):
+                    add(ts_exchange_ns=_ms_to_ns(entry.get('time')), ts_received_ns=received,
+                        sequence_start=_int(entry.get('sequenceStart')), sequence_end=_int(entry.get('sequenceEnd')),
+                        side=side, price=float(change[0]), size=float(change[1]), change_sequence=_int(change[2]))
+        else:
+            data = entry.get('data', {})
+            add(ts_exchange_ns=_ms_to_ns(data.get('datetime')), ts_received_ns=received,
+                sequence=_int(entry.get('sequence')), price=_float(data.get('lastTradedPrice')),
+                best_bid=_float(data.get('buy')), best_ask=_float(data.get('sell')),
+                high=_float(data.get('high')), low=_float(data.get('low')),
+                vol=_float(data.get('vol')), vol_value=_float(data.get('volValue')),
+                change_rate=_float(data.get('changeRate')))
+    return columns
+
+
+def partition_path(root: str, exchange: str, date: str, symbol: str, channel: str) -> str:
+    return os.path.join(root, f"exchange={exchange}", f"date={date}", f"symbol={symbol}", f"channel={channel}")
+
+
+class TickStoreWriter:
+    """
+    Parquet part file of one release and channel, written in row groups.
+
+    write_records() takes raw message dicts (as recorded) and is safe to call
+    from a writer thread, e.g. as a sink of StreamingRecordWriter; records
+    are buffered until row_group_records and then written as one row group.
+    """
+
+    def __init__(self, root: str, exchange: str, symbol: str, channel: str, release_time: datetime,
+                 row_group_records: int = 50000):
+        self.exchange = exchange
+        self.channel = channel
+        self.kind = CHANNEL_KINDS[(exchange, channel)]
+        self.schema = SCHEMAS[self.kind]
+        self.date = release_time.strftime('%Y-%m-%d')
+        directory = partition_path(root, exchange, self.date, symbol, channel)
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, f"{release_time.strftime('%H-%M')}.parquet")
+        self.row_group_records = row_group_records
+        self.rows = 0
+        self._pending: List[Dict[str, Any]] = []
+        self._writer = pq.ParquetWriter(self.path, self.schema, compression="zstd")
+
+    def write_records(self, records: List[Dict[str, Any]]):
+        self._pending.extend(records)
+        if len(self._pending) >= self.row_group_records:
+            self._write_pending()
+
+    def _write_pending(self):
+        if not self._pending:
+            return
+        columns = normalize(self.exchange, self.channel, self._pending, self.date)
+        table = pa.Table.from_pydict(columns, schema=self.schema)
+        self._writer.write_table(table)
+        self.rows += table.num_rows
+        self._pending = []
+
+    def close(self):
+        self._write_pending()
+        self._writer.close()
+
+
+def convert_archive(source_dir: str, root: str, exchange: str) -> Dict[str, int]:
+    """
+    One-shot conversion of <date>_<HH-MM>_<SYMBOL>/<SYMBOL>_<channel>_data.json(.ndjson)
+    release folders into the tick store. Re-running overwrites the same part files.
+    """
+    rows_per_channel: Dict[str, int] = {}
+    started = time.monotonic()
+    for release_dir in sorted(os.listdir(source_dir)):
+        match = _RELEASE_DIR.match(release_dir)
+        if not match:
+            continue
+        date, hour_minute, symbol = match.groups()
+        release_time = datetime.strptime(f"{date} {hour_minute}", '%Y-%m-%d %H-%M')
+        for path in sorted(glob.glob(os.path.join(source_dir, release_dir, f"{symbol}_*_data.*json"))):
+            channel = os.path.basename(path)[len(symbol) + 1:].rsplit('_data.', 1)[0]
+            if (exchange, channel) not in CHANNEL_KINDS:
+                logger.warning(f"Skipping {path}: no schema for {exchange} {channel}")
+                continue
+            try:
+                entries = capture_entries(path)
+            except Exception as e:
+                logger.error(f"Skipping unreadable {path}: {e}")
+                continue
+            writer = TickStoreWriter(root, exchange, symbol, channel, release_time)
+            writer.write_records(entries)
+            writer.close()
+            rows_per_channel[channel] = rows_per_channel.get(channel, 0) + writer.rows
+    logger.info(f"Converted {source_dir} in {time.monotonic() - started:.1f}s: {rows_per_channel}")
+    return rows_per_channel
+
+
+def load_ticks(root: str, channel: str, exchange: str = "*", symbols: Optional[List[str]] = None,
+               dates: Optional[List[str]] = None, columns: Optional[List[str]] = None) -> pa.Table:
+    """
+    One table for a channel across releases, with exchange/date/symbol as columns.
+        trades = load_ticks(root, "match").to_pandas()
+    """
+    files = glob.glob(os.path.join(root, f"exchange={exchange}", "date=*", "symbol=*", f"channel={channel}", "*.parquet"))
+    if not files:
+        raise FileNotFoundError(f"No {channel} data under {root}")
+    dataset = ds.dataset(files, format="parquet", partitioning=PARTITIONING, partition_base_dir=root)
+    expression = None
+    if symbols:
+        expression = ds.field("symbol").isin(symbols)
+    if dates:
+        date_filter = ds.field("date").isin(dates)
+        expression = date_filter if expression is None else expression & date_filter
+    if columns is not None:
+        columns = list(columns) + [name for name in ("exchange", "date", "symbol") if name not in columns]
+    return dataset.to_table(columns=columns, filter=expression)
+
+
+if __name__ == "__main__":
+    # python common/tick_store.py <archive dir> <tick store root> <exchange>
+    #   python common/tick_store.py kucoin_dir/kucoin_release_data_initial /root/tick_store kucoin
+    convert_archive(sys.argv[1], sys.argv[2], sys.argv[3] if len(sys.argv) > 3 else "kucoin")
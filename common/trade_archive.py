@@ -0,0 +1,206 @@
+import glob
+import logging
+import os
+import re
+import struct
+import sys
+import time
+from datetime import datetime
+from typing import Dict, Any, List, Tuple
+import numpy as np
+import orjson
+from stream_writer import capture_entries
+from receive_time import received_ns
+
+# Configure logging
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+console_handler = logging.StreamHandler()
+formatter = logging.Formatter('%(asctime)s.%(msecs)03d - %(levelname)s - %(message)s - %(funcName)s', datefmt='%H:%M:%S')
+console_handler.setFormatter(formatter)
+logger.addHandler(console_handler)
+logger.propagate = False
+
+# Session file (<date>_<HH-MM>_<SYMBOL>.trades):
+#   b"TRADES01" | uint32 header length | orjson metadata, padded to a multiple of 64 bytes
+#   fixed-width little-endian records, TRADE_DTYPE, in arrival order
+# Sparse time index (.trades.idx): (ts_received_ns, record number) of every
+# INDEX_STRIDE-th record, int64 pairs. A torn last record is ignored by readers.
+MAGIC = b"TRADES01"
+TRADE_DTYPE = np.dtype([
+    ("ts_exchange_ns", "<i8"),
+    ("ts_received_ns", "<i8"),
+    ("price", "<f8"),
+    ("size", "<f8"),
+    ("side", "i1"),
+])
+INDEX_DTYPE = np.dtype([("ts_received_ns", "<i8"), ("record", "<i8")])
+INDEX_STRIDE = 1024
+SIDE_BUY = 1
+SIDE_SELL = -1
+
+_RELEASE_DIR = re.compile(r'^(\d{4}-\d{2}-\d{2})_(\d{2}-\d{2})_(.+)$')
+_SIDES = {"buy": SIDE_BUY, "sell": SIDE_SELL, 1: SIDE_BUY, 2: SIDE_SELL}
+# trade channel of each exchange
+TRADE_CHANNELS = {"kucoin": "match", "bitget": "trade", "mexc": "deals"}
+
+
+def trade_record(exchange: str, entry: Dict[str, Any], date: str) -> Tuple[int, int, float, float, int]:
+    """(ts_exchange_ns, ts_received_ns, price, size, side) of a kucoin match, bitget trade or mexc deal"""
+    received = received_ns(entry, date) or 0
+    if exchange == "kucoin":
+        return int(entry.get('time') or 0), received, float(entry['price']), float(entry['size']), \
+            _SIDES.get(entry.get('side'), 0)
+    if exchange == "bitget":
+        return int(entry.get('ts') or 0) * 1_000_000, received, float(entry['price']), float(entry['size']), \
+            _SIDES.get(entry.get('side'), 0)
+    # mexc deals: p price, v quantity, S 1 buy / 2 sell, t ms
+    return int(entry.get('t') or 0) * 1_000_000, received, float(entry['p']), float(entry['v']), \
+        _SIDES.get(entry.get('S'), 0)
+
+
+class TradeArchiveWriter:
+    """
+    Appends fixed-width trade records to a session file and its sparse index.
+
+    write_records() takes raw trade messages and can be used as a
+    StreamingRecordWriter sink, so conversion and I/O stay on the writer thread.
+    """
+
+    def __init__(self, path: str, exchange: str, metadata: Dict[str, Any], date: str,
+                 index_stride: int = INDEX_STRIDE):
+        self.path = path
+        self.exchange = exchange
+        self.date = date
+        self.index_stride = index_stride
+        self.records = 0
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        header = orjson.dumps(dict(metadata, exchange=exchange, index_stride=index_stride))
+        header += b" " * (-(len(MAGIC) + 4 + len(header)) % 64)
+        self._file = open(path, "wb")
+        self._file.write(MAGIC + struct.pack("<I", len(header)) + header)
+        self._index = open(path + ".idx", "wb")
+
+    def write_records(self, entries: List[Dict[str, Any]]):
+        records = np.array([trade_record(self.exchange, entry, self.date) for entry in entries], dtype=TRADE_DTYPE)
+        self.append(records)
+
+    def append(self, records: np.ndarray):
+        if not len(records):
+            return
+        # index entries for the record numbers crossing a stride boundary
+        first = -(-self.records // self.index_stride) * self.index_stride
+        positions = np.arange(first, self.records + len(records), self.index_stride)
+        if len(positions):
+            index = np.empty(len(positions), dtype=INDEX_DTYPE)
+            index["ts_received_ns"] = records["ts_received_ns"][positions - self.records]
+            index["record"] = positions
+            self._index.write(index.tobytes())
+            self._index.flush()
+        self._file.write(records.tobytes())
+        self._file.flush()
+        self.records += len(records)
+
+    def close(self):
+        self._file.close()
+        self._index.close()
+
+
+class TradeArchive:
+    """
+    Read-only memory-mapped view of a session file.
+
+    Records are a numpy memmap, slicing does not read the file; seek() finds a
+    receive time with a binary search over the sparse index, then one over a
+    single stride of records, so only a few pages are touched.
+        archive = TradeArchive(path)
+        first_minute = archive.window_after_release(0, 60)
+        first_minute["price"], first_minute["size"]
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a trade archive")
+            header_length = struct.unpack("<I", f.read(4))[0]
+            self.metadata = orjson.loads(f.read(header_length))
+        offset = len(MAGIC) + 4 + header_length
+        count = (os.path.getsize(path) - offset) // TRADE_DTYPE.itemsize
+        self.records = np.memmap(path, dtype=TRADE_DTYPE, mode="r", offset=offset, shape=(count,)) \
+            if count else np.empty(0, dtype=TRADE_DTYPE)
+        index_path = path + ".idx"
+        self.index = np.fromfile(index_path, dtype=INDEX_DTYPE) if os.path.exists(index_path) \
+            else np.empty(0, dtype=INDEX_DTYPE)
+        self.index = self.index[self.index["record"] < count]
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def seek(self, ts_received_ns: int) -> int:
+        """Position of the first record received at or after ts_received_ns"""
+        if not len(self.index):
+            return int(np.searchsorted(self.records["ts_received_ns"], ts_received_ns))
+        block = int(np.searchsorted(self.index["ts_received_ns"], ts_received_ns, side="left")) - 1
+        start = int(self.index["record"][block]) if block >= 0 else 0
+        stop = int(self.index["record"][block + 1]) + 1 if block + 1 < len(self.index) else len(self.records)
+        return start + int(np.searchsorted(self.records["ts_received_ns"][start:stop], ts_received_ns))
+
+    def window(self, start_ns: int, end_ns: int) -> np.ndarray:
+        """Records received in [start_ns, end_ns), a memmap slice"""
+        return self.records[self.seek(start_ns):self.seek(end_ns)]
+
+    @property
+    def release_ns(self) -> int:
+        return self.metadata["release_time_ns"]
+
+    def window_after_release(self, start_seconds: float, end_seconds: float) -> np.ndarray:
+        """Records received between release + start_seconds and release + end_seconds"""
+        return self.window(self.release_ns + int(start_seconds * 1e9), self.release_ns + int(end_seconds * 1e9))
+
+
+def session_path(root: str, exchange: str, symbol: str, release_time: datetime) -> str:
+    return os.path.join(root, exchange, f"{release_time.strftime('%Y-%m-%d_%H-%M')}_{symbol}.trades")
+
+
+def open_session_writer(root: str, exchange: str, symbol: str, release_time: datetime) -> TradeArchiveWriter:
+    metadata = {
+        "symbol": symbol,
+        "release_time": release_time.strftime('%Y-%m-%d %H:%M'),
+        "release_time_ns": int(release_time.timestamp()) * 1_000_000_000,
+    }
+    return TradeArchiveWriter(session_path(root, exchange, symbol, release_time), exchange, metadata,
+                              release_time.strftime('%Y-%m-%d'))
+
+
+def convert_archive(source_dir: str, root: str, exchange: str) -> int:
+    """One-shot conversion of the trade captures of every release folder into session files"""
+    channel = TRADE_CHANNELS[exchange]
+    total = 0
+    started = time.monotonic()
+    for release_dir in sorted(os.listdir(source_dir)):
+        match = _RELEASE_DIR.match(release_dir)
+        if not match:
+            continue
+        date, hour_minute, symbol = match.groups()
+        paths = glob.glob(os.path.join(source_dir, release_dir, f"{symbol}_{channel}_data.*json"))
+        if not paths:
+            continue
+        try:
+            entries = capture_entries(sorted(paths)[-1])
+        except Exception as e:
+            logger.error(f"Skipping unreadable {paths}: {e}")
+            continue
+        writer = open_session_writer(root, exchange, symbol, datetime.strptime(f"{date} {hour_minute}", '%Y-%m-%d %H-%M'))
+        writer.write_records(entries)
+        writer.close()
+        total += writer.records
+    logger.info(f"Converted {total} trades of {source_dir} in {time.monotonic() - started:.1f}s")
+    return total
+
+
+if __name__ == "__main__":
+    # python common/trade_archive.py <archive dir> <trade archive root> <exchange>
+    #   python common/trade_archive.py kucoin_dir/kucoin_release_data_initial /root/trade_archive kucoin
+    convert_archive(sys.argv[1], sys.argv[2], sys.argv[3] if len(sys.argv) > 3 else "kucoin")
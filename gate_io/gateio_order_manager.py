@@ -1,3 +1,5 @@
+import os
+import sys
 import asyncio
 import aiohttp
 import time
@@ -8,6 +10,9 @@ from typing import Dict, List
 from datetime import datetime
 import logging
 from concurrent.futures import ThreadPoolExecutor
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "common"))
+from request_latency import RequestLatencyRecorder
+from connection_warm_up import ConnectionWarmUp
 
 # Create a dedicated logger for this module
 module_logger = logging.getLogger(__name__)
@@ -18,7 +23,9 @@ console_handler.setFormatter(formatter)
 module_logger.addHandler(console_handler)
 module_logger.propagate = False
 
-class GateioOrderManager:
+class GateioOrderManager(ConnectionWarmUp):
+    # cheap unsigned endpoint used to open and keep connections warm
+    WARM_UP_ENDPOINT = "/api/v4/spot/time"
     def __init__(self, api_key: str, api_secret: str, debug: bool = False):
         """Initialize Gate.io trading client with async support"""
         if not all([api_key, api_secret]):
@@ -36,6 +43,11 @@ class GateioOrderManager:
         self.executor = ThreadPoolExecutor(max_workers=4)
         self.session = None
 
+        # keep-alive connection pool, warm_up_connections() before release time
+        self._init_warm_up()
+        # per-endpoint phase histograms (sign, connection, send, ttfb, parse)
+        self.latency = RequestLatencyRecorder()
+
     def _get_formatted_time(self) -> Dict[str, str]:
         """Returns current time in human readable format"""
         now = datetime.now()
@@ -48,12 +60,6 @@ class GateioOrderManager:
         dt = datetime.fromtimestamp(timestamp_ms / 1000)
         return dt.strftime('%H:%M:%S.%f')[:-3]
 
-    async def _init_session(self):
-        """Initialize aiohttp session"""
-        if self.session is None:
-            timeout = aiohttp.ClientTimeout(total=5)
-            self.session = aiohttp.ClientSession(timeout=timeout)
-
     def _generate_signature(self, method: str, url_path: str, query_string: str = '', payload_string: str = '') -> Dict[str, str]:
         """Generate signature for Gate.io API"""
         t = str(int(time.time()))
@@ -87,12 +93,17 @@ class GateioOrderManager:
             payload_string = json.dumps(data)
         
         try:
+            sign_start = time.perf_counter_ns()
             headers = self._static_headers.copy()
             sig_headers = self._generate_signature(method, url_path, query_string, payload_string)
             headers.update(sig_headers)
+            self.latency.time_phase(endpoint, "sign", sign_start)
 
             async with getattr(self.session, method.lower())(url, headers=headers, json=data if data else None) as response:
-                return await response.json()
+                parse_start = time.perf_counter_ns()
+                result = await response.json()
+                self.latency.time_phase(endpoint, "read_parse", parse_start)
+                return result
         except Exception as e:
             module_logger.error(f"Request error: {str(e)}")
             raise
@@ -227,8 +238,16 @@ class GateioOrderManager:
         
         return await asyncio.gather(*tasks)
 
+    def latency_report(self) -> Dict:
+        """Per-endpoint phase histograms of every request made by this manager"""
+        return self.latency.report()
+
     async def close(self):
         """Close the aiohttp session"""
+        if self.latency.histograms:
+            module_logger.info(f"request latency p50/p99: {self.latency.summary()}")
+        if self._keep_alive_task:
+            self._keep_alive_task.cancel()
         if self.session:
             await self.session.close()
         self.executor.shutdown(wait=False)
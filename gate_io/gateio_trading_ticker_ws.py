@@ -121,6 +121,8 @@ async def main():
                     try:
                         # Create websocket connection and retrieve price
                         ws = GateIO_websocket_collection()
+                        # open keep-alive sockets to the REST host so the first order skips DNS/TCP/TLS setup
+                        await strategy.trading_client.warm_up_connections()
 
                         ws_data = await ws.get_market_data(
                             symbol,
@@ -128,6 +130,7 @@ async def main():
                             max_wait_time=1,
                             release_time=release_date_time
                         )
+                        strategy.trading_client.stop_keep_alive()
                         
                         if ws_data:
                             logger.debug(f"Successfully retrieved {symbol} data: {ws_data}")
@@ -162,6 +165,7 @@ async def main():
                         logger.error(f"Error during trading execution:\n {e}")
                         traceback.print_exc()
                     finally:
+                        logger.info(f"connection reuse {symbol}: {strategy.trading_client.connection_report()}")
                         await ws.cleanup()
                         await strategy.close_client()
                     logger.info('Breaking loop after processing pair')
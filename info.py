@@ -1,6 +1,10 @@
+import os
+import sys
 import pandas as pd
 import json
 from datetime import datetime
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "common"))
+from receive_time import received_seconds_of_day, time_received
 path_to_folder = '/root/trading_systems/kucoin_dir/kucoin_release_data_initial/2024-11-26_10-00_HSK'
 # Load JSON data
 with open(path_to_folder+'/HSK_TICKER_DATA.json') as f:
@@ -16,20 +20,19 @@ with open(path_to_folder+'/HSK_MATCH_DATA.json') as f:
     match_data = json.load(f)
 
 # Function to convert time to seconds from release time
-def time_to_seconds(time_str, release_time_str):
-    time_format = "%H:%M:%S.%f"
-    time = datetime.strptime(time_str, time_format)
-    release_time = datetime.strptime(release_time_str, time_format)
-    return (time - release_time).total_seconds()
+def release_seconds_of_day(release_time_str):
+    release_time = datetime.strptime(release_time_str, "%H:%M:%S.%f")
+    return release_time.hour * 3600 + release_time.minute * 60 + release_time.second + release_time.microsecond / 1e6
 
 # Extract data and create DataFrames
 def create_dataframe(data, release_time_str):
     records = []
+    release_seconds = release_seconds_of_day(release_time_str)
     for entry in data['data']:
-        time_received = entry.get('time_received')
-        if time_received:
-            seconds = time_to_seconds(time_received, release_time_str)
-            records.append({'seconds': seconds, 'time_received': time_received})
+        # integer ns receive time when present, legacy time_received string otherwise
+        if entry.get('time_received_ns') is not None or entry.get('time_received'):
+            seconds = received_seconds_of_day(entry) - release_seconds
+            records.append({'seconds': seconds, 'time_received': time_received(entry)})
     return pd.DataFrame(records)
 
 ticker_df = create_dataframe(ticker_data, ticker_data['metadata']['release_time'])
@@ -0,0 +1,150 @@
+import os
+import sys
+import glob
+import time
+import asyncio
+import statistics
+from datetime import datetime
+
+import orjson
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from kucoin_frame_decoder import KucoinFrameDecoder, frame_topic
+from kucoin_websocket_listen_DEV import KucoinWebsocketListen
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "common"))
+from receive_time import stamp
+from stream_writer import load_capture
+
+# Websocket frame handling before and after the topic-prefiltered decoder, replayed
+# from recorded match and level2 captures, next to plain orjson decoding and the
+# multiplexer's delivery through KucoinWebsocketListen._process_message.
+# run: python kucoin_dir/benchmarks/bench_decoding.py [path/to/kucoin_release_data_initial]
+
+DEFAULT_DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                "kucoin_release_data_initial")
+SUBJECTS = {"match": "trade.l3match", "level2": "trade.l2update"}
+MATCH_FIELDS = ('price', 'side', 'size', 'makerOrderId', 'sequence')
+PONG_EVERY = 50  # one pong per 50 data frames, roughly a busy release minute
+
+
+def load_frames(data_dir: str, channel: str, foreign_ratio: float = 0.0) -> tuple:
+    """Rebuild live frames from recorded messages, returns (frames, own topics)"""
+    frames = []
+    own_topics = set()
+    paths = sorted(glob.glob(os.path.join(data_dir, "*", f"*_{channel}_data.json"))
+                   + glob.glob(os.path.join(data_dir, "*", f"*_{channel}_data.ndjson")))
+    for path in paths:
+        messages = load_capture(path)["data"]
+        for i, message in enumerate(messages):
+            message.pop("time_received", None)
+            topic = f"/market/{channel}:{message['symbol']}"
+            own_topics.add(topic)
+            frames.append(orjson.dumps({"type": "message", "topic": topic,
+                                        "subject": SUBJECTS[channel], "data": message}).decode())
+            # frames of symbols we did not ask for, as on a shared socket
+            if foreign_ratio and (i * foreign_ratio) % 1 + foreign_ratio >= 1:
+                frames.append(orjson.dumps({"type": "message", "topic": f"/market/{channel}:OTHER-USDT",
+                                            "subject": SUBJECTS[channel], "data": message}).decode())
+            if i % PONG_EVERY == 0:
+                frames.append(orjson.dumps({"id": str(i), "type": "pong"}).decode())
+    return frames, own_topics
+
+
+async def legacy_path(frames: list, own_topics: set) -> int:
+    """orjson.loads on every frame, awaited _process_message, strftime receive time"""
+    sink = []
+
+    async def process_message(msg_data: dict):
+        if msg_data.get('type') == 'message' and 'data' in msg_data:
+            if msg_data.get('topic') not in own_topics:
+                return
+            processed_data = msg_data['data']
+            processed_data['time_received'] = datetime.now().strftime('%H:%M:%S.%f')[:-3]
+            sink.append(processed_data)
+        elif msg_data.get('type') == 'pong':
+            pass
+
+    for raw in frames:
+        await process_message(orjson.loads(raw))
+    return len(sink)
+
+
+async def decoder_path(frames: list, own_topics: set, fields: tuple = None) -> int:
+    """Raw-text classification, routed frames only, integer receive time"""
+    sink = []
+    deliver = sink.append
+    decoder = KucoinFrameDecoder()
+    for topic in own_topics:
+        decoder.route(topic, lambda data: deliver(stamp(data)), fields)
+    feed = decoder.feed
+    for raw in frames:
+        feed(raw)
+    return len(sink)
+
+
+async def orjson_path(frames: list, own_topics: set) -> int:
+    """orjson.loads of every frame and nothing else, the floor of any full-decode path"""
+    loads = orjson.loads
+    for raw in frames:
+        loads(raw)
+    return len(frames)
+
+
+async def listener_path(frames: list, own_topics: set, fields: tuple = None) -> int:
+    """Multiplexer delivery: raw-text topic routing, then KucoinWebsocketListen._process_message"""
+    listeners = {}
+    for topic in own_topics:
+        channel, symbol = topic.split("/")[-1].split(":")
+        listeners[topic] = KucoinWebsocketListen(symbol.split("-")[0], channel, fields=fields,
+                                                 buffer_capacity=len(frames))
+    for raw in frames:
+        listener = listeners.get(frame_topic(raw))
+        if listener is not None:
+            await listener._process_message(orjson.loads(raw))
+    return sum(listener.queue.metrics()["puts"] for listener in listeners.values())
+
+
+def measure(path, frames: list, own_topics: set, repeats: int, **kwargs) -> dict:
+    samples = []
+    delivered = 0
+    for _ in range(repeats):
+        start = time.perf_counter_ns()
+        delivered = asyncio.run(path(frames, own_topics, **kwargs))
+        samples.append((time.perf_counter_ns() - start) / len(frames))
+    return {"ns_per_frame": round(statistics.median(samples), 1), "delivered": delivered}
+
+
+def main(data_dir: str = DEFAULT_DATA_DIR, repeats: int = 5):
+    scenarios = [
+        ("match", 0.0, None),
+        ("match", 0.0, MATCH_FIELDS),
+        ("level2", 0.0, None),
+        ("match (shared socket, 50% foreign)", 0.5, None),
+        ("level2 (shared socket, 50% foreign)", 0.5, None),
+    ]
+    results = {}
+    for name, foreign_ratio, fields in scenarios:
+        channel = name.split()[0]
+        frames, own_topics = load_frames(data_dir, channel, foreign_ratio)
+        if not frames:
+            print(f"no recorded {channel} data under {data_dir}")
+            continue
+        label = f"{name} fields={list(fields)}" if fields else name
+        before = measure(legacy_path, frames, own_topics, repeats)
+        after = measure(decoder_path, frames, own_topics, repeats, fields=fields)
+        orjson_only = measure(orjson_path, frames, own_topics, repeats)
+        listener = measure(listener_path, frames, own_topics, repeats, fields=fields)
+        assert before["delivered"] == after["delivered"] == listener["delivered"]
+        results[label] = {"frames": len(frames), "before": before, "after": after,
+                          "orjson_loads": orjson_only, "process_message": listener}
+        print(f"{label} ({len(frames)} frames)")
+        print(f"  before: {before['ns_per_frame']} ns/frame")
+        print(f"  after : {after['ns_per_frame']} ns/frame "
+              f"({before['ns_per_frame'] / after['ns_per_frame']:.2f}x)")
+        print(f"  orjson.loads only        : {orjson_only['ns_per_frame']} ns/frame")
+        print(f"  routed + _process_message: {listener['ns_per_frame']} ns/frame")
+    return results
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:2])
@@ -0,0 +1,107 @@
+import os
+import sys
+import glob
+import time
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from order_book2 import OrderBook
+from kucoin_order_book import SequencedOrderBook
+from create_df_bs_pressure import parse_order_book_data, calculate_order_book_metrics
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "common"))
+from stream_writer import load_capture
+
+# Level2 book maintenance (update + top 5 levels per message) and the depth pressure
+# metrics, on recorded release captures.
+# run: python kucoin_dir/benchmarks/bench_order_book.py [path/to/kucoin_release_data_initial]
+
+DEFAULT_DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                "kucoin_release_data_initial")
+DEPTH = 5
+METRICS_ROWS = 2000  # calculate_order_book_metrics costs milliseconds per row
+
+
+def load_level2_segments(data_dir: str) -> list:
+    """Recorded level2 increments split into gap-free runs, so a book never needs a REST resync"""
+    segments = []
+    for path in sorted(glob.glob(os.path.join(data_dir, "*", "*_level2_data.*json"))):
+        segment = []
+        for message in load_capture(path)["data"]:
+            message.pop("time_received", None)
+            if segment and int(message["sequenceStart"]) > int(segment[-1]["sequenceEnd"]) + 1:
+                segments.append(segment)
+                segment = []
+            segment.append(message)
+        if segment:
+            segments.append(segment)
+    return segments
+
+
+def dict_book_pass(segments: list) -> int:
+    """order_book2.OrderBook, plain dicts sorted on every read"""
+    for segment in segments:
+        book = OrderBook()
+        for message in segment:
+            book.update(message)
+            book.get_top_levels(DEPTH)
+    return sum(len(segment) for segment in segments)
+
+
+def sequenced_book_pass(segments: list) -> int:
+    """SequencedOrderBook from an empty snapshot just before each run"""
+    applied = 0
+    for segment in segments:
+        book = SequencedOrderBook(segment[0]["symbol"])
+        book.load_snapshot({"bids": [], "asks": [], "sequence": int(segment[0]["sequenceStart"]) - 1})
+        for message in segment:
+            book.update(message)
+            book.get_top_levels(DEPTH)
+        applied += book.applied
+    return applied
+
+
+def measure(func, data, count: int, repeats: int) -> float:
+    """Median over repeats of the cost per item in ns"""
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter_ns()
+        func(data)
+        samples.append((time.perf_counter_ns() - start) / count)
+    return round(statistics.median(samples), 1)
+
+
+def main(data_dir: str = DEFAULT_DATA_DIR, repeats: int = 5):
+    results = {}
+    segments = load_level2_segments(data_dir)
+    messages = sum(len(segment) for segment in segments)
+    if messages:
+        results["level2 update + top levels"] = {
+            "messages": messages,
+            "segments": len(segments),
+            "dict_book_ns_per_message": measure(dict_book_pass, segments, messages, repeats),
+            "sequenced_book_ns_per_message": measure(sequenced_book_pass, segments, messages, repeats),
+            "sequenced_book_applied": sequenced_book_pass(segments)
+        }
+    else:
+        print(f"no recorded level2 data under {data_dir}")
+
+    frames = [parse_order_book_data(path)
+              for path in sorted(glob.glob(os.path.join(data_dir, "*", "*_level2Depth5_data.*json")))]
+    if frames:
+        import pandas as pd
+        order_book_df = pd.concat(frames, ignore_index=True).head(METRICS_ROWS)
+        results["calculate_order_book_metrics"] = {
+            "rows": len(order_book_df),
+            "us_per_row": round(measure(lambda df: calculate_order_book_metrics(df, DEPTH), order_book_df,
+                                        len(order_book_df), max(1, repeats // 2)) / 1000, 1)
+        }
+    else:
+        print(f"no recorded level2Depth5 data under {data_dir}")
+
+    for label, result in results.items():
+        print(f"{label}: {result}")
+    return results
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:2])
@@ -0,0 +1,100 @@
+import os
+import sys
+import time
+import socket
+import asyncio
+import statistics
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from kucoin_order_managerV2 import KucoinHFOrderManager
+from kucoin_mock_exchange import MockKucoinExchange, ListingScenario
+
+# Order path of KucoinHFOrderManager: signature, order body, and the signed request
+# round trip against the local mock exchange (no injected latency).
+# run: python kucoin_dir/benchmarks/bench_order_path.py
+
+API_KEY = "6750a1b2c3d4e5f600000000"
+API_SECRET = "0f1e2d3c-4b5a-6978-8796-a5b4c3d2e1f0"
+API_PASSPHRASE = "bench-passphrase"
+SYMBOL = "BENCH-USDT"
+BODY = ('{"clientOid": "5c52e11203aa677f33e493fb", "symbol": "BENCH-USDT", "type": "limit", '
+        '"side": "buy", "price": "0.6444", "size": "11", "timeInForce": "GTC"}')
+
+
+def free_port() -> int:
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+def ns_per_call(func, iterations: int, repeats: int) -> float:
+    """Median over repeats of the mean cost of one call"""
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter_ns()
+        for i in range(iterations):
+            func(i)
+        samples.append((time.perf_counter_ns() - start) / iterations)
+    return round(statistics.median(samples), 1)
+
+
+async def request_round_trips(requests: int, repeats: int) -> dict:
+    """Signed POST /api/v1/hf/orders through _make_request, one at a time on a warm connection"""
+    # an empty listing opened right away, orders rest on the mock's book
+    scenario = ListingScenario("BENCH", datetime.now().replace(second=0, microsecond=0), [])
+    exchange = MockKucoinExchange(scenario, port=free_port(), lead_seconds=0, close_after_seconds=0)
+    await exchange.start()
+    manager = KucoinHFOrderManager(API_KEY, API_SECRET, API_PASSPHRASE)
+    manager.base_url = exchange.api_url
+    try:
+        while not exchange.is_open:
+            await asyncio.sleep(0.001)
+        # opens the connection, the requests below all reuse it
+        await manager._make_request("GET", manager.WARM_UP_ENDPOINT)
+
+        samples = []
+        for _ in range(repeats):
+            durations = []
+            for i in range(requests):
+                order = manager._prepare_order_data(SYMBOL, "buy", "0.0001", "1")
+                start = time.perf_counter_ns()
+                response = await manager._make_request("POST", "/api/v1/hf/orders", order)
+                durations.append((time.perf_counter_ns() - start) / 1000)
+                assert response["code"] == "200000", response
+            samples.append(statistics.median(durations))
+            samples.append(sorted(durations)[int(len(durations) * 0.99) - 1])
+        phases = manager.latency.histograms.get("/api/v1/hf/orders", {})
+    finally:
+        await manager.close()
+        await exchange.stop()
+    return {
+        "requests": requests * repeats,
+        "median_us": round(statistics.median(samples[0::2]), 1),
+        "p99_us": round(statistics.median(samples[1::2]), 1),
+        # where the time goes, from the manager's own phase histograms
+        "phases_p50_us": {phase: histogram.percentile(50) for phase, histogram in phases.items()}
+    }
+
+
+def main(iterations: int = 20000, requests: int = 300, repeats: int = 3):
+    manager = KucoinHFOrderManager(API_KEY, API_SECRET, API_PASSPHRASE)
+    timestamp = str(int(time.time() * 1000))
+    results = {
+        "generate_signature": {"ns_per_call": ns_per_call(
+            lambda i: manager._generate_signature(timestamp, "POST", "/api/v1/hf/orders", BODY), iterations, repeats)},
+        "prepare_order_data": {"ns_per_call": ns_per_call(
+            lambda i: manager._prepare_order_data(SYMBOL, "buy", "0.6444", "11", "GTC", 4), iterations, repeats)},
+        # the rate limiter allows 4000 weight per 30s, requests * repeats stays well below
+        "make_request": asyncio.run(request_round_trips(requests, repeats))
+    }
+    print(f"order path ({iterations} calls, {requests} requests x {repeats})")
+    print(f"  _generate_signature : {results['generate_signature']['ns_per_call']} ns")
+    print(f"  _prepare_order_data : {results['prepare_order_data']['ns_per_call']} ns")
+    print(f"  _make_request (mock): median {results['make_request']['median_us']}us, "
+          f"p99 {results['make_request']['p99_us']}us, phases {results['make_request']['phases_p50_us']}")
+    return results
+
+
+if __name__ == "__main__":
+    main()
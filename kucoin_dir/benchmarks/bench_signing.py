@@ -0,0 +1,87 @@
+import os
+import sys
+import time
+import hmac
+import base64
+import hashlib
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from kucoin_request_signer import KucoinRequestSigner
+
+# Per-order signing cost of KucoinHFOrderManager before and after the inline signer.
+# run: python kucoin_dir/benchmarks/bench_signing.py
+
+API_KEY = "6750a1b2c3d4e5f600000000"
+API_SECRET = "0f1e2d3c-4b5a-6978-8796-a5b4c3d2e1f0"
+API_PASSPHRASE = "bench-passphrase"
+ENDPOINT = "/api/v1/hf/orders"
+BODY = ('{"clientOid": "5c52e11203aa677f33e493fb", "symbol": "XRP-USDT", "type": "limit", '
+        '"side": "buy", "price": "0.6444", "size": "11", "timeInForce": "GTC"}')
+
+
+def legacy_generate_signature(executor, timestamp: str, method: str, endpoint: str, body: str = "") -> tuple:
+    """Signing as done before: two thread pool round trips per request"""
+    signature_string = f"{timestamp}{method}{endpoint}{body}"
+    secret_bytes = API_SECRET.encode('utf-8')
+
+    signature_future = executor.submit(
+        lambda: base64.b64encode(
+            hmac.new(secret_bytes, signature_string.encode('utf-8'), hashlib.sha256).digest()
+        ).decode('utf-8')
+    )
+    passphrase_future = executor.submit(
+        lambda: base64.b64encode(
+            hmac.new(secret_bytes, API_PASSPHRASE.encode('utf-8'), hashlib.sha256).digest()
+        ).decode('utf-8')
+    )
+    return signature_future.result(), passphrase_future.result()
+
+
+def measure(func, iterations: int) -> list:
+    """Return per-call durations in microseconds"""
+    samples = []
+    for i in range(iterations):
+        timestamp = str(1733133600000 + i)
+        start = time.perf_counter_ns()
+        func(timestamp)
+        samples.append((time.perf_counter_ns() - start) / 1000)
+    return samples
+
+
+def summary(samples: list) -> dict:
+    ordered = sorted(samples)
+    return {
+        "median_us": round(statistics.median(ordered), 2),
+        "p99_us": round(ordered[int(len(ordered) * 0.99) - 1], 2),
+        "mean_us": round(statistics.fmean(ordered), 2),
+    }
+
+
+def main(iterations: int = 20000, burst_size: int = 12):
+    executor = ThreadPoolExecutor(max_workers=4)
+    signer = KucoinRequestSigner(API_KEY, API_SECRET, API_PASSPHRASE)
+
+    # both paths must produce identical headers
+    assert legacy_generate_signature(executor, "1", "POST", ENDPOINT, BODY) == \
+        (signer.sign("1", "POST", ENDPOINT, BODY), signer.encrypted_passphrase)
+
+    # warm up thread pool and interpreter caches
+    measure(lambda ts: legacy_generate_signature(executor, ts, "POST", ENDPOINT, BODY), 1000)
+    measure(lambda ts: signer.headers(ts, "POST", ENDPOINT, BODY), 1000)
+
+    before = summary(measure(lambda ts: legacy_generate_signature(executor, ts, "POST", ENDPOINT, BODY), iterations))
+    after = summary(measure(lambda ts: signer.headers(ts, "POST", ENDPOINT, BODY), iterations))
+    executor.shutdown()
+
+    print(f"signing cost per order ({iterations} iterations)")
+    print(f"  before (thread pool): {before}")
+    print(f"  after  (inline)     : {after}")
+    print(f"  speedup (median)    : {before['median_us'] / after['median_us']:.1f}x")
+    print(f"  {burst_size} order burst: {before['median_us'] * burst_size:.0f}us -> {after['median_us'] * burst_size:.0f}us")
+    return {"before": before, "after": after}
+
+
+if __name__ == "__main__":
+    main()
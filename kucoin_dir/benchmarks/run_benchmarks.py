@@ -0,0 +1,150 @@
+import os
+import re
+import gc
+import sys
+import json
+import time
+import platform
+import statistics
+import importlib
+import subprocess
+from datetime import datetime
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCHMARK_DIR)
+
+# Runs the benchmark suite and writes one JSON file per run, named by date and commit,
+# so hot path timings can be compared between commits.
+# run: python kucoin_dir/benchmarks/run_benchmarks.py [all | bench,bench,...] [results dir] [rounds]
+#      python kucoin_dir/benchmarks/run_benchmarks.py compare <before.json> <after.json> [threshold %]
+
+BENCHMARKS = ("bench_decoding", "bench_signing", "bench_order_path", "bench_order_book")
+DEFAULT_RESULTS_DIR = os.path.join(BENCHMARK_DIR, "results")
+# leaf keys holding a duration (ns/us/ms), the only values compare() looks at
+_TIMING_KEY = re.compile(r'(?:^|_)(?:ns|us|ms)(?:_|$)')
+
+
+def git(*args) -> str:
+    try:
+        return subprocess.run(["git", *args], cwd=BENCHMARK_DIR, capture_output=True, text=True,
+                              timeout=30).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ""
+
+
+def pin_to_one_cpu():
+    """Keep the whole run on one core so timings do not depend on where the scheduler moves it"""
+    if hasattr(os, "sched_setaffinity"):
+        cpu = max(os.sched_getaffinity(0))
+        os.sched_setaffinity(0, {cpu})
+        return cpu
+    return None
+
+
+def environment() -> dict:
+    return {
+        "commit": git("rev-parse", "HEAD"),
+        "dirty": bool(git("status", "--porcelain", "--untracked-files=no")),
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count()
+    }
+
+
+def flatten(result, prefix: str = "") -> dict:
+    """Numeric leaves as {'bench/label/key': value}"""
+    values = {}
+    if isinstance(result, dict):
+        for key, value in result.items():
+            values.update(flatten(value, f"{prefix}/{key}" if prefix else str(key)))
+    elif isinstance(result, (int, float)) and not isinstance(result, bool):
+        values[prefix] = result
+    return values
+
+
+def combine(rounds: list) -> tuple:
+    """
+    Per metric over the rounds: best (lowest) value for timings, noise only ever adds time on a
+    shared host, the median for everything else; and the spread between rounds in percent.
+    """
+    values = {}
+    for metrics in rounds:
+        for key, value in metrics.items():
+            values.setdefault(key, []).append(value)
+    combined, spread = {}, {}
+    for key, samples in values.items():
+        timing = _TIMING_KEY.search(key.rsplit("/", 1)[-1])
+        combined[key] = min(samples) if timing else statistics.median(samples)
+        if timing and combined[key]:
+            spread[key] = round((max(samples) - min(samples)) / combined[key] * 100, 1)
+    return combined, spread
+
+
+def run(names=BENCHMARKS, results_dir: str = DEFAULT_RESULTS_DIR, rounds: int = 3) -> str:
+    """Run every benchmark rounds times in this process, returns the result file"""
+    meta = environment()
+    meta["pinned_cpu"] = pin_to_one_cpu()
+    meta["rounds"] = rounds
+    benchmarks = {}
+    metrics, spread = {}, {}
+    for name in names:
+        module = importlib.import_module(name)
+        results = []
+        start = time.perf_counter()
+        for round_number in range(1, rounds + 1):
+            print(f"== {name} round {round_number}/{rounds}")
+            gc.collect()
+            results.append(module.main())
+        benchmarks[name] = {"seconds": round(time.perf_counter() - start, 2), "rounds": results}
+        combined, noise = combine([flatten(result, name) for result in results])
+        metrics.update(combined)
+        spread.update(noise)
+
+    os.makedirs(results_dir, exist_ok=True)
+    path = os.path.join(results_dir, f"{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}_{meta['commit'][:10] or 'nogit'}.json")
+    with open(path, "w") as f:
+        json.dump({"meta": meta, "metrics": metrics, "spread_pct": spread, "benchmarks": benchmarks}, f, indent=4)
+    print(f"results written to {path}")
+    return path
+
+
+def compare(before_path: str, after_path: str, threshold_pct: float = 10.0) -> list:
+    """
+    Timing metrics present in both runs, change in percent (positive = slower).
+    A change is only called when it exceeds the threshold and the round-to-round
+    spread of both runs together, smaller differences are noise.
+    """
+    with open(before_path) as f:
+        before = json.load(f)
+    with open(after_path) as f:
+        after = json.load(f)
+    rows = []
+    for key, old in before["metrics"].items():
+        new = after["metrics"].get(key)
+        if new is None or not old or not _TIMING_KEY.search(key.rsplit("/", 1)[-1]):
+            continue
+        change = (new - old) / old * 100
+        # two best-of-rounds values can each be off by their run's spread
+        noise = before.get("spread_pct", {}).get(key, 0) + after.get("spread_pct", {}).get(key, 0)
+        limit = max(threshold_pct, noise)
+        verdict = "slower" if change > limit else "faster" if change < -limit else ""
+        rows.append((key, old, new, round(change, 1), noise, verdict))
+
+    print(f"{before['meta']['commit'][:10]} -> {after['meta']['commit'][:10]} (threshold {threshold_pct}%)")
+    width = max((len(row[0]) for row in rows), default=10)
+    print(f"{'metric':<{width}} {'before':>12} {'after':>12} {'change':>9} {'noise':>7}")
+    for key, old, new, change, noise, verdict in sorted(rows, key=lambda row: -abs(row[3])):
+        print(f"{key:<{width}} {old:>12} {new:>12} {change:>+8.1f}% {noise:>6.1f}% {verdict}")
+    return rows
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "compare":
+        compare(sys.argv[2], sys.argv[3], float(sys.argv[4]) if len(sys.argv) > 4 else 10.0)
+    else:
+        run(tuple(sys.argv[1].split(",")) if len(sys.argv) > 1 and sys.argv[1] != "all" else BENCHMARKS,
+            sys.argv[2] if len(sys.argv) > 2 else DEFAULT_RESULTS_DIR,
+            int(sys.argv[3]) if len(sys.argv) > 3 else 3)
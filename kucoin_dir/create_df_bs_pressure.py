@@ -1,23 +1,38 @@
+import os
+import sys
 import pandas as pd
 import numpy as np
-import json
-from datetime import datetime, timedelta
+import re
+from datetime import datetime, timedelta, timezone
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "common"))
+from receive_time import received_datetime
+from trade_archive import TradeArchive, SIDE_BUY
+from stream_writer import load_capture
+
+_RELEASE_DIR = re.compile(r'^(\d{4}-\d{2}-\d{2})_(\d{2}-\d{2})_(.+)$')
+
+def capture_date(file_path):
+    """
+    Release date ('YYYY-MM-DD') of the folder holding a capture, None outside a release folder.
+    Legacy entries are placed on it so they line up with archives and ns timestamps.
+    """
+    match = _RELEASE_DIR.match(os.path.basename(os.path.dirname(os.path.abspath(file_path))))
+    return match.group(1) if match else None
 
 def parse_order_book_data(file_path):
     """
-    Parse order book data from the given JSON file.
+    Parse order book data from the given capture (streamed .ndjson or legacy .json).
     """
     data_list = []
-    with open(file_path, 'r') as f:
-        data = json.load(f)
+    data = load_capture(file_path)
 
     # Extract the 'data' array
     entries = data['data']
+    date = capture_date(file_path)
 
     for entry in entries:
-        timestamp = entry['time_received']  # Assuming this is the timestamp
-        # Convert timestamp string to datetime object
-        timestamp = datetime.strptime(timestamp, '%H:%M:%S.%f')
+        # integer ns receive time when present, legacy time_received string otherwise
+        timestamp = received_datetime(entry, date)
 
         # Extract bids and asks
         bids = entry.get('bids', [])  # Each bid is [price, size]
@@ -80,21 +95,25 @@ def calculate_order_book_metrics(order_book_df, N):
     metrics_df = pd.DataFrame(metrics_list)
     return metrics_df
 
-def parse_match_data(file_path):
+def parse_match_data(file_path, start_seconds=None, end_seconds=None):
     """
-    Parse match data from the given JSON file.
+    Parse match data from the given capture (.ndjson or legacy .json) or .trades archive.
+    For archives, start_seconds/end_seconds select a window relative to the
+    release without reading the rest of the file.
     """
+    if file_path.endswith('.trades'):
+        return parse_match_archive(file_path, start_seconds, end_seconds)
+
     data_list = []
-    with open(file_path, 'r') as f:
-        data = json.load(f)
+    data = load_capture(file_path)
 
     # Extract the 'data' array
     entries = data['data']
+    date = capture_date(file_path)
 
     for entry in entries:
-        timestamp = entry['time_received']  # Assuming this is the timestamp
-        # Convert timestamp string to datetime object
-        timestamp = datetime.strptime(timestamp, '%H:%M:%S.%f')
+        # integer ns receive time when present, legacy time_received string otherwise
+        timestamp = received_datetime(entry, date)
 
         price = float(entry['price'])
         size = float(entry['size'])
@@ -111,6 +130,29 @@ def parse_match_data(file_path):
     match_data_df = pd.DataFrame(data_list)
     return match_data_df
 
+def parse_match_archive(file_path, start_seconds=None, end_seconds=None):
+    """
+    Match data of a memory-mapped trade archive, optionally only a window after release.
+    """
+    archive = TradeArchive(file_path)
+    if start_seconds is None and end_seconds is None:
+        records = archive.records
+    else:
+        records = archive.window_after_release(start_seconds or 0,
+                                               end_seconds if end_seconds is not None else 10 ** 9)
+
+    # local wall clock like received_datetime
+    received = records['ts_received_ns']
+    release_seconds = archive.release_ns // 10 ** 9
+    utc_offset = datetime.fromtimestamp(release_seconds) - datetime.fromtimestamp(release_seconds, timezone.utc).replace(tzinfo=None)
+    match_data_df = pd.DataFrame({
+        'timestamp': pd.to_datetime(received, unit='ns') + utc_offset,
+        'price': np.asarray(records['price']),
+        'size': np.asarray(records['size']),
+        'side': np.where(records['side'] == SIDE_BUY, 'buy', 'sell')
+    })
+    return match_data_df
+
 def calculate_match_data_metrics(match_data_df, interval_ms):
     """
     Calculate trade volume and trade speed for the match data.
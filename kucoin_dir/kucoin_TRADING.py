@@ -13,6 +13,13 @@ import re
 from kucoin_websocket_listen_DEV import KucoinWebsocketListen
 from kucoin_match_order_strategy_V2 import MatchStrategyTrader
 from kucoin_bid_ask_order_strategy import Level2StrategyTrader
+from kucoin_order_managerV2 import KucoinHFOrderManager
+from rate_limit_scheduler import get_scheduler
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "common"))
+from exchange_clock import ExchangeClock
+from kucoin_ws_multiplexer import KucoinWebsocketMultiplexer
+from kucoin_endpoints import API_URL
+from kucoin_hedged_feed import KucoinHedgedFeed
 from kucoin.exceptions import KucoinAPIException
 import requests
 
@@ -29,10 +36,15 @@ logger.propagate = False
 
 
 LOCK_FILE = '/tmp/kucoin_TRADING_ws.lock'
+# independent sockets carrying the match feed of a listing, 1 uses the shared multiplexer,
+# set it above 1 to hedge the feed over several connections
+HEDGED_MATCH_CONNECTIONS = 1
 
 # # kucoin trading 
 # 1,16,31,46 * * * * /root/trading_systems/tradingvenv/bin/python /root/trading_systems/kucoin_dir/kucoin_TRADING.py >> /root/trading_systems/kucoin_dir/cronlogs/kucoin_TRADING.log 2>&1
 async def main():
+    clock = None
+    multiplexer = None
     try:
         lock_file = acquire_lock()
         directory = '/root/trading_systems/kucoin_dir/new_pair_data_kucoin'
@@ -51,14 +63,20 @@ async def main():
             }
         ]
 
+        # release times are exchange time, measure how far the local clock is off
+        clock = ExchangeClock("kucoin")
+        await clock.sync()
+        # match and level2 feeds of all pairs share one public socket
+        multiplexer = KucoinWebsocketMultiplexer()
+
         if not testing:
             pairs_close_to_release = check_if_releases_are_due(directory)
             
             tasks_to_execute = []
             for new_pair_dict in pairs_close_to_release:
                 logger.info(token_info(new_pair_dict))
-                tasks_to_execute.append(asyncio.create_task(execution_match(new_pair_dict)))
-                tasks_to_execute.append(asyncio.create_task(execution_level2(new_pair_dict)))
+                tasks_to_execute.append(asyncio.create_task(execution_match(new_pair_dict, clock, multiplexer)))
+                tasks_to_execute.append(asyncio.create_task(execution_level2(new_pair_dict, clock, multiplexer)))
             
             await asyncio.gather(*tasks_to_execute)
         
@@ -66,13 +84,19 @@ async def main():
             tasks_to_execute = []
             for new_pair_dict in testing_pairs:
                 logger.info(token_info(new_pair_dict))
-                tasks_to_execute.append(asyncio.create_task(execution_match(new_pair_dict)))
-                #tasks_to_execute.append(asyncio.create_task(execution_level2(new_pair_dict)))
+                tasks_to_execute.append(asyncio.create_task(execution_match(new_pair_dict, clock, multiplexer)))
+                #tasks_to_execute.append(asyncio.create_task(execution_level2(new_pair_dict, clock, multiplexer)))
             
             await asyncio.gather(*tasks_to_execute)
 
     finally:
         # Synchronous operations after all async tasks are completed
+        rate_limiter = get_scheduler("kucoin", KucoinHFOrderManager.RATE_LIMIT_CAPACITY, KucoinHFOrderManager.RATE_LIMIT_INTERVAL)
+        logger.info(f"rate limit metrics: {rate_limiter.metrics()}")
+        if clock is not None:
+            logger.info(f"release triggers: {clock.trigger_log}")
+        if multiplexer is not None:
+            await multiplexer.close()
         release_lock(lock_file)
         print(f'{datetime.now()} script finished V5')
         
@@ -82,19 +106,22 @@ async def main():
 
 
 
-async def execution_level2(new_pair_dict):
+async def execution_level2(new_pair_dict, clock: ExchangeClock = None, multiplexer: KucoinWebsocketMultiplexer = None):
     logger.debug("Starting script")
     price_increase_buy = 3 #steps to increase the price to buy
     price_increase_sell = 2 # fixed increae for all sell orders
     
     number_of_orders_buy = 3
     number_of_orders_sell = 12
+    num_connections = 4 # warm keep-alive sockets opened at T-30s
     
     path_to_save_level2 = '/root/trading_systems/kucoin_dir/kucoin_trading_data_LEVEL2'
 
     api_creds = load_credetials()
     basecoin, release_date_time, datetime_to_listing_seconds = prepare_for_listing(new_pair_dict)
-    await asyncio.sleep(datetime_to_listing_seconds-30)
+    clock = clock or ExchangeClock("kucoin")
+    # wake at T-30s exchange time, not local time
+    await clock.wait_until(release_date_time - timedelta(seconds=30), label=f"level2 {basecoin} T-30s")
     logger.info(f"execution LEVEL2 {(basecoin)}")
 
     try:
@@ -103,29 +130,32 @@ async def execution_level2(new_pair_dict):
                 api_creds['api_secret'], 
                 api_creds['api_passphrase'])
 
-        ws_levels2 = KucoinWebsocketListen(symbol, KucoinWebsocketListen.CHANNEL_LEVEL2)
+        ws_levels2 = KucoinWebsocketListen(symbol, KucoinWebsocketListen.CHANNEL_LEVEL2, multiplexer=multiplexer)
         run_match = asyncio.create_task(ws_levels2.start())
+        # open keep-alive sockets to the REST host so the first order skips DNS/TCP/TLS setup
+        await strategy.trading_client.warm_up_connections(num_connections)
+        # expiry of the cancelAfter buy orders is checked on the private order channel, REST is the fallback
+        try:
+            await strategy.trading_client.start_order_tracker()
+        except Exception as e:
+            logger.error(f"order tracker unavailable, falling back to REST: {e}")
 
         try:
-            end_time = datetime.now() + timedelta(minutes=2)
-            
-            while datetime.now() < end_time:
-                market_data = await ws_levels2.get_data()
-                
-                if market_data:
-                    #print(json.dumps(market_data,indent =4))
-                    buy_result = await strategy.buy_first_ask_found(number_of_orders_buy, market_data,price_increase_buy )
-                    if buy_result:
-                        #print(json.dumps(strategy.trade_data,indent=4))
-                        break
-
-                await asyncio.sleep(0.00001)
+            # wakes on each message instead of polling, ends after 2 minutes
+            async for market_data in ws_levels2.stream(duration=120):
+                strategy.trading_client.stop_keep_alive()
+                #print(json.dumps(market_data,indent =4))
+                buy_result = await strategy.buy_first_ask_found(number_of_orders_buy, market_data,price_increase_buy )
+                if buy_result:
+                    #print(json.dumps(strategy.trade_data,indent=4))
+                    break
         except asyncio.TimeoutError:
             logger.info('No data in queue')
                             
 
         finally:
             # Save trading data and cleanup
+            logger.info(f"level2 connection reuse {basecoin}: {strategy.trading_client.connection_report()}")
             strategy.save_trading_data(path_to_save_level2)
             await ws_levels2.cleanup()
             await strategy.close_client()
@@ -142,19 +172,22 @@ async def execution_level2(new_pair_dict):
 
 
 
-async def execution_match(new_pair_dict):
+async def execution_match(new_pair_dict, clock: ExchangeClock = None, multiplexer: KucoinWebsocketMultiplexer = None):
     price_increase_buy = 1.5 #steps to increase the price to buy
     price_increase_sell = 2 # fixed increae for all sell orders
 
     num_orders_buy = 6
     #double execution of sell orders because no selling logic in level 2 
     num_orders_sell = 12
+    num_connections = 6 # warm keep-alive sockets opened at T-30s
     
     path_to_save_match = '/root/trading_systems/kucoin_dir/kucoin_trading_data_MATCH'
     api_creds = load_credetials()
     basecoin, release_date_time, datetime_to_listing_seconds = prepare_for_listing(new_pair_dict)
     logger.info(f"execution MATCH {(basecoin)}")
-    await asyncio.sleep(datetime_to_listing_seconds-30)
+    clock = clock or ExchangeClock("kucoin")
+    # wake at T-30s exchange time, not local time
+    await clock.wait_until(release_date_time - timedelta(seconds=30), label=f"match {basecoin} T-30s")
 
 
     try:
@@ -163,31 +196,41 @@ async def execution_match(new_pair_dict):
                 api_creds['api_secret'], 
                 api_creds['api_passphrase'])
 
-        ws_match = KucoinWebsocketListen(symbol, KucoinWebsocketListen.CHANNEL_MATCH)
+        match_fields = ('price', 'side', 'size', 'makerOrderId', 'sequence')
+        if HEDGED_MATCH_CONNECTIONS > 1:
+            # first arrival over several sockets, a stalled one does not blind the strategy
+            ws_match = KucoinHedgedFeed(symbol, KucoinWebsocketListen.CHANNEL_MATCH,
+                                        connections=HEDGED_MATCH_CONNECTIONS, fields=match_fields)
+        else:
+            ws_match = KucoinWebsocketListen(symbol, KucoinWebsocketListen.CHANNEL_MATCH, multiplexer=multiplexer,
+                                             fields=match_fields)
         run_match = asyncio.create_task(ws_match.start())
+        # open keep-alive sockets to the REST host so the first order skips DNS/TCP/TLS setup
+        await strategy.trading_client.warm_up_connections(num_connections)
+        # fills are pushed over the private order channel, polling is only the fallback
+        try:
+            await strategy.trading_client.start_order_tracker()
+        except Exception as e:
+            logger.error(f"order tracker unavailable, falling back to polling: {e}")
 
         try:
-            end_time = datetime.now() + timedelta(minutes=5)
-            
-            while datetime.now() < end_time:
-                market_data = await ws_match.get_data()
-                
-                if market_data:
-                    strategy_result = await strategy.strategy(num_orders_buy, 
-                                                                num_orders_sell, 
-                                                                market_data, 
-                                                                price_increase_sell,
-                                                                price_increase_buy)
-                    if strategy_result:
-                        break
-
-                await asyncio.sleep(0.0001)
+            # wakes on each message instead of polling, ends after 5 minutes
+            async for market_data in ws_match.stream(duration=300):
+                strategy.trading_client.stop_keep_alive()
+                strategy_result = await strategy.strategy(num_orders_buy, 
+                                                            num_orders_sell, 
+                                                            market_data, 
+                                                            price_increase_sell,
+                                                            price_increase_buy)
+                if strategy_result:
+                    break
         except asyncio.TimeoutError:
             logger.info('No data in queue')
                 
 
         finally:
             # Save trading data and cleanup
+            logger.info(f"match connection reuse {basecoin}: {strategy.trading_client.connection_report()}")
             strategy.save_trading_data(path_to_save_match)
             await ws_match.cleanup()
             await strategy.close_client()
@@ -245,7 +288,7 @@ def token_info(new_pair_dict):
         basecoin, release_date_time, datetime_to_listing_seconds = prepare_for_listing(new_pair_dict)
 
         # Define the API endpoint
-        url = 'https://api.kucoin.com/api/v1/symbols'
+        url = f'{API_URL}/api/v1/symbols'
 
         # Send a GET request to the endpoint
         response = requests.get(url)
@@ -0,0 +1,470 @@
+import bisect
+import glob
+import logging
+import os
+import random
+import re
+import sys
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+import orjson
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "common"))
+from stream_writer import capture_entries
+from receive_time import received_ns
+from kucoin_match_order_strategy_V2 import MatchStrategyTrader
+from kucoin_bid_ask_order_strategy import Level2StrategyTrader
+
+# Configure logging
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+console_handler = logging.StreamHandler()
+formatter = logging.Formatter('%(asctime)s.%(msecs)03d - %(levelname)s - %(message)s - %(funcName)s', datefmt='%H:%M:%S')
+console_handler.setFormatter(formatter)
+logger.addHandler(console_handler)
+logger.propagate = False
+
+STRATEGY_MATCH = "match"
+STRATEGY_LEVEL2 = "level2"
+
+# the live settings of kucoin_TRADING.execution_match / execution_level2
+MATCH_PARAMS = {"num_orders_buy": 6, "percentage_diff_buy": 1.5, "num_orders_sell": 12,
+                "percentage_diff_sell": 2, "buy_order_ttl": 4}
+LEVEL2_PARAMS = {"num_orders_buy": 3, "percentage_diff_buy": 3, "wait_to_delete_orders": 5}
+
+_RELEASE_DIR = re.compile(r'^(\d{4}-\d{2}-\d{2})_(\d{2}-\d{2})_(.+)$')
+_SECOND = 1_000_000_000
+
+
+class AckLatency:
+    """
+    Order acknowledgement latency: lognormal around median_ms, or drawn from
+    recorded samples (e.g. the placement phase of a latency_report()).
+    """
+
+    def __init__(self, median_ms: float = 40.0, sigma: float = 0.35, samples_ms: Optional[List[float]] = None):
+        self.median_ms = median_ms
+        self.sigma = sigma
+        self.samples_ms = list(samples_ms) if samples_ms else None
+
+    def sample_ns(self, rng: random.Random) -> int:
+        if self.samples_ms:
+            return int(rng.choice(self.samples_ms) * 1e6)
+        return int(self.median_ms * rng.lognormvariate(0, self.sigma) * 1e6)
+
+
+class SessionData:
+    """Trades, level2 increments and depth5 snapshots of one release folder, on the receive-time clock"""
+
+    def __init__(self, session_dir: str):
+        match = _RELEASE_DIR.match(os.path.basename(os.path.normpath(session_dir)))
+        if not match:
+            raise ValueError(f"{session_dir} is not a <date>_<HH-MM>_<SYMBOL> session folder")
+        date, hour_minute, self.symbol = match.groups()
+        self.session_dir = session_dir
+        self.release_ns = int(datetime.strptime(f"{date} {hour_minute}", '%Y-%m-%d %H-%M').timestamp()) * _SECOND
+
+        # (receive ns, price, size, taker side)
+        self.trades = [(t, float(e['price']), float(e['size']), e['side'])
+                       for t, e in self._load(date, "match")]
+        self.level2 = [(t, e['changes']) for t, e in self._load(date, "level2")]
+        depth = self._load(date, "level2Depth5")
+        self.depth_ns = [t for t, _ in depth]
+        self.depth = [({float(p): float(s) for p, s in e['bids']}, {float(p): float(s) for p, s in e['asks']})
+                      for _, e in depth]
+
+    def _load(self, date: str, channel: str) -> List[Tuple[int, Dict[str, Any]]]:
+        paths = glob.glob(os.path.join(self.session_dir, f"{self.symbol}_{channel}_data.*json"))
+        if not paths:
+            return []
+        events = []
+        for entry in capture_entries(sorted(paths)[-1]):
+            received = received_ns(entry, date)
+            if received is not None:
+                events.append((received, entry))
+        events.sort(key=lambda event: event[0])
+        return events
+
+    def book_levels(self, side: str, at_ns: int) -> Tuple[int, List[Tuple[float, float]]]:
+        """Latest depth5 snapshot index and the levels an order of side can take, best first"""
+        index = bisect.bisect_right(self.depth_ns, at_ns) - 1
+        if index < 0:
+            return index, []
+        bids, asks = self.depth[index]
+        return index, sorted(asks.items()) if side == "buy" else sorted(bids.items(), reverse=True)
+
+    def resting_size(self, side: str, price: float, at_ns: int) -> float:
+        """Displayed size at price on the book side of an order, from the latest depth5 snapshot"""
+        index = bisect.bisect_right(self.depth_ns, at_ns) - 1
+        if index < 0:
+            return 0.0
+        bids, asks = self.depth[index]
+        return (bids if side == "buy" else asks).get(price, 0.0)
+
+
+class SimOrder:
+    __slots__ = ("side", "price", "size", "live_ns", "expire_ns", "taker", "queue_ahead", "filled", "status")
+
+    def __init__(self, side: str, price: float, size: float, live_ns: int, expire_ns: Optional[int]):
+        self.side = side
+        self.price = price
+        self.size = size
+        self.live_ns = live_ns
+        self.expire_ns = expire_ns
+        self.taker = False
+        self.queue_ahead = 0.0
+        self.filled = 0.0
+        self.status = "pending"  # pending -> open -> filled / expired / rejected
+
+
+class FillSimulator:
+    """
+    Fills orders against the recorded trades.
+
+    An order goes live after its ack latency. A buy limit at or above the last
+    trade is marketable: it sweeps the depth5 asks within its limit, then
+    takes the volume of buy-side trades priced at or below it. Otherwise it
+    rests behind the depth5 size shown at its price and fills from sell-side
+    trades once that queue is consumed (a trade through the limit fills it
+    outright). Sells mirror this. Book and trade volume are shared by our
+    orders, so a ladder cannot fill more than was traded or shown.
+    Sells are rejected without the base balance, as the exchange would.
+    """
+
+    def __init__(self, session: SessionData, taker_fee: float = 0.001, maker_fee: float = 0.001):
+        self.session = session
+        self.taker_fee = taker_fee
+        self.maker_fee = maker_fee
+        self.pending: List[SimOrder] = []
+        self.open: List[SimOrder] = []
+        self.orders: List[SimOrder] = []
+        self.last_price: Optional[float] = None
+        self.position = 0.0
+        self.cash = 0.0
+        self.fees = 0.0
+        self.bought = 0.0
+        self.sold = 0.0
+        self.buy_notional = 0.0
+        # (snapshot index, price) -> size already taken by our marketable orders
+        self._swept: Dict[Tuple[int, float], float] = {}
+
+    def submit(self, side: str, price: float, size: float, live_ns: int, expire_ns: Optional[int] = None):
+        order = SimOrder(side, price, size, live_ns, expire_ns)
+        self.orders.append(order)
+        self.pending.append(order)
+
+    def cancel_open(self, side: str, at_ns: int):
+        """Cancel of every open order of one side taking effect at at_ns"""
+        for order in self.pending + self.open:
+            if order.side == side and (order.expire_ns is None or order.expire_ns > at_ns):
+                order.expire_ns = at_ns
+
+    def _activate(self, now_ns: int):
+        still_pending = []
+        for order in self.pending:
+            if order.live_ns > now_ns:
+                still_pending.append(order)
+                continue
+            if order.expire_ns is not None and order.expire_ns <= order.live_ns:
+                order.status = "expired"
+                continue
+            if order.side == "sell" and order.size > self.position - self._reserved_sells() + 1e-12:
+                order.status = "rejected"
+                continue
+            order.status = "open"
+            last = self.last_price
+            if last is not None and (order.price >= last if order.side == "buy" else order.price <= last):
+                order.taker = True
+                self._sweep(order)
+                if order.status == "filled":
+                    continue
+            else:
+                order.queue_ahead = self.session.resting_size(order.side, order.price, order.live_ns)
+            self.open.append(order)
+        self.pending = still_pending
+
+    def _sweep(self, order: SimOrder):
+        index, levels = self.session.book_levels(order.side, order.live_ns)
+        for price, size in levels:
+            if (price > order.price) if order.side == "buy" else (price < order.price):
+                break
+            available = size - self._swept.get((index, price), 0.0)
+            if available <= 0:
+                continue
+            filled = min(order.size - order.filled, available)
+            self._swept[(index, price)] = self._swept.get((index, price), 0.0) + filled
+            self._fill(order, price, filled)
+            if order.status == "filled":
+                return
+
+    def _reserved_sells(self) -> float:
+        return sum(order.size - order.filled for order in self.open if order.side == "sell")
+
+    def _fill(self, order: SimOrder, price: float, size: float):
+        fee_rate = self.taker_fee if order.taker else self.maker_fee
+        notional = price * size
+        fee = notional * fee_rate
+        order.filled += size
+        self.fees += fee
+        if order.side == "buy":
+            self.position += size
+            self.cash -= notional + fee
+            self.bought += size
+            self.buy_notional += notional
+        else:
+            self.position -= size
+            self.cash += notional - fee
+            self.sold += size
+        if order.size - order.filled <= 1e-12:
+            order.status = "filled"
+
+    def on_trade(self, t_ns: int, price: float, size: float, taker_side: str):
+        if self.pending:
+            self._activate(t_ns)
+        if self.open:
+            available = size
+            for order in self.open:
+                if order.expire_ns is not None and order.expire_ns <= t_ns:
+                    order.status = "expired"
+                    continue
+                if available <= 0:
+                    continue
+                remaining = order.size - order.filled
+                buy = order.side == "buy"
+                if order.taker:
+                    # liquidity on the other side, priced within our limit
+                    if taker_side == order.side and (price <= order.price if buy else price >= order.price):
+                        filled = min(remaining, available)
+                        self._fill(order, price, filled)
+                        available -= filled
+                    continue
+                if taker_side == order.side:
+                    continue
+                if price == order.price:
+                    consumed = min(order.queue_ahead, available)
+                    order.queue_ahead -= consumed
+                    available -= consumed
+                    if available <= 0:
+                        continue
+                elif (price > order.price) if buy else (price < order.price):
+                    continue
+                filled = min(remaining, available)
+                self._fill(order, order.price, filled)
+                available -= filled
+            self.open = [order for order in self.open if order.status == "open"]
+        self.last_price = price
+
+    def result(self) -> Dict[str, Any]:
+        equity = self.cash + self.position * (self.last_price or 0.0)
+        statuses = {}
+        for order in self.orders:
+            key = f"{order.side}_{order.status}"
+            statuses[key] = statuses.get(key, 0) + 1
+        return {
+            "pnl": equity,
+            "return_pct": equity / self.buy_notional * 100 if self.buy_notional else 0.0,
+            "bought": self.bought,
+            "sold": self.sold,
+            "position": self.position,
+            "buy_notional": self.buy_notional,
+            "fees": self.fees,
+            "last_price": self.last_price,
+            "orders": statuses
+        }
+
+
+def _ladder(base_price: float, num_orders: int, percentage_difference: float, decimals: int) -> List[float]:
+    """Prices of the strategies' multiple_*_orders_percent_dif ladders"""
+    return [round(base_price * (1 + ((i + 1) * percentage_difference / 100)), decimals) for i in range(num_orders)]
+
+
+def simulate_match(session: SessionData, params: Dict[str, Any], ack: AckLatency, rng: random.Random,
+                   fees: Tuple[float, float] = (0.001, 0.001), horizon_ns: Optional[int] = None) -> Dict[str, Any]:
+    """MatchStrategyTrader.strategy over one session: buy ladder on the first match, sell ladder after 5 sells"""
+    sim = FillSimulator(session, *fees)
+    ttl = params.get("buy_order_ttl")
+    busy_until = 0  # the live loop awaits each placement before reading the next message
+    first_buy = None
+    sell_counter = 0
+    decision = {}
+    for t_ns, price, size, side in session.trades:
+        if horizon_ns is not None and t_ns > horizon_ns:
+            break
+        sim.on_trade(t_ns, price, size, side)
+        if decision.get("sell_ns") is not None:
+            continue
+        now = max(t_ns, busy_until)
+        if first_buy is None:
+            # buy_if_makerOrderId: public matches always carry a makerOrderId
+            first_buy = price
+            # the live sizing table, self is not used
+            sizing = MatchStrategyTrader.order_size_and_rounding(None, price)
+            if sizing is None:
+                return dict(sim.result(), error=f"no order size for price {price}")
+            order_size, decimals = sizing
+            live = now + ack.sample_ns(rng)
+            for buy_price in _ladder(price, params["num_orders_buy"], params["percentage_diff_buy"], decimals):
+                sim.submit("buy", buy_price, float(order_size), live,
+                           live + int(ttl * _SECOND) if ttl else None)
+            # delete_unfilled_orders fallback: cancel all ttl + 1 s after placement
+            sim.cancel_open("buy", live + int(((ttl or 0) + 1) * _SECOND) + ack.sample_ns(rng))
+            busy_until = live
+            decision["buy_ns"] = now
+        # sell_on_5_sell_in_a_row, the trigger message itself counts
+        sell_counter = sell_counter + 1 if side == "sell" else 0 if side == "buy" else sell_counter
+        if sell_counter == 5:
+            order_size, decimals = MatchStrategyTrader.order_size_and_rounding(None, price) or sizing
+            sell_price = round(price * (1 + params["percentage_diff_sell"] / 100), decimals)
+            live = now + ack.sample_ns(rng)
+            for _ in range(params["num_orders_sell"]):
+                sim.submit("sell", sell_price, float(order_size), live)
+            decision["sell_ns"] = now
+    result = sim.result()
+    result.update({f"{key}_after_release_ms": round((value - session.release_ns) / 1e6, 1)
+                   for key, value in decision.items()})
+    return result
+
+
+def simulate_level2(session: SessionData, params: Dict[str, Any], ack: AckLatency, rng: random.Random,
+                    fees: Tuple[float, float] = (0.001, 0.001), horizon_ns: Optional[int] = None) -> Dict[str, Any]:
+    """Level2StrategyTrader.buy_first_ask_found over one session: one buy ladder, no sells"""
+    sim = FillSimulator(session, *fees)
+    wait = params.get("wait_to_delete_orders", 5)
+    entry_ns = entry_price = None
+    for t_ns, changes in session.level2:
+        for ask in changes['asks']:
+            if float(ask[1]) > 0:
+                entry_price = float(ask[0])
+        if entry_price is not None:
+            entry_ns = t_ns
+            break
+
+    sizing = Level2StrategyTrader.order_size_and_rounding(None, entry_price) if entry_ns is not None else None
+    if entry_ns is not None and sizing is None:
+        return dict(sim.result(), error=f"no order size for price {entry_price}")
+    if sizing is not None:
+        order_size, decimals = sizing
+        live = entry_ns + ack.sample_ns(rng)
+        for buy_price in _ladder(entry_price, params["num_orders_buy"], params["percentage_diff_buy"], decimals):
+            sim.submit("buy", buy_price, float(order_size), live, live + int(wait * _SECOND))
+        sim.cancel_open("buy", live + int((wait + 1) * _SECOND) + ack.sample_ns(rng))
+
+    for t_ns, price, size, side in session.trades:
+        if horizon_ns is not None and t_ns > horizon_ns:
+            break
+        sim.on_trade(t_ns, price, size, side)
+    result = sim.result()
+    if entry_ns is not None:
+        result["buy_ns_after_release_ms"] = round((entry_ns - session.release_ns) / 1e6, 1)
+    return result
+
+
+def params_label(params: Dict[str, Any]) -> str:
+    return ",".join(f"{key}={value}" for key, value in sorted(params.items()))
+
+
+def _run_session(session_dir: str, strategy: str, param_grid: List[Dict[str, Any]], ack: AckLatency,
+                 fees: Tuple[float, float], horizon_seconds: Optional[float], seed: int) -> List[Dict[str, Any]]:
+    """Every parameter set over one session, in a worker process; the session is loaded once"""
+    session = SessionData(session_dir)
+    horizon_ns = session.release_ns + int(horizon_seconds * _SECOND) if horizon_seconds is not None else None
+    simulate = simulate_level2 if strategy == STRATEGY_LEVEL2 else simulate_match
+    rows = []
+    for params in param_grid:
+        label = params_label(params)
+        # the same latency draws for a session/parameter set in every run
+        rng = random.Random(zlib.crc32(f"{seed}:{session_dir}:{label}".encode()))
+        row = simulate(session, params, ack, rng, fees, horizon_ns)
+        row.update({"session": os.path.basename(os.path.normpath(session_dir)), "symbol": session.symbol,
+                    "params": label})
+        rows.append(row)
+    return rows
+
+
+def _aggregate(rows: List[Dict[str, Any]], key: str) -> Dict[str, Dict[str, Any]]:
+    groups: Dict[str, Dict[str, Any]] = {}
+    for row in rows:
+        group = groups.setdefault(row[key], {"runs": 0, "traded": 0, "pnl": 0.0, "wins": 0, "buy_notional": 0.0,
+                                             "fees": 0.0, "worst_pnl": None})
+        group["runs"] += 1
+        group["pnl"] += row["pnl"]
+        group["fees"] += row["fees"]
+        group["buy_notional"] += row["buy_notional"]
+        if row["bought"] > 0:
+            group["traded"] += 1
+            group["wins"] += row["pnl"] > 0
+        if group["worst_pnl"] is None or row["pnl"] < group["worst_pnl"]:
+            group["worst_pnl"] = row["pnl"]
+    for group in groups.values():
+        group["win_rate"] = round(group["wins"] / group["traded"], 3) if group["traded"] else None
+        group["return_pct"] = group["pnl"] / group["buy_notional"] * 100 if group["buy_notional"] else 0.0
+    return groups
+
+
+def session_dirs(*archive_dirs: str) -> List[str]:
+    """Release folders of one or more archives"""
+    return sorted(os.path.join(archive_dir, name) for archive_dir in archive_dirs
+                  for name in os.listdir(archive_dir) if _RELEASE_DIR.match(name))
+
+
+def run_backtest(sessions: List[str], param_grid: Optional[List[Dict[str, Any]]] = None,
+                 strategy: str = STRATEGY_MATCH, ack: Optional[AckLatency] = None,
+                 fees: Tuple[float, float] = (0.001, 0.001), horizon_seconds: Optional[float] = None,
+                 workers: Optional[int] = None, seed: int = 0) -> Dict[str, Any]:
+    """
+    Every parameter set over every session on a process pool, one task per session.
+    Returns the per-run rows and PnL aggregated per session and per parameter set.
+    """
+    if param_grid is None:
+        param_grid = [LEVEL2_PARAMS if strategy == STRATEGY_LEVEL2 else MATCH_PARAMS]
+    ack = ack or AckLatency()
+    started = time.monotonic()
+    rows = []
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        futures = {pool.submit(_run_session, session_dir, strategy, param_grid, ack, fees, horizon_seconds, seed):
+                   session_dir for session_dir in sessions}
+        for future in as_completed(futures):
+            try:
+                rows.extend(future.result())
+            except Exception as e:
+                logger.error(f"Backtest of {futures[future]} failed: {e}")
+    elapsed = time.monotonic() - started
+    logger.info(f"Backtested {len(sessions)} sessions x {len(param_grid)} parameter sets "
+                f"({len(rows)} runs) in {elapsed:.1f}s")
+    return {
+        "strategy": strategy,
+        "elapsed_s": round(elapsed, 2),
+        "runs": rows,
+        "by_session": _aggregate(rows, "session"),
+        "by_params": _aggregate(rows, "params")
+    }
+
+
+def parameter_grid(base: Dict[str, Any], **choices: List[Any]) -> List[Dict[str, Any]]:
+    """Cartesian product of choices over base, e.g. parameter_grid(MATCH_PARAMS, num_orders_buy=[3, 6])"""
+    grid = [dict(base)]
+    for key, values in choices.items():
+        grid = [dict(params, **{key: value}) for params in grid for value in values]
+    return grid
+
+
+def save_results(results: Dict[str, Any], path: str):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(orjson.dumps(results, option=orjson.OPT_INDENT_2))
+
+
+if __name__ == "__main__":
+    # python kucoin_backtest.py <archive dir>[,<archive dir>] [match|level2] [results.json]
+    #   python kucoin_backtest.py kucoin_release_data_initial,kucoin_relisting_data_relisting match
+    strategy = sys.argv[2] if len(sys.argv) > 2 else STRATEGY_MATCH
+    base = LEVEL2_PARAMS if strategy == STRATEGY_LEVEL2 else MATCH_PARAMS
+    grid = parameter_grid(base, num_orders_buy=[3, 6, 9], percentage_diff_buy=[0.5, 1.5, 3])
+    results = run_backtest(session_dirs(*sys.argv[1].split(",")), grid, strategy)
+    for label, group in sorted(results["by_params"].items(), key=lambda item: -item[1]["pnl"]):
+        logger.info(f"{label}: pnl {group['pnl']:.2f} USDT, return {group['return_pct']:.2f}%, "
+                    f"win rate {group['win_rate']}, traded {group['traded']}/{group['runs']}")
+    if len(sys.argv) > 3:
+        save_results(results, sys.argv[3])
@@ -1,10 +1,13 @@
+import os
+import sys
 import asyncio
 import json
 from datetime import datetime
 import logging
-from typing import Dict, List
+from typing import Dict, List, Optional
 from kucoin_order_managerV2 import KucoinHFOrderManager
-import os
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "common"))
+from receive_time import select_fields
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
@@ -15,8 +18,10 @@ logger.addHandler(console_handler)
 logger.propagate = False
 
 class Level2StrategyTrader:
-    def __init__(self, symbol: str, api_key: str, api_secret: str, api_passphrase: str):
+    def __init__(self, symbol: str, api_key: str, api_secret: str, api_passphrase: str, batch_orders: bool = True):
         self.trading_client = KucoinHFOrderManager(api_key, api_secret, api_passphrase)
+        # pack order ladders into HF multi-order requests instead of one request per order
+        self.batch_orders = batch_orders
         self.symbol = symbol + "-USDT"
         
         # Essential state tracking
@@ -40,7 +45,8 @@ class Level2StrategyTrader:
         }
 
     async def multiple_buy_orders_percent_dif(self, base_price: float, num_orders: int, 
-                                            percentage_difference: float, time_in_force: str = "GTC") -> List[Dict]:
+                                            percentage_difference: float, time_in_force: str = "GTC",
+                                            cancel_after: Optional[int] = None) -> List[Dict]:
         size, decimal_to_round = self.order_size_and_rounding(base_price)
         
         prices = [
@@ -54,12 +60,13 @@ class Level2StrategyTrader:
                 "side": "buy",
                 "price": str(round(float(price), decimal_to_round)),
                 "size": str(size),
-                "time_in_force": time_in_force
+                "time_in_force": time_in_force,
+                "cancel_after": cancel_after
             }
             for price in prices
         ]
 
-        return await self.trading_client.place_multiple_orders(orders)
+        return await self.trading_client.place_multiple_orders(orders, batch=self.batch_orders)
 
     async def multiple_sell_orders_percent_dif(self, base_price: float, num_orders: int, 
                                              percentage_difference: float, time_in_force: str = "GTC") -> List[Dict]:
@@ -81,7 +88,7 @@ class Level2StrategyTrader:
             for price in prices
         ]
 
-        return await self.trading_client.place_multiple_orders(orders)
+        return await self.trading_client.place_multiple_orders(orders, batch=self.batch_orders)
 
 
 
@@ -97,7 +104,7 @@ class Level2StrategyTrader:
             )
             tasks.append(('first_group', first_sell_task))
             self.trade_data["sell_orders"]["first_group"] = {
-                "trigger_data": {k: market_data[k] for k in ['price', 'side', 'time_received']}
+                "trigger_data": select_fields(market_data, ['price', 'side', 'time_received'])
                 # "orders" will be added after the task completes
             }
             
@@ -107,7 +114,7 @@ class Level2StrategyTrader:
             )
             tasks.append(('second_group', second_sell_task))
             self.trade_data["sell_orders"]["second_group"] = {
-                "trigger_data": {k: market_data[k] for k in ['price', 'side', 'time_received']}
+                "trigger_data": select_fields(market_data, ['price', 'side', 'time_received'])
                 # "orders" will be added after the task completes
             }
             self.second_sell_order_placed = True
@@ -132,6 +139,8 @@ class Level2StrategyTrader:
 
         full_path = os.path.join(path_to_save, filename)
         self.trade_data["trading_session"]["end_time"] = datetime.now().isoformat()
+        # per-endpoint request phase histograms, comparable across runs
+        self.trade_data["request_latency"] = self.trading_client.latency_report()
         
         with open(full_path, 'w') as f:
             json.dump(self.trade_data, f, indent=4)
@@ -175,7 +184,8 @@ class Level2StrategyTrader:
                 self.ask_trade_entry_price = ask[0]
     
         if self.ask_trade_entry_price:
-            buy_result_ask = await self.multiple_buy_orders_percent_dif(self.ask_trade_entry_price, num_orders, percentage_difference)
+            buy_result_ask = await self.multiple_buy_orders_percent_dif(self.ask_trade_entry_price, num_orders, percentage_difference,
+                                                                        cancel_after=wait_to_delete_orders)
             logger.info(f"{len(buy_result_ask)} buy orders sent for {self.symbol}")
             await self.delete_unfilled_orders(wait_to_delete_orders,buy_result_ask)
             self.trade_data['buy_orders']['trigger_data'] = market_data
@@ -202,14 +212,15 @@ class Level2StrategyTrader:
                 
             
     async def delete_unfilled_orders(self, seconds_delay:int,buy_result:List[Dict]):
-        '''delete unfilled ordered with time delay from creation'''
-        await asyncio.sleep(seconds_delay)
-        deleted_orders = []
-        for result in buy_result:
-            if result['success'] == True:
-                deleted_orders.append(result['orderId'])
-                await self.trading_client.cancel_order_by_id(result['orderId'])
-        logger.info(f"attempt to delete {len(deleted_orders)} orders for {self.symbol} if not filled else nothing to deleted")
+        '''fallback for orders placed with cancelAfter, cancels the buys the exchange did not expire'''
+        await asyncio.sleep(seconds_delay + 1)
+        still_open = await self.trading_client.unexpired_orders(buy_result)
+        if not still_open:
+            logger.info(f"buy orders for {self.symbol} expired by exchange, nothing to delete")
+            return
+        # by id, the match strategy trades the same symbol with the same account
+        logger.info(f"{len(still_open)} buy orders for {self.symbol} still open after ttl, cancel by id")
+        await self.trading_client.cancel_orders(still_open)
 
 
 
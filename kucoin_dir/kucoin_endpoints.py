@@ -0,0 +1,7 @@
+import os
+
+# KuCoin REST host and public websocket server. Both can be pointed elsewhere through the
+# environment, e.g. at kucoin_mock_exchange for end-to-end runs without the real exchange:
+#   KUCOIN_API_URL=http://127.0.0.1:8765 KUCOIN_WS_ENDPOINT=ws://127.0.0.1:8765/endpoint python kucoin_TRADING.py
+API_URL = os.environ.get("KUCOIN_API_URL", "https://api.kucoin.com").rstrip('/')
+WS_ENDPOINT = os.environ.get("KUCOIN_WS_ENDPOINT", "wss://ws-api-spot.kucoin.com/")
@@ -0,0 +1,221 @@
+import os
+import sys
+import asyncio
+import aiohttp
+import orjson
+import logging
+import time
+from collections import OrderedDict
+from functools import partial
+from typing import Dict, Any, Optional, Callable, List, AsyncIterator, Hashable
+from kucoin_websocket_listen_DEV import KucoinWebsocketListen, DEFAULT_WS_ENDPOINT
+from ring_buffer import RingBuffer, POLICY_DROP_OLDEST, POLICY_COALESCE_LATEST
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "common"))
+from receive_time import TIME_RECEIVED_NS, TIME_RECEIVED_MONO_NS
+from request_latency import LatencyHistogram
+from kucoin_endpoints import API_URL
+
+# Configure logging
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+console_handler = logging.StreamHandler()
+formatter = logging.Formatter('%(asctime)s.%(msecs)03d - %(levelname)s - %(message)s - %(funcName)s', datefmt='%H:%M:%S')
+console_handler.setFormatter(formatter)
+logger.addHandler(console_handler)
+logger.propagate = False
+
+
+def dedupe_key(data: Dict[str, Any]) -> Optional[Hashable]:
+    """Identity of a market data event within one topic, None if it has none"""
+    # match: sequence (tradeId as fallback), level2: sequenceEnd, ticker: sequence
+    key = data.get('sequence') or data.get('tradeId') or data.get('sequenceEnd')
+    if key is None:
+        # level2Depth5 / snapshot only carry their exchange timestamp
+        key = data.get('timestamp') or data.get('time')
+    return key
+
+
+class KucoinHedgedFeed:
+    """
+    One topic received over several independent websocket connections.
+
+    Each leg is a KucoinWebsocketListen on its own socket, spread over the
+    bullet token's instanceServers (plus the default endpoint). Events are
+    merged by dedupe_key and emitted once, on first arrival, so the fastest
+    path wins per message and a stalled socket does not stop the feed.
+    Per leg, wins (first arrivals) and the lateness of its duplicates behind
+    the winner are recorded.
+
+    Drop-in for KucoinWebsocketListen: start(), stream(), async iteration,
+    get_data(), on_message and cleanup().
+    """
+    DEDUPE_WINDOW = 8192  # event keys remembered for duplicate detection
+
+    def __init__(self, symbol: str, channel: str = "match", connections: int = 2,
+                 on_message: Optional[Callable[[Dict[str, Any]], None]] = None,
+                 fields: Optional[tuple] = None,
+                 buffer_capacity: int = 65536, overflow_policy: Optional[str] = None):
+        self.symbol = symbol
+        self.channel = channel
+        self.api_url = API_URL
+        self.connections = max(1, connections)
+        self.on_message = on_message
+        # projection is applied after dedupe, legs keep the fields the key is built from
+        self.fields = tuple(fields) if fields else None
+
+        if overflow_policy is None:
+            overflow_policy = (POLICY_COALESCE_LATEST if channel in KucoinWebsocketListen.COALESCED_CHANNELS
+                               else POLICY_DROP_OLDEST)
+        self.queue = RingBuffer(buffer_capacity, overflow_policy, name=f"{symbol} {channel} hedged")
+
+        self.legs: List[KucoinWebsocketListen] = []
+        self._tasks = []
+        self._legs_running = 0
+        self.is_running = False
+
+        # event key -> (winning leg, arrival monotonic ns)
+        self._seen: OrderedDict = OrderedDict()
+        self.emitted = 0
+        self.unkeyed = 0
+        self.received: List[int] = []
+        self.wins: List[int] = []
+        self.last_arrival_ns: List[Optional[int]] = []
+        # per leg, how far behind the winner its duplicates arrived
+        self.lateness: List[LatencyHistogram] = []
+
+    async def get_endpoints(self) -> List[str]:
+        """Distinct websocket endpoints: the bullet token's instanceServers, then the default host"""
+        endpoints = []
+        try:
+            async with aiohttp.ClientSession() as session:
+                async with session.post(f"{self.api_url}/api/v1/bullet-public",
+                                        timeout=aiohttp.ClientTimeout(total=5)) as response:
+                    if response.status == 200:
+                        data = await response.json(loads=orjson.loads)
+                        endpoints = [server['endpoint'] for server in data['data']['instanceServers']]
+                    else:
+                        logger.warning(f"Instance server lookup failed with status: {response.status}")
+        except Exception as e:
+            logger.warning(f"Instance server lookup error: {e}")
+
+        distinct = []
+        for endpoint in endpoints + [DEFAULT_WS_ENDPOINT]:
+            if endpoint.rstrip('/') not in [known.rstrip('/') for known in distinct]:
+                distinct.append(endpoint)
+        return distinct
+
+    async def start(self):
+        """Open every leg, returns when all of them have ended"""
+        endpoints = await self.get_endpoints()
+        for index in range(self.connections):
+            # legs beyond the number of endpoints reuse them on separate sockets
+            endpoint = endpoints[index % len(endpoints)]
+            leg = KucoinWebsocketListen(self.symbol, self.channel,
+                                        on_message=partial(self._on_leg_message, index),
+                                        ws_endpoint=endpoint)
+            self.legs.append(leg)
+            self.received.append(0)
+            self.wins.append(0)
+            self.last_arrival_ns.append(None)
+            self.lateness.append(LatencyHistogram())
+
+        # one warm-up validates token and endpoint for the whole feed, legs skip their own throwaway socket
+        await self.legs[0].warm_up()
+        for leg in self.legs[1:]:
+            leg._warm_up_complete.set()
+
+        self.is_running = True
+        self._legs_running = len(self.legs)
+        self._tasks = [asyncio.create_task(self._run_leg(index, leg)) for index, leg in enumerate(self.legs)]
+        logger.info(f"Hedged {self.symbol} {self.channel} feed over {len(self.legs)} connections: "
+                    f"{[leg.ws_endpoint for leg in self.legs]}")
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def _run_leg(self, index: int, leg: KucoinWebsocketListen):
+        try:
+            await leg.start()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Leg {index} ({leg.ws_endpoint}) failed: {e}")
+        finally:
+            self._legs_running -= 1
+            if self._legs_running > 0 and self.is_running:
+                logger.warning(f"Leg {index} ended, {self._legs_running} connections left")
+            else:
+                self.is_running = False
+                self.queue.close()
+
+    def _on_leg_message(self, index: int, data: Dict[str, Any]) -> None:
+        """First arrival of an event is emitted, later copies only update the leg statistics"""
+        arrival_ns = data[TIME_RECEIVED_MONO_NS]
+        self.received[index] += 1
+        self.last_arrival_ns[index] = arrival_ns
+
+        key = dedupe_key(data)
+        if key is None:
+            self.unkeyed += 1
+        else:
+            first = self._seen.get(key)
+            if first is not None:
+                self.lateness[index].record((arrival_ns - first[1]) // 1000)
+                return
+            self._seen[key] = (index, arrival_ns)
+            if len(self._seen) > self.DEDUPE_WINDOW:
+                self._seen.popitem(last=False)
+
+        self.wins[index] += 1
+        self.emitted += 1
+        if self.fields is not None:
+            projected = {field: data.get(field) for field in self.fields}
+            projected[TIME_RECEIVED_NS] = data[TIME_RECEIVED_NS]
+            projected[TIME_RECEIVED_MONO_NS] = arrival_ns
+            data = projected
+        if self.on_message is not None:
+            self.on_message(data)
+            return
+        self.queue.put_nowait(data)
+
+    async def get_data(self) -> Dict[str, Any]:
+        """Get latest message from the queue"""
+        try:
+            return self.queue.get_nowait()
+        except asyncio.QueueEmpty:
+            return None
+
+    def __aiter__(self) -> AsyncIterator[Dict[str, Any]]:
+        return self.stream()
+
+    def stream(self, duration: Optional[float] = None) -> AsyncIterator[Dict[str, Any]]:
+        """Deduplicated messages, ends after duration seconds or once every leg has closed"""
+        return self.queue.stream(duration)
+
+    def stats(self) -> Dict[str, Any]:
+        now_ns = time.monotonic_ns()
+        legs = []
+        for index, leg in enumerate(self.legs):
+            lateness = self.lateness[index].to_dict()
+            lateness.pop("buckets")
+            last_arrival_ns = self.last_arrival_ns[index]
+            legs.append({
+                "endpoint": leg.ws_endpoint,
+                "running": leg.is_running,
+                "received": self.received[index],
+                "wins": self.wins[index],
+                "win_rate": round(self.wins[index] / self.emitted, 3) if self.emitted else None,
+                "idle_ms": round((now_ns - last_arrival_ns) / 1e6, 1) if last_arrival_ns else None,
+                "lateness_us": lateness
+            })
+        return {"symbol": self.symbol, "channel": self.channel, "emitted": self.emitted,
+                "unkeyed": self.unkeyed, "legs": legs}
+
+    async def cleanup(self):
+        """Close every leg"""
+        self.is_running = False
+        for leg in self.legs:
+            try:
+                await leg.cleanup()
+            except Exception as e:
+                logger.error(f"Leg cleanup error: {e}")
+        self.queue.close()
+        logger.info(f"Hedged feed: {self.stats()}")
@@ -1,10 +1,13 @@
+import os
+import sys
 import asyncio
 import json
 from datetime import datetime
 import logging
-from typing import Dict, List
+from typing import Dict, List, Optional
 from kucoin_order_managerV2 import KucoinHFOrderManager
-import os
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "common"))
+from receive_time import select_fields
 import traceback
 from datetime import timedelta
 
@@ -18,8 +21,10 @@ logger.addHandler(console_handler)
 logger.propagate = False
 
 class MatchStrategyTrader:
-    def __init__(self, basecoin: str, api_key: str, api_secret: str, api_passphrase: str):
+    def __init__(self, basecoin: str, api_key: str, api_secret: str, api_passphrase: str, batch_orders: bool = True):
         self.trading_client = KucoinHFOrderManager(api_key, api_secret, api_passphrase)
+        # pack order ladders into HF multi-order requests instead of one request per order
+        self.batch_orders = batch_orders
         self.symbol = basecoin + "-USDT"
         self.basecoin = basecoin
         
@@ -33,6 +38,8 @@ class MatchStrategyTrader:
         self.enable_performance_snapshot = False
 
         self.sellcounter = 0
+        # buy orders are expired by the exchange (cancelAfter) after this many seconds
+        self.buy_order_ttl = 4
         
         # Trade data storage
         self.trade_data = {
@@ -46,7 +53,8 @@ class MatchStrategyTrader:
         }
 
     async def multiple_buy_orders_percent_dif(self, base_price: float, num_orders: int, 
-                                            percentage_difference: float, time_in_force: str = "GTC") -> List[Dict]:
+                                            percentage_difference: float, time_in_force: str = "GTC",
+                                            cancel_after: Optional[int] = None) -> List[Dict]:
         size, decimal_to_round = self.order_size_and_rounding(base_price)
         
         prices = [
@@ -60,12 +68,13 @@ class MatchStrategyTrader:
                 "side": "buy",
                 "price": str(round(float(price), decimal_to_round)),
                 "size": str(size),
-                "time_in_force": time_in_force
+                "time_in_force": time_in_force,
+                "cancel_after": cancel_after
             }
             for price in prices
         ]
 
-        return await self.trading_client.place_multiple_orders(orders)
+        return await self.trading_client.place_multiple_orders(orders, batch=self.batch_orders)
 
     
 
@@ -89,7 +98,7 @@ class MatchStrategyTrader:
             for price in prices
         ]
 
-        return await self.trading_client.place_multiple_orders(orders)
+        return await self.trading_client.place_multiple_orders(orders, batch=self.batch_orders)
 
             
 
@@ -104,7 +113,7 @@ class MatchStrategyTrader:
             )
             tasks.append(('first_group', first_task))
             self.trade_data["buy_orders"]= {
-                "trigger_data": {k: market_data[k] for k in ['price', 'side', 'time_received']}
+                "trigger_data": select_fields(market_data, ['price', 'side', 'time_received'])
                 # "orders" will be added after the task completes
             }
             
@@ -114,7 +123,7 @@ class MatchStrategyTrader:
             )
             tasks.append(('second_group', second_task))
             self.trade_data["buy_orders"]["second_group"] = {
-                "trigger_data": {k: market_data[k] for k in ['price', 'side', 'time_received']}
+                "trigger_data": select_fields(market_data, ['price', 'side', 'time_received'])
                 # "orders" will be added after the task completes
             }
             self.second_order_placed = True
@@ -140,6 +149,8 @@ class MatchStrategyTrader:
 
         full_path = os.path.join(path_to_save, filename)
         self.trade_data["trading_session"]["end_time"] = datetime.now().isoformat()
+        # per-endpoint request phase histograms, comparable across runs
+        self.trade_data["request_latency"] = self.trading_client.latency_report()
         
         with open(full_path, 'w') as f:
             json.dump(self.trade_data, f, indent=4)
@@ -198,20 +209,20 @@ class MatchStrategyTrader:
             for _ in range(num_orders)
         ]
 
-        return await self.trading_client.place_multiple_orders(orders)
+        return await self.trading_client.place_multiple_orders(orders, batch=self.batch_orders)
 
 
 
-    async def buy_if_makerOrderId(self, num_orders_buy: int, market_data: dict, percentage_difference: float):
+    async def buy_if_makerOrderId(self, num_orders_buy: int, market_data: dict, percentage_difference: float,
+                                  cancel_after: Optional[int] = None):
         if market_data['makerOrderId']:
             self.first_buy_match_price = float(market_data['price'])
-            first_buyprice = await self.multiple_buy_orders_percent_dif(self.first_buy_match_price, num_orders_buy, percentage_difference)
+            first_buyprice = await self.multiple_buy_orders_percent_dif(self.first_buy_match_price, num_orders_buy,
+                                                                        percentage_difference, cancel_after=cancel_after)
             
 
 
-            self.trade_data["buy_orders"]['trigger_data']= {
-                k: market_data[k] for k in ['price', 'side', 'time_received','makerOrderId']
-                }
+            self.trade_data["buy_orders"]['trigger_data']= select_fields(market_data, ['price', 'side', 'time_received','makerOrderId'])
             self.trade_data["buy_orders"]["orders_sent"] = first_buyprice
 
             return first_buyprice
@@ -227,9 +238,7 @@ class MatchStrategyTrader:
 
             sell_task = await self.multiple_sell_percentdiff_same_price(market_data['price'], num_orders_sell, percentage_difference)
 
-            self.trade_data["sell_orders"]['trigger_data']= {
-                k: market_data[k] for k in ['price', 'side', 'time_received','makerOrderId']
-                }
+            self.trade_data["sell_orders"]['trigger_data']= select_fields(market_data, ['price', 'side', 'time_received','makerOrderId'])
             self.trade_data["sell_orders"]["orders_sent"] = sell_task
 
             return True
@@ -243,14 +252,15 @@ class MatchStrategyTrader:
                 await self.trading_client.cancel_order_by_id(result['orderId'])
 
     async def delete_unfilled_orders(self, seconds_delay:int,buy_result:List[Dict]):
-        '''delete unfilled ordered with time delay from creation'''
-        await asyncio.sleep(seconds_delay)
-        deleted_orders = []
-        for result in buy_result:
-            if result['success'] == True:
-                deleted_orders.append(result['orderId'])
-                await self.trading_client.cancel_order_by_id(result['orderId'])
-        logger.info(f"attempt to delete {len(deleted_orders)} orders for {self.symbol} if not filled else nothing to deleted")
+        '''fallback for orders placed with cancelAfter, cancels the buys the exchange did not expire'''
+        await asyncio.sleep(seconds_delay + 1)
+        still_open = await self.trading_client.unexpired_orders(buy_result)
+        if not still_open:
+            logger.info(f"buy orders for {self.symbol} expired by exchange, nothing to delete")
+            return
+        # by id, a symbol wide cancel would also hit the sell ladder and the level2 strategy's orders
+        logger.info(f"{len(still_open)} buy orders for {self.symbol} still open after ttl, cancel by id")
+        await self.trading_client.cancel_orders(still_open)
 
 
 
@@ -264,11 +274,14 @@ class MatchStrategyTrader:
         
         try:
             delete_buy_order_task = None
+            # keep unrealized PnL current without any request
+            self.trading_client.ledger.mark(self.symbol, market_data['price'])
             if not self.first_buy_match_price:
-                result_buy = await self.buy_if_makerOrderId(num_orders_buy, market_data, percentage_diff_buy)
+                result_buy = await self.buy_if_makerOrderId(num_orders_buy, market_data, percentage_diff_buy,
+                                                            cancel_after=self.buy_order_ttl)
                 if result_buy:
                     #logger.info(json.dumps(self.trade_data,indent=4))
-                    delete_buy_order_task =asyncio.create_task(self.delete_unfilled_orders(4,result_buy))
+                    delete_buy_order_task =asyncio.create_task(self.delete_unfilled_orders(self.buy_order_ttl,result_buy))
 
 
                     # if buy rult orders are not filled in 5 seconds, cancel them
@@ -318,20 +331,12 @@ async def main():
     run_match = asyncio.create_task(ws_match.start())
 
     try:
-        end_time = datetime.now() + timedelta(minutes=10)
-        
-        while datetime.now() < end_time:
-            market_data = await ws_match.get_data()
-            
-            if market_data:
-                #print(json.dumps(market_data,indent=4))
-                strategy_result = await strategy.strategy(3,3,market_data,10,-10)
-                if strategy_result:
-                    strategy.save_trading_data('/root/trading_systems/kucoin_dir/taibdabidbnai')
-                    break
-                    
-
-            await asyncio.sleep(0.0001)
+        async for market_data in ws_match.stream(duration=600):
+            #print(json.dumps(market_data,indent=4))
+            strategy_result = await strategy.strategy(3,3,market_data,10,-10)
+            if strategy_result:
+                strategy.save_trading_data('/root/trading_systems/kucoin_dir/taibdabidbnai')
+                break
 
 
     finally:
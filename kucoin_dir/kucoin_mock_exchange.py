@@ -0,0 +1,658 @@
+import asyncio
+import itertools
+import json
+import logging
+import os
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, Any, Optional, List, Tuple
+import orjson
+from aiohttp import web, WSMsgType
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "common"))
+from request_latency import LatencyHistogram
+
+# Configure logging
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+console_handler = logging.StreamHandler()
+formatter = logging.Formatter('%(asctime)s.%(msecs)03d - %(levelname)s - %(message)s - %(funcName)s', datefmt='%H:%M:%S')
+console_handler.setFormatter(formatter)
+logger.addHandler(console_handler)
+logger.propagate = False
+
+# any non-empty credentials are accepted, used when no config_api.json is present
+MOCK_CREDENTIALS = {"api_key": "mock-key", "api_secret": "mock-secret", "api_passphrase": "mock-passphrase"}
+PRIVATE_ORDER_TOPIC = "/spotMarket/tradeOrders"
+FEE_RATE = 0.001
+_SECOND = 1_000_000_000
+
+
+class ListingScenario:
+    """
+    Scripted listing: the symbol opens for trading at release_time (exchange time),
+    trades are (ns after the release, price, side, size).
+    """
+
+    def __init__(self, basecoin: str, release_time: datetime, trades: List[Tuple[int, float, str, float]],
+                 price_decimals: int = 4):
+        self.basecoin = basecoin
+        self.symbol = f"{basecoin}-USDT"
+        self.release_time = release_time
+        self.release_ns = int(release_time.timestamp()) * _SECOND
+        self.trades = sorted(trades, key=lambda trade: trade[0])
+        self.price_decimals = price_decimals
+
+    @classmethod
+    def synthetic(cls, basecoin: str = "MOCKLIST", release_time: Optional[datetime] = None,
+                  open_price: float = 0.05, ticks: int = 400, interval_ms: float = 50, seed: int = 7,
+                  buy_phase_seconds: float = 3) -> "ListingScenario":
+        """
+        Deterministic opening: buyers dominate for buy_phase_seconds, then sellers.
+        release_time defaults to the next full minute, release times are minute precise.
+        """
+        if release_time is None:
+            release_time = (datetime.now() + timedelta(minutes=1)).replace(second=0, microsecond=0)
+        rng = random.Random(seed)
+        price = open_price
+        trades = []
+        for index in range(ticks):
+            offset_ns = int(index * interval_ms * 1e6)
+            buy_probability = 0.7 if offset_ns < buy_phase_seconds * _SECOND else 0.35
+            side = "buy" if index == 0 or rng.random() < buy_probability else "sell"
+            price *= 1 + (0.004 if side == "buy" else -0.004) * rng.random()
+            trades.append((offset_ns, round(price, 6), side, round(rng.uniform(50, 5000), 2)))
+        return cls(basecoin, release_time, trades, price_decimals=6)
+
+    @classmethod
+    def from_session(cls, session_dir: str, seconds: float = 120) -> "ListingScenario":
+        """The first seconds of matches of a recorded release folder"""
+        from kucoin_replay import KucoinReplayListen
+        replay = KucoinReplayListen(session_dir, "match", end_seconds=seconds)
+        events = replay.load()
+        if not events:
+            raise ValueError(f"No matches in the first {seconds}s of {session_dir}")
+        release_ns = int(replay.release_time.timestamp()) * _SECOND
+        # receive times can lead the release by the local clock error, the first match opens the listing
+        shift = max(0, release_ns - events[0][0])
+        trades = [(received - release_ns + shift, float(entry['price']), entry['side'], float(entry['size']))
+                  for received, _, entry in events]
+        return cls(replay.symbol, replay.release_time, trades)
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "symbol": self.symbol,
+            "release_time": self.release_time.isoformat(),
+            "trades": len(self.trades),
+            "span_s": round(self.trades[-1][0] / 1e9, 3) if self.trades else 0,
+            "open_price": self.trades[0][1] if self.trades else None
+        }
+
+
+class MockKucoinExchange:
+    """
+    Localhost KuCoin for end-to-end runs of the trading code.
+
+    Serves the REST endpoints the order manager, order tracker, exchange clock
+    and listeners use (bullet tokens, HF orders and batches, cancels, order
+    status, open orders, fills, symbols, timestamp) and a websocket endpoint carrying the
+    public match/ticker topics and the private order channel.
+
+    The exchange clock is virtual: it starts lead_seconds before the
+    scenario's release, so a run wakes at T-30s like the live loop without
+    waiting for a real listing. Orders fill against the scripted trades.
+    latency_ms (+/- jitter_ms) delays every REST response and ws_latency_ms
+    every public frame.
+
+    Each order request is matched with the last public tick sent before it
+    arrived, report() gives the tick-to-order and tick-to-ack latency.
+    """
+
+    def __init__(self, scenario: ListingScenario, host: str = "127.0.0.1", port: int = 8765,
+                 latency_ms: float = 0.0, jitter_ms: float = 0.0, ws_latency_ms: float = 0.0,
+                 lead_seconds: float = 32, base_balance: float = 0.0, close_after_seconds: float = 2):
+        self.scenario = scenario
+        self.host = host
+        self.port = port
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.ws_latency_ms = ws_latency_ms
+        self.lead_seconds = lead_seconds
+        # public sockets are closed this long after the last scripted trade, ending the listeners
+        self.close_after_seconds = close_after_seconds
+        self.api_url = f"http://{host}:{port}"
+        self.ws_endpoint = f"ws://{host}:{port}/endpoint"
+
+        # exchange time = wall clock + offset_ns, set by start()
+        self.offset_ns = 0
+        self.is_open = False
+        self.last_price = None
+        self.base_balance = base_balance
+        self.reserved_base = 0.0
+
+        # orders by orderId, clientOid -> orderId
+        self.orders: Dict[str, Dict[str, Any]] = {}
+        self.client_oids: Dict[str, str] = {}
+        self.fills: List[Dict[str, Any]] = []
+        self._ids = itertools.count(1)
+
+        # websocket subscribers, topic -> sockets
+        self.subscribers: Dict[str, set] = {}
+        self.private_sockets = set()
+        self.sockets = set()
+
+        # tick-to-order bookkeeping, ticks are stamped on the monotonic clock when first sent
+        self.ticks_sent = 0
+        self.first_tick_ns = None
+        self.last_tick = None
+        self.order_requests: List[Dict[str, Any]] = []
+        self.tick_to_order = LatencyHistogram()
+        self.tick_to_ack = LatencyHistogram()
+        self.request_counts: Dict[str, int] = {}
+
+        self._runner = None
+        self._publisher = None
+        self.finished = asyncio.Event()
+
+    ###########################################
+    # lifecycle
+
+    def _app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/api/v1/timestamp", self.handle_timestamp)
+        app.router.add_post("/api/v1/bullet-public", self.handle_bullet)
+        app.router.add_post("/api/v1/bullet-private", self.handle_bullet)
+        app.router.add_get("/api/v1/symbols", self.handle_symbols)
+        app.router.add_post("/api/v1/hf/orders", self.handle_place_order)
+        app.router.add_post("/api/v1/hf/orders/multi", self.handle_place_orders)
+        app.router.add_get("/api/v1/hf/orders/active", self.handle_active_orders)
+        app.router.add_delete("/api/v1/orders/{order_id}", self.handle_cancel_order)
+        app.router.add_delete("/api/v1/orders", self.handle_cancel_all)
+        app.router.add_get("/api/v1/orders/{order_id}", self.handle_order_status)
+        app.router.add_get("/api/v1/order/client-order/{client_oid}", self.handle_order_status)
+        app.router.add_get("/api/v1/limit/fills", self.handle_fills)
+        app.router.add_get("/endpoint", self.handle_websocket)
+        app.router.add_get("/mock/report", self.handle_report)
+        return app
+
+    async def start(self):
+        """Listen on host:port, set the virtual clock and schedule the listing"""
+        self._runner = web.AppRunner(self._app(), access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        self.offset_ns = self.scenario.release_ns - int(self.lead_seconds * _SECOND) - time.time_ns()
+        self._publisher = asyncio.create_task(self._publish())
+        logger.info(f"Mock KuCoin on {self.api_url}, {self.scenario.symbol} opens at "
+                    f"{self.scenario.release_time} exchange time, in {self.lead_seconds}s")
+
+    async def stop(self):
+        if self._publisher:
+            self._publisher.cancel()
+        for ws in list(self.sockets):
+            await ws.close()
+        if self._runner:
+            await self._runner.cleanup()
+
+    def server_time_ns(self) -> int:
+        return time.time_ns() + self.offset_ns
+
+    async def _respond(self, data: Any, code: str = "200000", msg: Optional[str] = None) -> web.Response:
+        """KuCoin envelope after the configured server latency"""
+        delay_ms = self.latency_ms + (random.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0)
+        if delay_ms > 0:
+            await asyncio.sleep(delay_ms / 1000)
+        body = {"code": code, "data": data} if msg is None else {"code": code, "msg": msg}
+        return web.Response(body=orjson.dumps(body), content_type="application/json")
+
+    def _count(self, request: web.Request):
+        key = f"{request.method} {request.match_info.route.resource.canonical}"
+        self.request_counts[key] = self.request_counts.get(key, 0) + 1
+
+    ###########################################
+    # public REST
+
+    async def handle_timestamp(self, request: web.Request) -> web.Response:
+        self._count(request)
+        return await self._respond(self.server_time_ns() // 1_000_000)
+
+    async def handle_bullet(self, request: web.Request) -> web.Response:
+        self._count(request)
+        return await self._respond({
+            "token": uuid.uuid4().hex,
+            "instanceServers": [{"endpoint": self.ws_endpoint, "encrypt": False, "protocol": "websocket",
+                                 "pingInterval": 18000, "pingTimeout": 10000}]
+        })
+
+    async def handle_symbols(self, request: web.Request) -> web.Response:
+        self._count(request)
+        decimals = self.scenario.price_decimals
+        return await self._respond([{
+            "symbol": self.scenario.symbol,
+            "name": self.scenario.symbol,
+            "baseCurrency": self.scenario.basecoin,
+            "quoteCurrency": "USDT",
+            "feeCurrency": "USDT",
+            "market": "USDS",
+            "baseMinSize": "0.1",
+            "quoteMinSize": "0.1",
+            "baseIncrement": "0.01",
+            "quoteIncrement": "0.000001",
+            "priceIncrement": f"{10 ** -decimals:.{decimals}f}",
+            "minFunds": "0.1",
+            "enableTrading": True,
+            "isMarginEnabled": False,
+            # opening time in exchange ms, KuCoin lists upcoming pairs before they trade
+            "tradingStartTime": self.scenario.release_ns // 1_000_000
+        }])
+
+    ###########################################
+    # orders
+
+    def _authorized(self, request: web.Request) -> bool:
+        return all(request.headers.get(header) for header in ("KC-API-KEY", "KC-API-SIGN", "KC-API-TIMESTAMP",
+                                                              "KC-API-PASSPHRASE"))
+
+    def _record_order_request(self, endpoint: str, arrival_ns: int, orders: int):
+        """Attribute an order request to the last tick sent before it arrived"""
+        tick = self.last_tick
+        entry = {"endpoint": endpoint, "orders": orders, "arrival_s": None, "tick_sequence": None,
+                 "tick_price": None, "tick_to_order_us": None, "tick_to_ack_us": None}
+        if self.first_tick_ns is not None:
+            entry["arrival_s"] = round((arrival_ns - self.first_tick_ns) / 1e9, 6)
+        if tick is not None:
+            entry["tick_sequence"] = tick["sequence"]
+            entry["tick_price"] = tick["price"]
+            entry["tick_to_order_us"] = (arrival_ns - tick["sent_ns"]) // 1000
+            self.tick_to_order.record(entry["tick_to_order_us"])
+        self.order_requests.append(entry)
+        return entry
+
+    def _record_ack(self, entry: Dict[str, Any], arrival_ns: int):
+        """Tick-to-ack: tick-to-order plus the time the request spent in the mock, latency included"""
+        if entry["tick_to_order_us"] is not None:
+            entry["tick_to_ack_us"] = entry["tick_to_order_us"] + (time.monotonic_ns() - arrival_ns) // 1000
+            self.tick_to_ack.record(entry["tick_to_ack_us"])
+
+    async def _place(self, order: Dict[str, Any]) -> Tuple[Optional[Dict[str, Any]], Optional[str], Optional[str]]:
+        """Validate and book one order, returns (order, error code, error message)"""
+        if order.get("symbol") != self.scenario.symbol:
+            return None, "400100", "Unsupported trading pair"
+        if not self.is_open:
+            return None, "400350", "Trading of this pair has not started"
+        try:
+            price, size = float(order["price"]), float(order["size"])
+        except (KeyError, TypeError, ValueError):
+            return None, "400100", "Invalid price or size"
+        if order.get("clientOid") in self.client_oids:
+            return None, "400100", "clientOid duplicated"
+        side = order.get("side")
+        if side == "sell":
+            if size > self.base_balance - self.reserved_base + 1e-12:
+                return None, "200004", "Balance insufficient!"
+            self.reserved_base += size
+
+        order_id = f"{next(self._ids):024x}"
+        now_ms = self.server_time_ns() // 1_000_000
+        state = {
+            "id": order_id, "clientOid": order.get("clientOid") or uuid.uuid4().hex,
+            "symbol": self.scenario.symbol, "type": "limit", "side": side,
+            "price": order["price"], "size": order["size"], "dealSize": "0", "dealFunds": "0", "fee": "0",
+            "feeCurrency": "USDT", "timeInForce": order.get("timeInForce", "GTC"),
+            "cancelAfter": int(order.get("cancelAfter") or 0), "isActive": True, "cancelExist": False,
+            "createdAt": now_ms, "tradeType": "TRADE",
+            "_price": price, "_size": size, "_filled": 0.0
+        }
+        self.orders[order_id] = state
+        self.client_oids[state["clientOid"]] = order_id
+        await self._push_order_event(state, "open")
+
+        # marketable against the last trade, taken at that price
+        if self.last_price is not None and (
+                (side == "buy" and price >= self.last_price) or (side == "sell" and price <= self.last_price)):
+            await self._fill(state, self.last_price, size, "taker")
+        if state["isActive"] and state["timeInForce"] == "GTT" and state["cancelAfter"]:
+            asyncio.get_running_loop().call_later(state["cancelAfter"],
+                                                  lambda: asyncio.create_task(self._cancel(order_id)))
+        return state, None, None
+
+    async def _fill(self, state: Dict[str, Any], price: float, size: float, liquidity: str):
+        size = min(size, state["_size"] - state["_filled"])
+        if size <= 0:
+            return
+        state["_filled"] += size
+        funds = price * size
+        fee = funds * FEE_RATE
+        state["dealSize"] = f"{state['_filled']:.8g}"
+        state["dealFunds"] = f"{float(state['dealFunds']) + funds:.10g}"
+        state["fee"] = f"{float(state['fee']) + fee:.10g}"
+        if state["side"] == "buy":
+            self.base_balance += size
+        else:
+            self.base_balance -= size
+            self.reserved_base -= size
+        trade_id = f"{next(self._ids):024x}"
+        now_ms = self.server_time_ns() // 1_000_000
+        self.fills.append({
+            "symbol": state["symbol"], "tradeId": trade_id, "orderId": state["id"], "counterOrderId": None,
+            "side": state["side"], "liquidity": liquidity, "forceTaker": False, "price": f"{price:.10g}",
+            "size": f"{size:.8g}", "funds": f"{funds:.10g}", "fee": f"{fee:.10g}", "feeRate": str(FEE_RATE),
+            "feeCurrency": "USDT", "stop": "", "type": "limit", "createdAt": now_ms, "tradeType": "TRADE"
+        })
+        done = state["_filled"] >= state["_size"] - 1e-12
+        await self._push_order_event(state, "match", match_price=price, match_size=size, trade_id=trade_id,
+                                     liquidity=liquidity)
+        if done:
+            state["isActive"] = False
+            await self._push_order_event(state, "filled")
+
+    async def _cancel(self, order_id: str) -> bool:
+        state = self.orders.get(order_id)
+        if state is None or not state["isActive"]:
+            return False
+        state["isActive"] = False
+        state["cancelExist"] = True
+        if state["side"] == "sell":
+            self.reserved_base -= state["_size"] - state["_filled"]
+        await self._push_order_event(state, "canceled")
+        return True
+
+    async def _on_trade(self, price: float, side: str, size: float):
+        """Resting orders the public trade crossed fill at their limit"""
+        self.last_price = price
+        for state in list(self.orders.values()):
+            if not state["isActive"]:
+                continue
+            if (state["side"] == "buy" and price <= state["_price"]) or \
+                    (state["side"] == "sell" and price >= state["_price"]):
+                await self._fill(state, state["_price"], size, "maker")
+
+    @staticmethod
+    def _public(state: Dict[str, Any]) -> Dict[str, Any]:
+        return {key: value for key, value in state.items() if not key.startswith("_")}
+
+    async def handle_place_order(self, request: web.Request) -> web.Response:
+        arrival_ns = time.monotonic_ns()
+        self._count(request)
+        entry = self._record_order_request("/api/v1/hf/orders", arrival_ns, 1)
+        if not self._authorized(request):
+            return await self._respond(None, "400001", "Please check the header of your request for KC-API-KEY")
+        state, code, msg = await self._place(await request.json(loads=orjson.loads))
+        response = await self._respond({"orderId": state["id"], "clientOid": state["clientOid"]}) if state \
+            else await self._respond(None, code, msg)
+        self._record_ack(entry, arrival_ns)
+        return response
+
+    async def handle_place_orders(self, request: web.Request) -> web.Response:
+        arrival_ns = time.monotonic_ns()
+        self._count(request)
+        body = await request.json(loads=orjson.loads)
+        order_list = body.get("orderList") or []
+        entry = self._record_order_request("/api/v1/hf/orders/multi", arrival_ns, len(order_list))
+        if not self._authorized(request):
+            return await self._respond(None, "400001", "Please check the header of your request for KC-API-KEY")
+        if len(order_list) > 5:
+            return await self._respond(None, "400100", "Too many orders in one batch")
+        items = []
+        for order in order_list:
+            state, code, msg = await self._place(order)
+            items.append({"orderId": state["id"], "clientOid": state["clientOid"], "success": True} if state
+                         else {"clientOid": order.get("clientOid"), "success": False, "failMsg": msg})
+        response = await self._respond(items)
+        self._record_ack(entry, arrival_ns)
+        return response
+
+    async def handle_cancel_order(self, request: web.Request) -> web.Response:
+        self._count(request)
+        order_id = request.match_info["order_id"]
+        if await self._cancel(order_id):
+            return await self._respond({"cancelledOrderIds": [order_id]})
+        return await self._respond(None, "400100", "order_not_exist_or_not_allow_to_cancel")
+
+    async def handle_cancel_all(self, request: web.Request) -> web.Response:
+        self._count(request)
+        symbol = request.query.get("symbol")
+        cancelled = []
+        for order_id, state in list(self.orders.items()):
+            if state["isActive"] and (symbol is None or state["symbol"] == symbol) and await self._cancel(order_id):
+                cancelled.append(order_id)
+        return await self._respond({"cancelledOrderIds": cancelled})
+
+    async def handle_active_orders(self, request: web.Request) -> web.Response:
+        self._count(request)
+        symbol = request.query.get("symbol")
+        return await self._respond([self._public(state) for state in self.orders.values()
+                                    if state["isActive"] and state["symbol"] == symbol])
+
+    async def handle_order_status(self, request: web.Request) -> web.Response:
+        self._count(request)
+        order_id = request.match_info.get("order_id") or self.client_oids.get(request.match_info.get("client_oid"))
+        state = self.orders.get(order_id)
+        if state is None:
+            return await self._respond(None, "400100", "order_not_exist")
+        return await self._respond(self._public(state))
+
+    async def handle_fills(self, request: web.Request) -> web.Response:
+        self._count(request)
+        # newest first, like the exchange
+        return await self._respond(list(reversed(self.fills)))
+
+    async def handle_report(self, request: web.Request) -> web.Response:
+        return web.Response(body=orjson.dumps(self.report()), content_type="application/json")
+
+    ###########################################
+    # websocket
+
+    async def handle_websocket(self, request: web.Request) -> web.WebSocketResponse:
+        self._count(request)
+        ws = web.WebSocketResponse(autoping=True)
+        await ws.prepare(request)
+        self.sockets.add(ws)
+        await ws.send_str(orjson.dumps({"id": request.query.get("connectId", uuid.uuid4().hex),
+                                        "type": "welcome"}).decode('utf-8'))
+        try:
+            async for msg in ws:
+                if msg.type != WSMsgType.TEXT:
+                    continue
+                message = orjson.loads(msg.data)
+                message_type = message.get("type")
+                if message_type == "ping":
+                    await ws.send_str(orjson.dumps({"id": message.get("id"), "type": "pong",
+                                                    "timestamp": self.server_time_ns() // 1000}).decode('utf-8'))
+                elif message_type in ("subscribe", "unsubscribe"):
+                    self._subscription(ws, message_type, message.get("topic", ""))
+                    if message.get("response"):
+                        await ws.send_str(orjson.dumps({"id": message.get("id"), "type": "ack"}).decode('utf-8'))
+        finally:
+            self.sockets.discard(ws)
+            self.private_sockets.discard(ws)
+            for sockets in self.subscribers.values():
+                sockets.discard(ws)
+        return ws
+
+    def _subscription(self, ws: web.WebSocketResponse, message_type: str, topic: str):
+        """Comma separated symbols subscribe one topic each, as the exchange fans them out"""
+        if topic == PRIVATE_ORDER_TOPIC:
+            (self.private_sockets.add if message_type == "subscribe" else self.private_sockets.discard)(ws)
+            return
+        prefix, _, symbols = topic.partition(":")
+        for symbol in symbols.split(","):
+            sockets = self.subscribers.setdefault(f"{prefix}:{symbol}", set())
+            (sockets.add if message_type == "subscribe" else sockets.discard)(ws)
+
+    async def _send(self, sockets, frame: str):
+        for ws in list(sockets):
+            if not ws.closed:
+                try:
+                    await ws.send_str(frame)
+                except ConnectionResetError:
+                    pass
+
+    async def _push_order_event(self, state: Dict[str, Any], event_type: str, match_price: float = None,
+                                match_size: float = None, trade_id: str = None, liquidity: str = None):
+        """Private /spotMarket/tradeOrders event for one order state change"""
+        if not self.private_sockets:
+            return
+        status = "open" if event_type == "open" else "done" if not state["isActive"] else "match"
+        data = {
+            "symbol": state["symbol"], "orderType": "limit", "side": state["side"], "orderId": state["id"],
+            "type": event_type, "orderTime": state["createdAt"] * 1_000_000, "size": state["size"],
+            "filledSize": state["dealSize"], "price": state["price"], "clientOid": state["clientOid"],
+            "remainSize": f"{state['_size'] - state['_filled']:.8g}", "status": status,
+            "ts": self.server_time_ns()
+        }
+        if event_type == "match":
+            data.update({"matchPrice": f"{match_price:.10g}", "matchSize": f"{match_size:.8g}",
+                         "tradeId": trade_id, "liquidity": liquidity})
+        frame = {"type": "message", "topic": PRIVATE_ORDER_TOPIC, "subject": "orderChange",
+                 "channelType": "private", "data": data}
+        await self._send(self.private_sockets, orjson.dumps(frame).decode('utf-8'))
+
+    async def _publish(self):
+        """Send the scripted trades on the match and ticker topics at their exchange times"""
+        symbol = self.scenario.symbol
+        match_topic = f"/market/match:{symbol}"
+        ticker_topic = f"/market/ticker:{symbol}"
+        loop = asyncio.get_running_loop()
+        try:
+            release_wait = (self.scenario.release_ns - self.server_time_ns()) / 1e9
+            await asyncio.sleep(max(release_wait, 0))
+            self.is_open = True
+            logger.info(f"{symbol} open for trading, {len(self.scenario.trades)} scripted trades")
+            start = loop.time() + self.ws_latency_ms / 1000
+            for sequence, (offset_ns, price, side, size) in enumerate(self.scenario.trades, start=1):
+                delay = start + offset_ns / 1e9 - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                server_ns = self.scenario.release_ns + offset_ns
+                match = {"makerOrderId": f"{next(self._ids):024x}", "price": f"{price:.10g}",
+                         "sequence": str(sequence), "side": side, "size": f"{size:.8g}", "symbol": symbol,
+                         "takerOrderId": f"{next(self._ids):024x}", "time": str(server_ns),
+                         "tradeId": f"{next(self._ids):024x}", "type": "match"}
+                ticker = {"bestAsk": match["price"], "bestAskSize": match["size"], "bestBid": match["price"],
+                          "bestBidSize": match["size"], "price": match["price"], "sequence": match["sequence"],
+                          "size": match["size"], "time": server_ns // 1_000_000}
+                sent_ns = time.monotonic_ns()
+                self.last_tick = {"sequence": sequence, "price": price, "sent_ns": sent_ns}
+                if self.first_tick_ns is None:
+                    self.first_tick_ns = sent_ns
+                self.ticks_sent += 1
+                await self._send(self.subscribers.get(match_topic, ()), orjson.dumps(
+                    {"type": "message", "topic": match_topic, "subject": "trade.l3match", "data": match}).decode('utf-8'))
+                await self._send(self.subscribers.get(ticker_topic, ()), orjson.dumps(
+                    {"type": "message", "topic": ticker_topic, "subject": "trade.ticker", "data": ticker}).decode('utf-8'))
+                await self._on_trade(price, side, size)
+
+            await asyncio.sleep(self.close_after_seconds)
+            logger.info(f"Scripted session of {symbol} over, closing public sockets")
+            for ws in list(self.sockets):
+                if ws not in self.private_sockets:
+                    await ws.close()
+        finally:
+            self.finished.set()
+
+    ###########################################
+    # report
+
+    def report(self) -> Dict[str, Any]:
+        tick_to_order = self.tick_to_order.to_dict()
+        tick_to_order.pop("buckets")
+        tick_to_ack = self.tick_to_ack.to_dict()
+        tick_to_ack.pop("buckets")
+        first_order = next((entry for entry in self.order_requests if entry["arrival_s"] is not None), None)
+        filled = [state for state in self.orders.values() if state["_filled"] > 0]
+        return {
+            "scenario": self.scenario.describe(),
+            "server_latency_ms": self.latency_ms,
+            "jitter_ms": self.jitter_ms,
+            "ws_latency_ms": self.ws_latency_ms,
+            "ticks_sent": self.ticks_sent,
+            "order_requests": len(self.order_requests),
+            "orders": len(self.orders),
+            "filled_orders": len(filled),
+            "fills": len(self.fills),
+            # the first order of the listing, measured from the opening trade
+            "open_to_first_order_us": round(first_order["arrival_s"] * 1e6) if first_order else None,
+            "tick_to_order_us": tick_to_order,
+            "tick_to_ack_us": tick_to_ack,
+            "requests": self.order_requests,
+            "request_counts": self.request_counts
+        }
+
+
+def save_report(report: Dict[str, Any], path: str):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(report, f, indent=4)
+
+
+async def run_execution_match(pair: str, date_time_string: str):
+    """
+    kucoin_TRADING.execution_match as the live loop runs it, against whatever
+    KUCOIN_API_URL / KUCOIN_WS_ENDPOINT point at.
+    """
+    import kucoin_TRADING
+    from exchange_clock import ExchangeClock
+    from kucoin_ws_multiplexer import KucoinWebsocketMultiplexer
+    if kucoin_TRADING.load_credetials() is None:
+        kucoin_TRADING.load_credetials = lambda: dict(MOCK_CREDENTIALS)
+    clock = ExchangeClock("kucoin")
+    await clock.sync()
+    multiplexer = KucoinWebsocketMultiplexer()
+    try:
+        await kucoin_TRADING.execution_match({"pair": pair, "date_time_string": date_time_string}, clock, multiplexer)
+    finally:
+        await multiplexer.close()
+
+
+async def bench(scenario: ListingScenario, latency_ms: float = 0.0, jitter_ms: float = 0.0,
+                port: int = 8765, report_path: Optional[str] = None) -> Dict[str, Any]:
+    """Mock exchange in this process, execution_match unchanged in a child process pointed at it"""
+    exchange = MockKucoinExchange(scenario, port=port, latency_ms=latency_ms, jitter_ms=jitter_ms)
+    await exchange.start()
+    try:
+        env = dict(os.environ, KUCOIN_API_URL=exchange.api_url, KUCOIN_WS_ENDPOINT=exchange.ws_endpoint)
+        process = await asyncio.create_subprocess_exec(
+            sys.executable, os.path.abspath(__file__), "match", f"{scenario.basecoin}USDT",
+            scenario.release_time.strftime('%b %d %Y %I:%M%p'),
+            env=env, cwd=os.path.dirname(os.path.abspath(__file__)))
+        await process.wait()
+    finally:
+        await exchange.stop()
+    report = exchange.report()
+    if report_path:
+        save_report(report, report_path)
+    return report
+
+
+def _scenario(source: str) -> ListingScenario:
+    return ListingScenario.synthetic() if source in ("-", "synthetic") else ListingScenario.from_session(source)
+
+
+if __name__ == "__main__":
+    # python kucoin_mock_exchange.py bench [session dir | synthetic] [latency_ms] [report.json]
+    #   runs execution_match against the mock and prints the tick-to-order report
+    # python kucoin_mock_exchange.py serve [session dir | synthetic] [latency_ms] [port]
+    #   standalone mock, point KUCOIN_API_URL / KUCOIN_WS_ENDPOINT at it, GET /mock/report for the report
+    mode = sys.argv[1] if len(sys.argv) > 1 else "bench"
+    if mode == "match":
+        asyncio.run(run_execution_match(sys.argv[2], sys.argv[3]))
+    elif mode == "serve":
+        async def serve():
+            port = int(sys.argv[4]) if len(sys.argv) > 4 else 8765
+            exchange = MockKucoinExchange(_scenario(sys.argv[2] if len(sys.argv) > 2 else "synthetic"), port=port,
+                                          latency_ms=float(sys.argv[3]) if len(sys.argv) > 3 else 0.0)
+            await exchange.start()
+            print(f"KUCOIN_API_URL={exchange.api_url} KUCOIN_WS_ENDPOINT={exchange.ws_endpoint}")
+            try:
+                await asyncio.Event().wait()
+            finally:
+                await exchange.stop()
+        asyncio.run(serve())
+    else:
+        report = asyncio.run(bench(_scenario(sys.argv[2] if len(sys.argv) > 2 else "synthetic"),
+                                   latency_ms=float(sys.argv[3]) if len(sys.argv) > 3 else 0.0,
+                                   report_path=sys.argv[4] if len(sys.argv) > 4 else None))
+        report.pop("requests")
+        print(json.dumps(report, indent=4))
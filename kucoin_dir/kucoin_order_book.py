@@ -0,0 +1,236 @@
+import asyncio
+import aiohttp
+import orjson
+import logging
+import time
+from collections import deque
+from itertools import islice
+from typing import Dict, Any, Optional, List, Tuple
+from sortedcontainers import SortedDict
+from kucoin_request_signer import KucoinRequestSigner
+from kucoin_ws_multiplexer import market_symbol
+from kucoin_endpoints import API_URL
+
+# Configure logging
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+console_handler = logging.StreamHandler()
+formatter = logging.Formatter('%(asctime)s.%(msecs)03d - %(levelname)s - %(message)s - %(funcName)s', datefmt='%H:%M:%S')
+console_handler.setFormatter(formatter)
+logger.addHandler(console_handler)
+logger.propagate = False
+
+# full book needs a signed request, the public endpoint returns the best 100 levels per side
+FULL_SNAPSHOT_PATH = "/api/v3/market/orderbook/level2"
+PARTIAL_SNAPSHOT_PATH = "/api/v1/market/orderbook/level2_100"
+
+
+class SequencedOrderBook:
+    """
+    Local level2 order book kept in sync with KuCoin's sequence numbers.
+
+    Follows the calibration procedure of analysing_data/create_order_book.txt:
+    increments are buffered until a REST snapshot arrives, the buffer is
+    replayed and only changes with sequence > book sequence are applied.
+    A message whose sequenceStart skips past sequence + 1 is a gap: the book
+    is invalidated and resynced from a new snapshot automatically.
+
+    Price levels live in SortedDicts, best bid/ask is O(log n), top-N and
+    depth within x% are O(log n + levels returned).
+    """
+    MAX_BUFFERED = 20000
+    MAX_RESYNC_ATTEMPTS = 5
+
+    def __init__(self, symbol: str, signer: Optional[KucoinRequestSigner] = None,
+                 api_url: str = API_URL):
+        self.symbol = market_symbol(symbol)
+        self.signer = signer
+        self.api_url = api_url
+
+        self.bids = SortedDict()  # price -> size, best bid is the last key
+        self.asks = SortedDict()  # price -> size, best ask is the first key
+        self.sequence: Optional[int] = None  # None while not synced
+
+        self._buffer = deque(maxlen=self.MAX_BUFFERED)
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._resync_task: Optional[asyncio.Task] = None
+
+        # metrics
+        self.applied = 0
+        self.stale = 0
+        self.gaps = 0
+        self.resyncs = 0
+        self.last_resync_ms = None
+
+    @property
+    def synced(self) -> bool:
+        return self.sequence is not None
+
+    # ----- increments -----
+
+    def update(self, data: Dict[str, Any]) -> bool:
+        """
+        Feed one level2 message (the 'data' object). Returns True if it changed the book.
+        While unsynced the message is buffered and a resync is started if none is running.
+        """
+        if self.sequence is None:
+            self._buffer.append(data)
+            self._ensure_resync()
+            return False
+        return self._apply(data, from_buffer=False)
+
+    def _apply(self, data: Dict[str, Any], from_buffer: bool) -> bool:
+        sequence_end = int(data['sequenceEnd'])
+        if sequence_end <= self.sequence:
+            self.stale += 1
+            return False
+        if int(data['sequenceStart']) > self.sequence + 1:
+            self.gaps += 1
+            logger.warning(f"{self.symbol} sequence gap: book at {self.sequence}, "
+                           f"message starts at {data['sequenceStart']}, resyncing")
+            self._invalidate()
+            self._buffer.append(data)
+            if not from_buffer:
+                self._ensure_resync()
+            return False
+
+        sequence = self.sequence
+        changes = data['changes']
+        self._apply_side(self.asks, changes.get('asks', ()), sequence)
+        self._apply_side(self.bids, changes.get('bids', ()), sequence)
+        self.sequence = sequence_end
+        self.applied += 1
+        return True
+
+    @staticmethod
+    def _apply_side(levels: SortedDict, changes, sequence: int):
+        for change in changes:
+            # the change sequence is the last modification of this price
+            if int(change[2]) <= sequence:
+                continue
+            price = float(change[0])
+            if price == 0:
+                continue
+            size = float(change[1])
+            if size == 0:
+                levels.pop(price, None)
+            else:
+                levels[price] = size
+
+    def _invalidate(self):
+        self.sequence = None
+        self.bids.clear()
+        self.asks.clear()
+
+    # ----- snapshot -----
+
+    def _ensure_resync(self):
+        if self._resync_task is None or self._resync_task.done():
+            self._resync_task = asyncio.get_running_loop().create_task(self.resync())
+
+    async def get_snapshot(self) -> Dict[str, Any]:
+        """Level2 snapshot, full book when a signer is set"""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession()
+        path = FULL_SNAPSHOT_PATH if self.signer else PARTIAL_SNAPSHOT_PATH
+        endpoint = f"{path}?symbol={self.symbol}"
+        headers = None
+        if self.signer:
+            headers = self.signer.headers(str(int(time.time() * 1000)), "GET", endpoint)
+        async with self._session.get(f"{self.api_url}{endpoint}", headers=headers,
+                                     timeout=aiohttp.ClientTimeout(total=5)) as response:
+            payload = await response.json(loads=orjson.loads)
+            if response.status != 200 or payload.get('code') != '200000':
+                raise Exception(f"Snapshot request failed: {response.status} {payload}")
+            return payload['data']
+
+    def load_snapshot(self, snapshot: Dict[str, Any]):
+        """Replace the book with a snapshot, then replay the buffered increments"""
+        self.bids = SortedDict((float(price), float(size)) for price, size in snapshot['bids'])
+        self.asks = SortedDict((float(price), float(size)) for price, size in snapshot['asks'])
+        self.sequence = int(snapshot['sequence'])
+
+        buffered = list(self._buffer)
+        self._buffer.clear()
+        for data in buffered:
+            if self.sequence is None:
+                # gap inside the buffer, keep the rest for the next snapshot
+                self._buffer.append(data)
+            else:
+                self._apply(data, from_buffer=True)
+
+    async def resync(self):
+        """Fetch snapshots until the buffered increments connect to one"""
+        start = time.monotonic()
+        for attempt in range(1, self.MAX_RESYNC_ATTEMPTS + 1):
+            try:
+                self.load_snapshot(await self.get_snapshot())
+            except Exception as e:
+                logger.error(f"{self.symbol} snapshot attempt {attempt} failed: {e}")
+                await asyncio.sleep(0.2 * attempt)
+                continue
+            if self.synced:
+                self.resyncs += 1
+                self.last_resync_ms = round((time.monotonic() - start) * 1000, 1)
+                logger.info(f"{self.symbol} book synced at sequence {self.sequence} "
+                            f"in {self.last_resync_ms}ms ({len(self.bids)} bids, {len(self.asks)} asks)")
+                return
+            # the snapshot is older than the buffered increments, the REST side lags: retry
+            await asyncio.sleep(0.05 * attempt)
+        logger.error(f"{self.symbol} could not resync after {self.MAX_RESYNC_ATTEMPTS} snapshots")
+
+    # ----- queries -----
+
+    def best_bid(self) -> Optional[Tuple[float, float]]:
+        return self.bids.peekitem(-1) if self.bids else None
+
+    def best_ask(self) -> Optional[Tuple[float, float]]:
+        return self.asks.peekitem(0) if self.asks else None
+
+    def spread(self) -> Optional[float]:
+        if not self.bids or not self.asks:
+            return None
+        return self.asks.peekitem(0)[0] - self.bids.peekitem(-1)[0]
+
+    def mid_price(self) -> Optional[float]:
+        if not self.bids or not self.asks:
+            return None
+        return (self.asks.peekitem(0)[0] + self.bids.peekitem(-1)[0]) / 2
+
+    def get_top_levels(self, depth: int = 5) -> Tuple[List[Tuple[float, float]], List[Tuple[float, float]]]:
+        """Top N bids (descending) and asks (ascending) as (price, size)"""
+        top_bids = list(islice(reversed(self.bids.items()), depth))
+        top_asks = list(islice(self.asks.items(), depth))
+        return top_bids, top_asks
+
+    def depth_within(self, percent: float) -> Dict[str, float]:
+        """Base size resting within percent of the best price, per side"""
+        result = {"bids": 0.0, "asks": 0.0}
+        if self.bids:
+            floor = self.bids.peekitem(-1)[0] * (1 - percent / 100)
+            result["bids"] = sum(self.bids[price] for price in self.bids.irange(minimum=floor))
+        if self.asks:
+            ceiling = self.asks.peekitem(0)[0] * (1 + percent / 100)
+            result["asks"] = sum(self.asks[price] for price in self.asks.irange(maximum=ceiling))
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "symbol": self.symbol,
+            "synced": self.synced,
+            "sequence": self.sequence,
+            "bid_levels": len(self.bids),
+            "ask_levels": len(self.asks),
+            "buffered": len(self._buffer),
+            "applied": self.applied,
+            "stale": self.stale,
+            "gaps": self.gaps,
+            "resyncs": self.resyncs,
+            "last_resync_ms": self.last_resync_ms
+        }
+
+    async def close(self):
+        if self._resync_task is not None and not self._resync_task.done():
+            self._resync_task.cancel()
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
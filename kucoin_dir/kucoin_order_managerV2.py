@@ -1,16 +1,22 @@
+import os
+import sys
 import asyncio
 import aiohttp
 import time
 import uuid
-import hmac
-import base64
-import hashlib
 from typing import Optional, Dict, Union, List
 from datetime import datetime
 import logging
 import json
-from concurrent.futures import ThreadPoolExecutor
 from datetime import timedelta
+from kucoin_request_signer import KucoinRequestSigner
+from kucoin_endpoints import API_URL
+from kucoin_order_tracker import KucoinOrderTracker
+from kucoin_pnl_ledger import PnlLedger
+from rate_limit_scheduler import get_scheduler, PRIORITY_ENTRY, PRIORITY_CANCEL, PRIORITY_STATUS
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "common"))
+from request_latency import RequestLatencyRecorder
+from connection_warm_up import ConnectionWarmUp
 
 
 logger = logging.getLogger(__name__)
@@ -21,7 +27,15 @@ console_handler.setFormatter(formatter)
 logger.addHandler(console_handler)
 logger.propagate = False
 
-class KucoinHFOrderManager:
+class KucoinHFOrderManager(ConnectionWarmUp):
+    # cheap unsigned endpoint used to open and keep connections warm
+    WARM_UP_ENDPOINT = "/api/v1/timestamp"
+    # maximum orders per /api/v1/hf/orders/multi request, all for the same symbol
+    MAX_BATCH_ORDERS = 5
+    # spot resource pool, weight per interval in seconds, shared by all managers in the process
+    RATE_LIMIT_CAPACITY = 4000
+    RATE_LIMIT_INTERVAL = 30
+
     def __init__(self, api_key: str, api_secret: str, api_passphrase: str, debug: bool = False):
         """Initialize KuCoin HF trading client with async support"""
         if not all([api_key, api_secret, api_passphrase]):
@@ -30,17 +44,18 @@ class KucoinHFOrderManager:
         self.api_key = api_key
         self.api_secret = str(api_secret)
         self.api_passphrase = api_passphrase
-        self.base_url = "https://api.kucoin.com"
+        self.base_url = API_URL
         self.debug = debug
         
-        self._static_headers = {
-            "KC-API-KEY": self.api_key,
-            "KC-API-KEY-VERSION": "2",
-            "Content-Type": "application/json"
-        }
+        # passphrase HMAC and keyed secret are prepared once, signing runs inline
+        self.signer = KucoinRequestSigner(self.api_key, self.api_secret, self.api_passphrase)
         
-        self.executor = ThreadPoolExecutor(max_workers=4)
         self.session = None
+
+        # keep-alive connection pool, warm_up_connections() before release time
+        self._init_warm_up()
+        # per-endpoint phase histograms (sign, connection, send, ttfb, parse)
+        self.latency = RequestLatencyRecorder()
         self.placed_limit_buy_id = []
         self.placed_limit_sell_id = []
         
@@ -53,41 +68,24 @@ class KucoinHFOrderManager:
 
         # track all created tasks
         self.pending_tasks = []
+
+        # push-based order state from the private order channel, see start_order_tracker
+        self.order_tracker = None
+        # streaming PnL, fed by the tracker's fill events
+        self.ledger = PnlLedger()
+
+        # process-wide token bucket, strategies running side by side share one budget
+        self.rate_limiter = get_scheduler("kucoin", self.RATE_LIMIT_CAPACITY, self.RATE_LIMIT_INTERVAL)
     
     def log_timestamp(self):
         """Simple utility function to log timestamps"""
         return datetime.now().strftime('%H:%M:%S.%f')[:-2]
 
 
-    async def _init_session(self):
-        """Initialize aiohttp session"""
-        if self.session is None:
-            timeout = aiohttp.ClientTimeout(total=5)
-            self.session = aiohttp.ClientSession(timeout=timeout)
-
     def _generate_signature(self, timestamp: str, method: str, endpoint: str, body: str = "") -> tuple:
         """Generate signature with minimal overhead"""
         try:
-            signature_string = f"{timestamp}{method}{endpoint}{body}"
-            secret_bytes = self.api_secret.encode('utf-8')
-            
-            signature_future = self.executor.submit(
-                lambda: base64.b64encode(
-                    hmac.new(secret_bytes, 
-                            signature_string.encode('utf-8'), 
-                            hashlib.sha256).digest()
-                ).decode('utf-8')
-            )
-            
-            passphrase_future = self.executor.submit(
-                lambda: base64.b64encode(
-                    hmac.new(secret_bytes,
-                            self.api_passphrase.encode('utf-8'),
-                            hashlib.sha256).digest()
-                ).decode('utf-8')
-            )
-            
-            return signature_future.result(), passphrase_future.result()
+            return self.signer.sign(timestamp, method, endpoint, body), self.signer.encrypted_passphrase
             
         except Exception as e:
             logger.error(f"Error generating signature: {str(e)}")
@@ -96,9 +94,9 @@ class KucoinHFOrderManager:
 
 
     def _prepare_order_data(self, symbol: str, side: str, price: str, size: str, 
-                             time_in_force: str = "GTC") -> Dict:
-        """Standardized order data preparation"""
-        return {
+                             time_in_force: str = "GTC", cancel_after: Optional[int] = None) -> Dict:
+        """Standardized order data preparation, cancel_after makes the exchange expire the order (GTT)"""
+        order_data = {
             "clientOid": str(uuid.uuid4()),
             "symbol": symbol,
             "type": "limit",
@@ -107,6 +105,10 @@ class KucoinHFOrderManager:
             "size": size,
             "timeInForce": time_in_force
         }
+        if cancel_after:
+            order_data["timeInForce"] = "GTT"
+            order_data["cancelAfter"] = int(cancel_after)
+        return order_data
 
 
 
@@ -154,26 +156,48 @@ class KucoinHFOrderManager:
             "order_size": size
         }
 
+    @staticmethod
+    def _rate_limit_class(method: str, endpoint: str) -> tuple:
+        """Request weight and priority: entry orders before cancels before status queries"""
+        if method == "POST":
+            return 1, PRIORITY_ENTRY
+        if method == "DELETE":
+            # cancel all by symbol costs more than a single cancel
+            return (3 if endpoint.startswith("/api/v1/orders?") or endpoint == "/api/v1/orders" else 1), PRIORITY_CANCEL
+        return 2, PRIORITY_STATUS
+
+    async def _acquire_permit(self, method: str, endpoint: str):
+        """Wait for a rate limit permit instead of running into a 429"""
+        weight, priority = self._rate_limit_class(method, endpoint)
+        await self.rate_limiter.acquire(weight, priority)
+
+    def _sync_rate_limit(self, response_headers):
+        """Lower the shared bucket to what the exchange reports as remaining"""
+        remaining = response_headers.get('gw-ratelimit-remaining')
+        if remaining is not None:
+            reset_ms = response_headers.get('gw-ratelimit-reset')
+            self.rate_limiter.sync(float(remaining), float(reset_ms) / 1000 if reset_ms else None)
+
     async def _make_request(self, method: str, endpoint: str, data: Dict = None) -> Dict:
         """Unified async API request method"""
         await self._init_session()
+        await self._acquire_permit(method, endpoint)
         url = f"{self.base_url}{endpoint}"
         timestamp = str(int(time.time() * 1000))
         
         body = json.dumps(data) if data else ""
         
         try:
-            signature, passphrase = self._generate_signature(timestamp, method, endpoint, body)
-            
-            headers = self._static_headers.copy()
-            headers.update({
-                "KC-API-SIGN": signature,
-                "KC-API-TIMESTAMP": timestamp,
-                "KC-API-PASSPHRASE": passphrase
-            })
+            sign_start = time.perf_counter_ns()
+            headers = self.signer.headers(timestamp, method, endpoint, body)
+            self.latency.time_phase(endpoint, "sign", sign_start)
 
             async with getattr(self.session, method.lower())(url, headers=headers, json=data) as response:
-                return await response.json()
+                self._sync_rate_limit(response.headers)
+                parse_start = time.perf_counter_ns()
+                result = await response.json()
+                self.latency.time_phase(endpoint, "read_parse", parse_start)
+                return result
 
         except Exception as e:
             logger.error(f"Request error: {str(e)}")
@@ -187,16 +211,19 @@ class KucoinHFOrderManager:
 
 
     async def place_limit_order(self, symbol: str, side: str, price: str, size: str, 
-                                 time_in_force: str = "GTC") -> Dict:
-        """Unified method for placing limit orders"""
+                                 time_in_force: str = "GTC", cancel_after: Optional[int] = None) -> Dict:
+        """Unified method for placing limit orders, cancel_after is the order time-to-live in seconds"""
         start_time = time.perf_counter()
         order_sent_time = datetime.now().strftime('%H:%M:%S.%f')[:-3]
         
         try:
-            order_data = self._prepare_order_data(symbol, side, price, size, time_in_force)
+            order_data = self._prepare_order_data(symbol, side, price, size, time_in_force, cancel_after)
             response = await self._make_request("POST", "/api/v1/hf/orders", order_data)
             #logger.debug(f"check orderId to append to order succesfull: {response.get('data',{}).get('orderId')}\n")
-            self.palced_orders.append(response.get('data',{})) 
+            placed = response.get('data') or {}
+            if response.get('code') == '200000':
+                placed.setdefault('clientOid', order_data['clientOid'])
+            self.palced_orders.append(placed)
             
             return await asyncio.create_task(self._process_order_response(
                 response, start_time, symbol, side, price, size, order_sent_time
@@ -251,6 +278,15 @@ class KucoinHFOrderManager:
             return response
         
 
+    async def cancel_orders(self, order_ids: List[str]) -> List[Dict]:
+        """Cancel the given order ids concurrently, other orders on the symbol are left alone"""
+        results = await asyncio.gather(*[self.cancel_order_by_id(order_id) for order_id in order_ids],
+                                       return_exceptions=True)
+        for order_id, result in zip(order_ids, results):
+            if isinstance(result, Exception):
+                logger.error(f"Error cancelling order {order_id}: {str(result)}")
+        return [result if not isinstance(result, Exception) else {"error": str(result)} for result in results]
+
     async def cancel_all_orders(self, basecoin: Optional[str] = None, trade_type: str = "TRADE") -> Dict:
         """
         Cancel all open orders, optionally filtered by symbol and trade type.
@@ -281,33 +317,107 @@ class KucoinHFOrderManager:
             return response
         
         except Exception as e:
-            return response
+            logger.error(f"Error cancelling all orders: {str(e)}")
+            return {"error": str(e)}
 
 
 
     async def place_limit_buy(self, symbol: str, price: str, size: str, 
-                               time_in_force: str = "GTC") -> Dict:
+                               time_in_force: str = "GTC", cancel_after: Optional[int] = None) -> Dict:
         """Convenience method for limit buy orders"""
-        return await self.place_limit_order(symbol, "buy", price, size, time_in_force)
+        return await self.place_limit_order(symbol, "buy", price, size, time_in_force, cancel_after)
 
     async def place_limit_sell(self, symbol: str, price: str, size: str, 
-                                time_in_force: str = "GTC") -> Dict:
+                                time_in_force: str = "GTC", cancel_after: Optional[int] = None) -> Dict:
         """Convenience method for limit sell orders"""
-        return await self.place_limit_order(symbol, "sell", price, size, time_in_force)
+        return await self.place_limit_order(symbol, "sell", price, size, time_in_force, cancel_after)
 
-    async def place_multiple_orders(self, orders: List[Dict]) -> List[Dict]:
-        """Place multiple orders concurrently"""
+    async def place_multiple_orders(self, orders: List[Dict], batch: bool = False) -> List[Dict]:
+        """Place multiple orders concurrently, optionally packed into HF batch requests"""
+        if batch:
+            return await self.place_multiple_orders_batch(orders)
         tasks = [
             self.place_limit_order(
                 symbol=order["symbol"],
                 side=order["side"],
                 price=order["price"],
                 size=order["size"],
-                time_in_force=order.get("time_in_force", "GTC")
+                time_in_force=order.get("time_in_force", "GTC"),
+                cancel_after=order.get("cancel_after")
             ) for order in orders
         ]
         return await asyncio.gather(*tasks)
 
+    async def place_multiple_orders_batch(self, orders: List[Dict]) -> List[Dict]:
+        """
+        Place orders through the HF multi-order endpoint.
+        Orders are grouped by symbol and split into chunks of MAX_BATCH_ORDERS,
+        the chunks are sent concurrently.
+        Args:
+            orders (List[Dict]): Orders in the same format as place_multiple_orders.
+        Returns:
+            List[Dict]: One result per order, in input order, shaped like _process_order_response.
+        """
+        chunks = []
+        by_symbol = {}
+        for index, order in enumerate(orders):
+            by_symbol.setdefault(order["symbol"], []).append((index, order))
+        for symbol_orders in by_symbol.values():
+            for i in range(0, len(symbol_orders), self.MAX_BATCH_ORDERS):
+                chunks.append(symbol_orders[i:i + self.MAX_BATCH_ORDERS])
+
+        chunk_results = await asyncio.gather(
+            *[self._place_order_chunk([order for _, order in chunk]) for chunk in chunks]
+        )
+
+        results = [None] * len(orders)
+        for chunk, chunk_result in zip(chunks, chunk_results):
+            for (index, _), result in zip(chunk, chunk_result):
+                results[index] = result
+        return results
+
+    async def _place_order_chunk(self, orders: List[Dict]) -> List[Dict]:
+        """Send one /api/v1/hf/orders/multi request and map the per-order results"""
+        start_time = time.perf_counter()
+        order_sent_time = datetime.now().strftime('%H:%M:%S.%f')[:-3]
+        order_list = [
+            self._prepare_order_data(order["symbol"], order["side"], order["price"],
+                                     order["size"], order.get("time_in_force", "GTC"),
+                                     order.get("cancel_after"))
+            for order in orders
+        ]
+
+        try:
+            response = await self._make_request("POST", "/api/v1/hf/orders/multi", {"orderList": order_list})
+        except Exception as e:
+            response = {"code": "ERROR", "msg": str(e)}
+
+        if response.get('code') == '200000':
+            items = response.get('data') or []
+            items = items + [{"success": False, "failMsg": "missing from batch response"}] * (len(order_list) - len(items))
+        else:
+            # whole request rejected, every order in the chunk failed with the same reason
+            items = [{"success": False, "failMsg": response.get('msg', 'Unknown error'),
+                      "code": response.get('code', 'ERROR')}] * len(order_list)
+
+        results = []
+        for order, order_data, item in zip(orders, order_list, items):
+            if item.get('success'):
+                placed = {
+                    "orderId": item.get('orderId'),
+                    "clientOid": item.get('clientOid') or order_data["clientOid"]
+                }
+                self.palced_orders.append(placed)
+                order_response = {"code": "200000", "data": placed}
+            else:
+                order_response = {"code": item.get('code', 'ERROR'), "msg": item.get('failMsg', 'Unknown error')}
+
+            results.append(await self._process_order_response(
+                order_response, start_time, order["symbol"], order["side"],
+                order["price"], order["size"], order_sent_time
+            ))
+        return results
+
 
 
     async def get_order_status_by_clientid(self,clientOid: str) -> Dict:
@@ -316,19 +426,19 @@ class KucoinHFOrderManager:
 
         endpoint = f"/api/v1/order/client-order/{clientOid}"
         
+        await self._acquire_permit("GET", endpoint)
         timestamp = str(int(time.time() * 1000))
-        signature, passphrase = self._generate_signature(timestamp, "GET", endpoint)
-        
-        headers = self._static_headers.copy()
-        headers.update({
-            "KC-API-SIGN": signature,
-            "KC-API-TIMESTAMP": timestamp,
-            "KC-API-PASSPHRASE": passphrase
-        })
+        sign_start = time.perf_counter_ns()
+        headers = self.signer.headers(timestamp, "GET", endpoint)
+        self.latency.time_phase(endpoint, "sign", sign_start)
 
         try:
             async with self.session.get(f"{self.base_url}{endpoint}", headers=headers) as response:
-                return await response.json()
+                self._sync_rate_limit(response.headers)
+                parse_start = time.perf_counter_ns()
+                result = await response.json()
+                self.latency.time_phase(endpoint, "read_parse", parse_start)
+                return result
         
         except Exception as e:
             logger.error(f"Error retrieving order status: {str(e)}")
@@ -341,19 +451,19 @@ class KucoinHFOrderManager:
 
         endpoint = f"/api/v1/orders/{order_id}"
 
+        await self._acquire_permit("GET", endpoint)
         timestamp = str(int(time.time() * 1000))
-        signature, passphrase = self._generate_signature(timestamp, "GET", endpoint)
-        
-        headers = self._static_headers.copy()
-        headers.update({
-            "KC-API-SIGN": signature,
-            "KC-API-TIMESTAMP": timestamp,
-            "KC-API-PASSPHRASE": passphrase
-        })
+        sign_start = time.perf_counter_ns()
+        headers = self.signer.headers(timestamp, "GET", endpoint)
+        self.latency.time_phase(endpoint, "sign", sign_start)
 
         try:
             async with self.session.get(f"{self.base_url}{endpoint}", headers=headers) as response:
-                return await response.json()
+                self._sync_rate_limit(response.headers)
+                parse_start = time.perf_counter_ns()
+                result = await response.json()
+                self.latency.time_phase(endpoint, "read_parse", parse_start)
+                return result
         
         except Exception as e:
             logger.error(f"Error retrieving order status: {str(e)}")
@@ -377,17 +487,29 @@ class KucoinHFOrderManager:
 
 
 
-    async def check_if_order_filled(self):
+    async def start_order_tracker(self) -> KucoinOrderTracker:
+        """Subscribe to the private order channel so fills are pushed instead of polled"""
+        if self.order_tracker is None:
+            tracker = KucoinOrderTracker(self.signer, self.base_url)
+            tracker.fill_callbacks.append(self.ledger.on_fill_event)
+            await tracker.start()
+            self.order_tracker = tracker
+        return self.order_tracker
+
+    async def check_if_order_filled(self, timeout: float = 4):
         """Check if placed orders have been filled and store them accordingly."""
+        if self.order_tracker and self.order_tracker.is_running:
+            await self._collect_fills_from_tracker(timeout)
+            return
         #print(self.succesfully_palced_orders)
     
         for order_info in self.palced_orders:
             order_client_id = order_info.get('clientOid')
             start_time = datetime.now()
-            timeout = timedelta(seconds=4)
+            poll_timeout = timedelta(seconds=timeout)
 
             while True:
-                if datetime.now() - start_time > timeout:
+                if datetime.now() - start_time > poll_timeout:
                     break
 
                 try:
@@ -417,9 +539,64 @@ class KucoinHFOrderManager:
                 await asyncio.sleep(0.2)
 
 
+    async def get_active_orders(self, symbol: str) -> Dict:
+        """Open HF orders of a symbol (e.g. 'XRP-USDT')"""
+        endpoint = f"/api/v1/hf/orders/active?symbol={symbol}"
+        try:
+            return await self._make_request("GET", endpoint)
+        except Exception as e:
+            logger.error(f"Error retrieving active orders: {str(e)}")
+            return {"error": str(e)}
+
+    async def unexpired_orders(self, order_results: List[Dict]) -> List[str]:
+        """
+        Order ids from successful results that are still open.
+        Used after a cancelAfter time-to-live to detect orders the exchange did not expire.
+        Read from the order tracker when it runs, otherwise from one open-orders request per symbol;
+        if that request fails every placed order is reported, the caller's cancel is the safe side.
+        """
+        placed = [result for result in order_results if result.get('success')]
+        if not placed:
+            return []
+        if self.order_tracker and self.order_tracker.is_running:
+            open_orders = []
+            for result in placed:
+                state = self.order_tracker.get(order_id=result['orderId'])
+                if not (state and self.order_tracker.is_done(state)):
+                    open_orders.append(result['orderId'])
+            return open_orders
+
+        active_ids = set()
+        for symbol in {result['currency_pair'] for result in placed}:
+            response = await self.get_active_orders(symbol)
+            if response.get('code') != '200000':
+                logger.error(f"Open orders of {symbol} unavailable, treating placed orders as open: "
+                             f"{response.get('msg') or response.get('error')}")
+                return [result['orderId'] for result in placed]
+            active_ids.update(order.get('id') for order in response.get('data') or [])
+        return [result['orderId'] for result in placed if result['orderId'] in active_ids]
+
+    async def _collect_fills_from_tracker(self, timeout: float):
+        """Wait on pushed order events concurrently, REST only for orders the stream never confirmed"""
+        client_oids = [order.get('clientOid') for order in self.palced_orders if order.get('clientOid')]
+        await self.order_tracker.wait_filled_or_done(client_oids, timeout)
+        await self.order_tracker.reconcile(self, client_oids)
+
+        for client_oid in client_oids:
+            order_data = self.order_tracker.get(client_oid=client_oid)
+            if not order_data or not self.order_tracker.is_filled(order_data):
+                continue
+            if order_data.get('side') == 'buy':
+                self.filled_buy_orders.append(order_data)
+            elif order_data.get('side') == 'sell':
+                self.filled_sell_orders.append(order_data)
+
+
     async def performance_snapshot(self, basecoin: str) -> Dict:
         """
         Analyze trading performance for a specific base coin.
+        With a running order tracker the streamed ledger is used and no request is made,
+        otherwise the last 24h fills are fetched once and replayed through a FIFO ledger.
         Args:
             basecoin (str): Base coin symbol (e.g., 'XRP')
         Returns:
@@ -427,75 +604,36 @@ class KucoinHFOrderManager:
         """
         # Construct full symbol
         symbol = f"{basecoin}-USDT"
+        if self.order_tracker and self.order_tracker.is_running:
+            return self.ledger.snapshot(symbol)
+
         # Get filled orders from last 24 hours
         filled_orders = await self.all_filled_orders_last_24H()
-        # Filter orders for the specific symbol
-        symbol_orders = [order for order in filled_orders if order['symbol'] == symbol]
-        # Performance tracking
-        performance = {
-            'symbol': symbol,
-            'total_trades': len(symbol_orders),
-            'buy_trades': 0,
-            'sell_trades': 0,
-            'total_volume': 0,
-            'USDT_buy': 0,
-            'USDT_sell': 0,
-            'total_profit_loss': 0,
-            'profit_loss_percentage': 0
-        }
-        # Track buy and sell trades
-        buy_entries = []
-        sell_exits = []
-        
-        for trade in symbol_orders:
-            # Update trade counts and volume
-            side = trade['side']
-            size = float(trade['size'])
-            price = float(trade['price'])
-            funds = float(trade['funds'])
-            
-            performance['total_volume'] += size
-            
-            if side == 'buy':
-                performance['buy_trades'] += 1
-                performance['USDT_buy'] += funds
-                buy_entries.append({'price': price, 'size': size, 'funds': funds})
-            else:  # sell
-                performance['sell_trades'] += 1
-                performance['USDT_sell'] += funds
-                sell_exits.append({'price': price, 'size': size, 'funds': funds})
-        
-        # Calculate profit/loss
-        if buy_entries and sell_exits:
-            # Simple average cost and selling price calculation
-            avg_buy_price = sum(entry['price'] * entry['size'] for entry in buy_entries) / sum(entry['size'] for entry in buy_entries)
-            avg_sell_price = sum(exit['price'] * exit['size'] for exit in sell_exits) / sum(exit['size'] for exit in sell_exits)
-            
-            # Assume total traded size is the same
-            total_traded_size = min(sum(entry['size'] for entry in buy_entries), 
-                                    sum(exit['size'] for exit in sell_exits))
-            
-            # Calculate profit/loss
-            total_profit_loss = (avg_sell_price - avg_buy_price) * total_traded_size
-            performance['total_profit_loss'] = round(total_profit_loss, 2)
-            
-            # Calculate profit/loss percentage
-            # Use total buy funds as the base for percentage calculation
-            total_buy_funds = sum(entry['funds'] for entry in buy_entries)
-            performance['profit_loss_percentage'] = round((total_profit_loss / total_buy_funds) * 100, 2)
-        
-        return performance
+        ledger = PnlLedger()
+        if isinstance(filled_orders, list):
+            # fills come newest first, FIFO needs them in execution order
+            symbol_orders = [order for order in filled_orders if order['symbol'] == symbol]
+            for trade in sorted(symbol_orders, key=lambda trade: trade.get('createdAt', 0)):
+                ledger.on_fill_event(trade)
+        return ledger.snapshot(symbol)
     
 
 
+    def latency_report(self) -> Dict:
+        """Per-endpoint phase histograms of every request made by this manager"""
+        return self.latency.report()
+
     async def close(self):
-        """Close the aiohttp session and thread pool"""
+        """Close the aiohttp session"""
+        if self._keep_alive_task:
+            self._keep_alive_task.cancel()
+        if self.order_tracker:
+            await self.order_tracker.close()
         if self.pending_tasks:
             logger.info("Waiting for pending tasks to complete...")
             await asyncio.gather(*self.pending_tasks)
         if self.session:
             await self.session.close()
-        self.executor.shutdown(wait=False)
 
 
 
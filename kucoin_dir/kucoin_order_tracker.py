@@ -0,0 +1,263 @@
+import asyncio
+import aiohttp
+import orjson
+import logging
+import time
+import uuid
+from typing import Dict, Any, Optional, List, Callable
+from kucoin_request_signer import KucoinRequestSigner
+from kucoin_endpoints import API_URL
+
+# Configure logging
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+console_handler = logging.StreamHandler()
+formatter = logging.Formatter('%(asctime)s.%(msecs)03d - %(levelname)s - %(message)s - %(funcName)s', datefmt='%H:%M:%S')
+console_handler.setFormatter(formatter)
+logger.addHandler(console_handler)
+logger.propagate = False
+
+
+class KucoinOrderTracker:
+    """
+    Order state store fed by the private /spotMarket/tradeOrders channel.
+
+    Orders are indexed by orderId and clientOid (O(1) lookup either way) and
+    every order has awaitable "filled" (first execution) and "done"
+    (filled or canceled) futures. Orders the stream never confirmed can be
+    reconciled over REST with reconcile().
+    """
+    TOPIC = "/spotMarket/tradeOrders"
+
+    def __init__(self, signer: KucoinRequestSigner, api_url: str = API_URL):
+        self.signer = signer
+        self.api_url = api_url
+
+        # order state, orderId -> latest merged state, clientOid -> orderId
+        self.orders: Dict[str, Dict[str, Any]] = {}
+        self.client_oid_index: Dict[str, str] = {}
+
+        # futures are keyed by clientOid, it is known before the order is sent
+        self._filled_futures: Dict[str, asyncio.Future] = {}
+        self._done_futures: Dict[str, asyncio.Future] = {}
+
+        # called with every execution event, e.g. to feed a PnL ledger
+        self.fill_callbacks: List[Callable[[Dict[str, Any]], None]] = []
+
+        # WebSocket state
+        self.ws_connection = None
+        self.ws_session = None
+        # is_running: subscription acked and events flowing; _connected: socket loops alive
+        self.is_running = False
+        self._connected = False
+        self._connection_ready = asyncio.Event()
+        self._ping_interval = 18
+        self._tasks = []
+        self.events_received = 0
+
+    ###########################################
+    # order state store
+
+    def get(self, order_id: str = None, client_oid: str = None) -> Optional[Dict[str, Any]]:
+        """Latest known state of an order by orderId or clientOid"""
+        if order_id is None and client_oid is not None:
+            order_id = self.client_oid_index.get(client_oid)
+        return self.orders.get(order_id) if order_id else None
+
+    def _future(self, futures: Dict[str, asyncio.Future], client_oid: str) -> asyncio.Future:
+        future = futures.get(client_oid)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            futures[client_oid] = future
+        return future
+
+    @staticmethod
+    def is_filled(state: Dict[str, Any]) -> bool:
+        return float(state.get('filledSize') or state.get('dealSize') or 0) > 0
+
+    @staticmethod
+    def is_done(state: Dict[str, Any]) -> bool:
+        return state.get('status') == 'done' or state.get('isActive') is False
+
+    def apply_update(self, data: Dict[str, Any]):
+        """Merge one order event (stream or REST) into the store and resolve futures"""
+        order_id = data.get('orderId') or data.get('id')
+        if not order_id:
+            return
+        state = self.orders.get(order_id)
+        if state is None:
+            state = self.orders[order_id] = {}
+        state.update(data)
+        state['orderId'] = order_id
+        state['time_updated_ns'] = time.time_ns()
+
+        client_oid = state.get('clientOid')
+        if client_oid:
+            self.client_oid_index[client_oid] = order_id
+            if self.is_filled(state):
+                future = self._future(self._filled_futures, client_oid)
+                if not future.done():
+                    future.set_result(state)
+            if self.is_done(state):
+                future = self._future(self._done_futures, client_oid)
+                if not future.done():
+                    future.set_result(state)
+
+        if data.get('type') == 'match':
+            for callback in self.fill_callbacks:
+                try:
+                    callback(data)
+                except Exception as e:
+                    logger.error(f"Fill callback error: {e}")
+
+    async def wait_filled(self, client_oid: str, timeout: float = None) -> Optional[Dict[str, Any]]:
+        """Wait until the order has its first execution, None on timeout"""
+        try:
+            return await asyncio.wait_for(asyncio.shield(self._future(self._filled_futures, client_oid)), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def wait_done(self, client_oid: str, timeout: float = None) -> Optional[Dict[str, Any]]:
+        """Wait until the order is fully filled or canceled, None on timeout"""
+        try:
+            return await asyncio.wait_for(asyncio.shield(self._future(self._done_futures, client_oid)), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def wait_filled_or_done(self, client_oids: List[str], timeout: float) -> None:
+        """Wait until every order has a fill or is done, at most timeout seconds"""
+        pending = [
+            asyncio.ensure_future(asyncio.wait(
+                [asyncio.shield(self._future(self._filled_futures, oid)),
+                 asyncio.shield(self._future(self._done_futures, oid))],
+                return_when=asyncio.FIRST_COMPLETED))
+            for oid in client_oids
+        ]
+        if not pending:
+            return
+        done, not_done = await asyncio.wait(pending, timeout=timeout)
+        for task in not_done:
+            task.cancel()
+
+    def unconfirmed(self, client_oids: List[str]) -> List[str]:
+        """clientOids the stream has not reported at all"""
+        return [oid for oid in client_oids if oid not in self.client_oid_index
+                or self.client_oid_index[oid] not in self.orders]
+
+    async def reconcile(self, order_manager, client_oids: List[str]) -> int:
+        """REST lookup only for orders the stream never confirmed, returns the number reconciled"""
+        missing = self.unconfirmed(client_oids)
+        if not missing:
+            return 0
+        responses = await asyncio.gather(
+            *[order_manager.get_order_status_by_clientid(oid) for oid in missing]
+        )
+        reconciled = 0
+        for response in responses:
+            if response.get('code') == '200000' and response.get('data'):
+                self.apply_update(response['data'])
+                reconciled += 1
+        logger.info(f"Reconciled {reconciled}/{len(missing)} orders over REST")
+        return reconciled
+
+    ###########################################
+    # private websocket connection
+
+    async def get_ws_token(self) -> Optional[Dict[str, Any]]:
+        """Private bullet token and instance servers"""
+        endpoint = "/api/v1/bullet-private"
+        headers = self.signer.headers(str(int(time.time() * 1000)), "POST", endpoint)
+        try:
+            async with aiohttp.ClientSession() as session:
+                async with session.post(f"{self.api_url}{endpoint}", headers=headers,
+                                        timeout=aiohttp.ClientTimeout(total=5)) as response:
+                    data = await response.json(loads=orjson.loads)
+                    if data.get('code') == '200000':
+                        return data['data']
+                    logger.error(f"Private token request failed: {data.get('msg')}")
+                    return None
+        except Exception as e:
+            logger.error(f"Private token retrieval error: {e}")
+            return None
+
+    async def start(self):
+        """
+        Connect, subscribe and process order events in the background.
+        If the subscription is not acked within 5s everything opened so far is closed and the error re-raised.
+        """
+        token_data = await self.get_ws_token()
+        if not token_data:
+            raise Exception("Failed to obtain private WebSocket token")
+
+        server = token_data['instanceServers'][0]
+        self._ping_interval = server.get('pingInterval', 18000) / 1000
+        ws_url = f"{server['endpoint']}?token={token_data['token']}&connectId={uuid.uuid4()}"
+
+        try:
+            self.ws_session = aiohttp.ClientSession()
+            self.ws_connection = await self.ws_session.ws_connect(ws_url, receive_timeout=60)
+            await self.ws_connection.send_str(orjson.dumps({
+                "id": str(uuid.uuid4()),
+                "type": "subscribe",
+                "topic": self.TOPIC,
+                "privateChannel": True,
+                "response": True
+            }).decode('utf-8'))
+
+            self._connected = True
+            self._tasks = [asyncio.create_task(self._message_loop()),
+                           asyncio.create_task(self._keep_alive())]
+            await asyncio.wait_for(self._connection_ready.wait(), timeout=5)
+        except (Exception, asyncio.CancelledError):
+            # the caller never gets a usable tracker, nothing else could close these
+            await self.close()
+            raise
+        self.is_running = True
+        logger.info(f"Order tracker subscribed to {self.TOPIC}")
+
+    async def _message_loop(self):
+        while self._connected:
+            try:
+                msg = await self.ws_connection.receive()
+                if msg.type == aiohttp.WSMsgType.TEXT:
+                    data = orjson.loads(msg.data)
+                    msg_type = data.get('type')
+                    if msg_type == 'message':
+                        self.events_received += 1
+                        self.apply_update(data['data'])
+                    elif msg_type == 'ack':
+                        self._connection_ready.set()
+                    elif msg_type == 'error':
+                        logger.error(f"Order channel error: {data}")
+                elif msg.type in (aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.ERROR):
+                    logger.warning(f"Order channel state changed: {msg.type}")
+                    break
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Order channel loop error: {e}")
+                break
+        self._connected = False
+        self.is_running = False
+
+    async def _keep_alive(self):
+        while self._connected:
+            try:
+                await asyncio.sleep(self._ping_interval)
+                await self.ws_connection.send_str(orjson.dumps({"id": str(uuid.uuid4()), "type": "ping"}).decode('utf-8'))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Order channel keep-alive error: {e}")
+                break
+
+    async def close(self):
+        """Stop background tasks and close the connection"""
+        self._connected = False
+        self.is_running = False
+        for task in self._tasks:
+            task.cancel()
+        if self.ws_connection and not self.ws_connection.closed:
+            await self.ws_connection.close()
+        if self.ws_session and not self.ws_session.closed:
+            await self.ws_session.close()
@@ -0,0 +1,239 @@
+import csv
+import glob
+import logging
+import os
+import re
+import sys
+import time
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+import numpy as np
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "common"))
+from stream_writer import capture_entries
+from trade_archive import TradeArchive, TRADE_DTYPE, SIDE_SELL, trade_record
+from kucoin_match_order_strategy_V2 import MatchStrategyTrader
+
+# Configure logging
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+console_handler = logging.StreamHandler()
+formatter = logging.Formatter('%(asctime)s.%(msecs)03d - %(levelname)s - %(message)s - %(funcName)s', datefmt='%H:%M:%S')
+console_handler.setFormatter(formatter)
+logger.addHandler(console_handler)
+logger.propagate = False
+
+# grid axes, in the order of the result arrays
+GRID_AXES = ("buy_step", "buy_count", "sell_pct", "sell_trigger", "cancel_delay")
+DEFAULT_GRID = {
+    "buy_step": [0.5, 1, 1.5, 2, 3, 5],             # price_increase_buy, % between ladder orders
+    "buy_count": list(range(1, 13)),                # num_orders_buy
+    "sell_pct": [1, 2, 3, 5, 8, 10, 15, 20],        # price_increase_sell, % above the trigger match
+    "sell_trigger": [2, 3, 4, 5, 6, 7, 8],          # sells in a row before the sell ladder
+    "cancel_delay": [1, 2, 4, 6, 10]                # buy_order_ttl, s
+}
+
+_RELEASE_DIR = re.compile(r'^(\d{4}-\d{2}-\d{2})_(\d{2}-\d{2})_(.+)$')
+_SECOND = 1_000_000_000
+
+
+class SessionSeries:
+    """Match series of one release as arrays: receive ns, price and taker side"""
+
+    def __init__(self, name: str, symbol: str, records: np.ndarray, release_ns: int):
+        self.name = name
+        self.symbol = symbol
+        self.release_ns = release_ns
+        self.t = np.ascontiguousarray(records["ts_received_ns"])
+        self.price = np.ascontiguousarray(records["price"])
+        self.side = np.ascontiguousarray(records["side"])
+
+
+def load_series(source: str, minutes: float = 5, pre_release_seconds: float = 30) -> Optional[SessionSeries]:
+    """
+    First minutes of matches after the release (from pre_release_seconds before it, when the
+    live loop starts listening) of a release folder or a trade_archive .trades file.
+    """
+    if source.endswith(".trades"):
+        archive = TradeArchive(source)
+        records = np.array(archive.window_after_release(-pre_release_seconds, minutes * 60))
+        return SessionSeries(os.path.basename(source)[:-len(".trades")], archive.metadata["symbol"], records,
+                             archive.release_ns)
+
+    name = os.path.basename(os.path.normpath(source))
+    match = _RELEASE_DIR.match(name)
+    if not match:
+        return None
+    date, hour_minute, symbol = match.groups()
+    paths = glob.glob(os.path.join(source, f"{symbol}_match_data.*json"))
+    if not paths:
+        return None
+    release_ns = int(datetime.strptime(f"{date} {hour_minute}", '%Y-%m-%d %H-%M').timestamp()) * _SECOND
+    records = np.array([trade_record("kucoin", entry, date) for entry in capture_entries(sorted(paths)[-1])],
+                       dtype=TRADE_DTYPE)
+    records = records[np.argsort(records["ts_received_ns"], kind="stable")]
+    t = records["ts_received_ns"]
+    start, end = np.searchsorted(t, [release_ns - int(pre_release_seconds * _SECOND),
+                                     release_ns + int(minutes * 60 * _SECOND)])
+    return SessionSeries(name, symbol, records[start:end], release_ns)
+
+
+def sweep_session(series: SessionSeries, grid: Dict[str, np.ndarray], ack_ns: int,
+                  num_orders_sell: int = 12, fee: float = 0.001) -> Optional[Dict[str, np.ndarray]]:
+    """
+    PnL of every grid point over one session, shape (buy_step, buy_count, sell_pct, sell_trigger, cancel_delay).
+
+    Same decisions as MatchStrategyTrader.strategy, with a coarse fill model so
+    the whole grid is one set of array operations: a buy level fills at its
+    limit at the first trade priced at or below it before cancel_delay, the sell
+    ladder fills if any later trade reaches its price. Volume and queue position
+    are ignored; check the top of the table with kucoin_backtest.
+    """
+    t, price, side = series.t, series.price, series.side
+    if len(t) == 0:
+        return None
+    # the live sizing table, self is not used
+    sizing = MatchStrategyTrader.order_size_and_rounding(None, price[0])
+    if sizing is None:
+        return None
+    buy_size, buy_decimals = float(sizing[0]), sizing[1]
+    never = np.iinfo(np.int64).max
+
+    buy_step = grid["buy_step"]
+    buy_count = grid["buy_count"]
+    sell_pct = grid["sell_pct"]
+    sell_trigger = grid["sell_trigger"]
+    cancel_ns = (grid["cancel_delay"] * _SECOND).astype(np.int64)
+
+    # buy ladder on the first match, live after the ack
+    live_ns = t[0] + ack_ns
+    max_count = int(buy_count.max())
+    levels = np.round(price[0] * (1 + np.arange(1, max_count + 1)[None, :] * buy_step[:, None] / 100),
+                      buy_decimals)                                                   # (B, Kmax)
+    start = np.searchsorted(t, live_ns)
+    after_t, running_min = t[start:], np.minimum.accumulate(price[start:])
+    if len(after_t):
+        # running_min is non-increasing: first trade at or below each level
+        first = np.searchsorted(-running_min, -levels, side="left")
+        fill_t = np.where(first < len(after_t), after_t[np.minimum(first, len(after_t) - 1)], never)
+    else:
+        fill_t = np.full(levels.shape, never)
+    expiry = live_ns + cancel_ns                                                      # (D,)
+    filled = fill_t[:, :, None] <= expiry[None, None, :]                              # (B, Kmax, D)
+    take = buy_count - 1
+    bought = np.cumsum(filled, axis=1)[:, take, :] * buy_size                         # (B, K, D)
+    cost = np.cumsum(levels[:, :, None] * filled, axis=1)[:, take, :] * buy_size      # (B, K, D)
+
+    # sell ladder after sell_trigger sells in a row, counted from the first match
+    index = np.arange(len(t))
+    is_sell = side == SIDE_SELL
+    run = index - np.maximum.accumulate(np.where(is_sell, -1, index))
+    reached = run[None, :] >= sell_trigger[:, None]                                   # (C, n)
+    triggered = reached.any(axis=1)
+    trigger_index = reached.argmax(axis=1)
+    # the loop reads the trigger message only once the buy placement returned
+    sell_live = np.maximum(t[trigger_index], live_ns) + ack_ns                        # (C,)
+
+    sell_size = np.zeros(len(sell_trigger))
+    sell_price = np.zeros((len(sell_pct), len(sell_trigger)))
+    sell_filled = np.zeros((len(sell_pct), len(sell_trigger)), dtype=bool)
+    for c in np.flatnonzero(triggered):
+        trigger_price = price[trigger_index[c]]
+        size, decimals = MatchStrategyTrader.order_size_and_rounding(None, trigger_price) or sizing
+        sell_size[c] = float(size)
+        sell_price[:, c] = np.round(trigger_price * (1 + sell_pct / 100), decimals)
+        later = price[np.searchsorted(t, sell_live[c]):]
+        sell_filled[:, c] = later.max() >= sell_price[:, c] if len(later) else False
+
+    # sells beyond the balance at placement are rejected
+    held_until = np.minimum(expiry[None, :], sell_live[:, None])                      # (C, D)
+    held = np.cumsum(fill_t[:, :, None, None] <= held_until[None, None, :, :], axis=1)[:, take, :, :] * buy_size
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sell_orders = np.where(triggered[None, None, :, None] & (sell_size[None, None, :, None] > 0),
+                               np.minimum(num_orders_sell,
+                                          np.floor(held / sell_size[None, None, :, None] + 1e-9)), 0)  # (B, K, C, D)
+    sold = sell_orders[:, :, None, :, :] * sell_size[None, None, None, :, None] \
+        * sell_filled[None, None, :, :, None]                                         # (B, K, S, C, D)
+    revenue = sold * sell_price[None, None, :, :, None]
+
+    last = price[-1]
+    bought = bought[:, :, None, None, :]
+    cost = cost[:, :, None, None, :]
+    pnl = revenue * (1 - fee) - cost * (1 + fee) + (bought - sold) * last
+    return {"pnl": pnl, "buy_notional": np.broadcast_to(cost, pnl.shape), "traded": np.broadcast_to(bought > 0, pnl.shape)}
+
+
+def sweep(sources: List[str], grid: Optional[Dict[str, List[float]]] = None, minutes: float = 5,
+          ack_ms: float = 40.0, num_orders_sell: int = 12, fee: float = 0.001) -> Dict[str, Any]:
+    """Every grid point over every session; totals per grid point plus each session's pnl array"""
+    grid = {axis: np.asarray((grid or DEFAULT_GRID)[axis], dtype=float) for axis in GRID_AXES}
+    grid["buy_count"] = grid["buy_count"].astype(np.int64)
+    grid["sell_trigger"] = grid["sell_trigger"].astype(np.int64)
+    shape = tuple(len(grid[axis]) for axis in GRID_AXES)
+
+    started = time.monotonic()
+    series = [s for s in (load_series(source, minutes) for source in sources) if s is not None]
+    loaded = time.monotonic()
+
+    total_pnl = np.zeros(shape)
+    buy_notional = np.zeros(shape)
+    traded = np.zeros(shape, dtype=np.int64)
+    wins = np.zeros(shape, dtype=np.int64)
+    sessions = {}
+    for session in series:
+        result = sweep_session(session, grid, int(ack_ms * 1e6), num_orders_sell, fee)
+        if result is None:
+            continue
+        total_pnl += result["pnl"]
+        buy_notional += result["buy_notional"]
+        traded += result["traded"]
+        wins += result["traded"] & (result["pnl"] > 0)
+        sessions[session.name] = result["pnl"]
+    done = time.monotonic()
+    logger.info(f"Swept {np.prod(shape)} combinations over {len(sessions)} sessions in {done - started:.2f}s "
+                f"(loading {loaded - started:.2f}s, evaluation {done - loaded:.2f}s)")
+    return {"grid": grid, "total_pnl": total_pnl, "buy_notional": buy_notional, "traded": traded,
+            "wins": wins, "sessions": sessions}
+
+
+def ranked(results: Dict[str, Any], top: int = 20) -> List[Dict[str, Any]]:
+    """Grid points ordered by total PnL, best first"""
+    total_pnl = results["total_pnl"]
+    order = np.argsort(total_pnl, axis=None)[::-1][:top]
+    rows = []
+    for flat in order:
+        point = np.unravel_index(flat, total_pnl.shape)
+        row = {axis: results["grid"][axis][i].item() for axis, i in zip(GRID_AXES, point)}
+        traded = int(results["traded"][point])
+        notional = results["buy_notional"][point]
+        row.update({
+            "total_pnl": round(float(total_pnl[point]), 4),
+            "return_pct": round(float(total_pnl[point] / notional * 100), 2) if notional else 0.0,
+            "traded": traded,
+            "win_rate": round(int(results["wins"][point]) / traded, 3) if traded else None
+        })
+        rows.append(row)
+    return rows
+
+
+def save_table(rows: List[Dict[str, Any]], path: str):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+if __name__ == "__main__":
+    # python kucoin_param_sweep.py <archive dir | trade archive dir>[,...] [minutes] [table.csv]
+    #   python kucoin_param_sweep.py kucoin_release_data_initial,kucoin_relisting_data_relisting 5
+    sources = []
+    for directory in sys.argv[1].split(","):
+        sources += sorted(glob.glob(os.path.join(directory, "*.trades"))) or \
+            sorted(os.path.join(directory, name) for name in os.listdir(directory))
+    results = sweep(sources, minutes=float(sys.argv[2]) if len(sys.argv) > 2 else 5)
+    table = ranked(results, top=20)
+    print(" ".join(f"{column:>12}" for column in table[0]))
+    for row in table:
+        print(" ".join(f"{str(value):>12}" for value in row.values()))
+    if len(sys.argv) > 3:
+        save_table(ranked(results, top=results["total_pnl"].size), sys.argv[3])
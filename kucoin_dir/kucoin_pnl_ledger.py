@@ -0,0 +1,132 @@
+from collections import deque
+from typing import Dict, Any
+
+
+class SymbolLedger:
+    """FIFO lot ledger for one symbol, every update is O(1) amortized"""
+
+    def __init__(self, symbol: str):
+        self.symbol = symbol
+        # open lots as [price, size], all on the side of the current position
+        self.lots = deque()
+        self.position = 0.0        # signed base size, > 0 long, < 0 short
+        self.position_cost = 0.0   # sum(price * size) over open lots
+        self.realized_pnl = 0.0
+        self.fees = 0.0
+        self.last_price = None
+
+        self.buy_trades = 0
+        self.sell_trades = 0
+        self.total_volume = 0.0
+        self.usdt_buy = 0.0
+        self.usdt_sell = 0.0
+
+    def add_fill(self, side: str, price: float, size: float, fee: float = 0.0):
+        """Apply one execution, closing opposite lots first in FIFO order"""
+        self.total_volume += size
+        self.fees += fee
+        self.last_price = price
+        if side == 'buy':
+            self.buy_trades += 1
+            self.usdt_buy += price * size
+            direction = 1
+        else:
+            self.sell_trades += 1
+            self.usdt_sell += price * size
+            direction = -1
+
+        remaining = size
+        # close lots of the opposite position
+        while remaining > 0 and self.lots and self.position * direction < 0:
+            lot = self.lots[0]
+            closed = min(lot[1], remaining)
+            # long closed by a sell: (exit - entry), short closed by a buy: (entry - exit)
+            self.realized_pnl += (price - lot[0]) * closed * -direction
+            self.position_cost -= lot[0] * closed
+            self.position += closed * direction
+            lot[1] -= closed
+            remaining -= closed
+            if lot[1] <= 1e-12:
+                self.lots.popleft()
+
+        if remaining > 0:
+            self.lots.append([price, remaining])
+            self.position_cost += price * remaining
+            self.position += remaining * direction
+
+        if not self.lots:
+            self.position = 0.0
+            self.position_cost = 0.0
+
+    def mark(self, price: float):
+        """Update the mark price used for unrealized PnL"""
+        self.last_price = price
+
+    @property
+    def unrealized_pnl(self) -> float:
+        if not self.lots or self.last_price is None:
+            return 0.0
+        if self.position > 0:
+            return self.last_price * self.position - self.position_cost
+        return self.position_cost - self.last_price * -self.position
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Performance summary, same keys as KucoinHFOrderManager.performance_snapshot plus ledger details"""
+        realized_net = self.realized_pnl - self.fees
+        return {
+            'symbol': self.symbol,
+            'total_trades': self.buy_trades + self.sell_trades,
+            'buy_trades': self.buy_trades,
+            'sell_trades': self.sell_trades,
+            'total_volume': self.total_volume,
+            'USDT_buy': self.usdt_buy,
+            'USDT_sell': self.usdt_sell,
+            'total_profit_loss': round(self.realized_pnl, 2),
+            'profit_loss_percentage': round(self.realized_pnl / self.usdt_buy * 100, 2) if self.usdt_buy else 0,
+            'realized_pnl': self.realized_pnl,
+            'realized_pnl_after_fees': realized_net,
+            'unrealized_pnl': self.unrealized_pnl,
+            'fees': self.fees,
+            'position_size': self.position,
+            'avg_entry_price': abs(self.position_cost / self.position) if self.position else None,
+            'mark_price': self.last_price
+        }
+
+
+class PnlLedger:
+    """Per-symbol streaming PnL ledger fed by fill events, snapshots need no network call"""
+
+    def __init__(self):
+        self.symbols: Dict[str, SymbolLedger] = {}
+        self._seen_trade_ids = set()
+
+    def get(self, symbol: str) -> SymbolLedger:
+        ledger = self.symbols.get(symbol)
+        if ledger is None:
+            ledger = self.symbols[symbol] = SymbolLedger(symbol)
+        return ledger
+
+    def on_fill_event(self, event: Dict[str, Any]) -> bool:
+        """
+        Consume one fill, either a private tradeOrders 'match' event or a REST /fills item.
+        Returns False for duplicates already seen under the same tradeId.
+        """
+        trade_id = event.get('tradeId')
+        if trade_id is not None:
+            key = (trade_id, event.get('orderId'))
+            if key in self._seen_trade_ids:
+                return False
+            self._seen_trade_ids.add(key)
+
+        price = float(event.get('matchPrice') or event['price'])
+        size = float(event.get('matchSize') or event['size'])
+        fee = float(event.get('fee') or 0)
+        self.get(event['symbol']).add_fill(event['side'], price, size, fee)
+        return True
+
+    def mark(self, symbol: str, price: float):
+        if symbol in self.symbols:
+            self.symbols[symbol].mark(float(price))
+
+    def snapshot(self, symbol: str) -> Dict[str, Any]:
+        return self.get(symbol).snapshot()
@@ -0,0 +1,242 @@
+import asyncio
+import glob
+import heapq
+import logging
+import os
+import re
+import sys
+import time
+from datetime import datetime
+from typing import Dict, Any, Optional, Callable, AsyncIterator, List, Tuple, Union
+from kucoin_websocket_listen_DEV import KucoinWebsocketListen
+from ring_buffer import RingBuffer, POLICY_BLOCK, POLICY_DROP_OLDEST, POLICY_COALESCE_LATEST
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "common"))
+from receive_time import received_ns, TIME_RECEIVED_NS, TIME_RECEIVED_MONO_NS
+from request_latency import LatencyHistogram
+from stream_writer import capture_entries
+from session_catalog import SessionCatalog
+
+# Configure logging
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+console_handler = logging.StreamHandler()
+formatter = logging.Formatter('%(asctime)s.%(msecs)03d - %(levelname)s - %(message)s - %(funcName)s', datefmt='%H:%M:%S')
+console_handler.setFormatter(formatter)
+logger.addHandler(console_handler)
+logger.propagate = False
+
+_RELEASE_DIR = re.compile(r'^(\d{4}-\d{2}-\d{2})_(\d{2}-\d{2})_(.+)$')
+
+
+class KucoinReplayListen:
+    """
+    Recorded release session played back through the KucoinWebsocketListen surface.
+
+    start(), stream(), async iteration, get_data(), on_message and cleanup()
+    behave like the live listener, so a strategy loop runs unchanged:
+        ws_match = KucoinReplayListen(session_dir, "match", speed=None)
+        run_match = asyncio.create_task(ws_match.start())
+        async for market_data in ws_match.stream(duration=300): ...
+
+    speed=1.0 replays in real time, speed=N N times faster and speed=None
+    as fast as possible (the ring then blocks instead of dropping, nothing
+    is lost). Several channels are merged in receive order, each message
+    then carries its 'channel'.
+
+    time_received_ns keeps the recorded receive time, time_received_mono_ns
+    is the delivery time, so record_decision(market_data) measures
+    tick-to-decision latency exactly as it would be live.
+    """
+    CHANNEL_TICKER = KucoinWebsocketListen.CHANNEL_TICKER
+    CHANNEL_LEVEL2 = KucoinWebsocketListen.CHANNEL_LEVEL2
+    CHANNEL_MATCH = KucoinWebsocketListen.CHANNEL_MATCH
+    CHANNEL_DEPTH5 = KucoinWebsocketListen.CHANNEL_DEPTH5
+    CHANNEL_SNAPSHOT = KucoinWebsocketListen.CHANNEL_SNAPSHOT
+    CHANNEL_LEVEL1 = KucoinWebsocketListen.CHANNEL_LEVEL1
+
+    def __init__(self, session_dir: str, channel: Union[str, Tuple[str, ...]] = "match",
+                 speed: Optional[float] = 1.0,
+                 on_message: Optional[Callable[[Dict[str, Any]], None]] = None,
+                 fields: Optional[tuple] = None,
+                 buffer_capacity: int = 65536, overflow_policy: Optional[str] = None,
+                 start_seconds: Optional[float] = None, end_seconds: Optional[float] = None):
+        match = _RELEASE_DIR.match(os.path.basename(os.path.normpath(session_dir)))
+        if not match:
+            raise ValueError(f"{session_dir} is not a <date>_<HH-MM>_<SYMBOL> session folder")
+        date, hour_minute, self.symbol = match.groups()
+        self.date = date
+        self.release_time = datetime.strptime(f"{date} {hour_minute}", '%Y-%m-%d %H-%M')
+        self.session_dir = session_dir
+        self.channels = (channel,) if isinstance(channel, str) else tuple(channel)
+        self.channel = channel if isinstance(channel, str) else ",".join(self.channels)
+        self.speed = speed or None
+        self.on_message = on_message
+        self.fields = tuple(fields) if fields else None
+        # seconds relative to the release, None replays the whole capture
+        self.start_seconds = start_seconds
+        self.end_seconds = end_seconds
+
+        if overflow_policy is None:
+            if self.speed is None:
+                overflow_policy = POLICY_BLOCK
+            elif len(self.channels) == 1 and channel in KucoinWebsocketListen.COALESCED_CHANNELS:
+                overflow_policy = POLICY_COALESCE_LATEST
+            else:
+                overflow_policy = POLICY_DROP_OLDEST
+        self.queue = RingBuffer(buffer_capacity, overflow_policy, name=f"{self.symbol} {self.channel} replay")
+        self.is_running = False
+
+        # metrics
+        self.events = 0
+        self.skipped = 0
+        self.recorded_span_s = 0.0
+        self._started = None
+        self._finished = None
+        # how far behind its scheduled time an event was delivered (paced modes)
+        self.schedule_lag = LatencyHistogram()
+        # delivery to decision, fed by record_decision()
+        self.decision_latency = LatencyHistogram()
+
+    @classmethod
+    def from_catalog(cls, catalog_path: str, session_id: str, channel: Union[str, Tuple[str, ...]] = "match",
+                     **kwargs) -> "KucoinReplayListen":
+        """Replay of a session_catalog entry, e.g. 'kucoin:2024-11-26_10-00_HSK'"""
+        with SessionCatalog(catalog_path) as catalog:
+            rows = catalog.query("SELECT directory FROM sessions WHERE session_id = ?", (session_id,))
+        if not rows or not rows[0]["directory"]:
+            raise ValueError(f"{session_id} is not in {catalog_path}")
+        return cls(rows[0]["directory"], channel, **kwargs)
+
+    def load(self) -> List[Tuple[int, str, Dict[str, Any]]]:
+        """(receive ns, channel, message) of every replayed channel, merged in receive order"""
+        release_ns = int(self.release_time.timestamp() * 1e9)
+        start_ns = release_ns + int(self.start_seconds * 1e9) if self.start_seconds is not None else None
+        end_ns = release_ns + int(self.end_seconds * 1e9) if self.end_seconds is not None else None
+        streams = []
+        for channel in self.channels:
+            paths = glob.glob(os.path.join(self.session_dir, f"{self.symbol}_{channel}_data.*json"))
+            if not paths:
+                raise FileNotFoundError(f"No {channel} capture in {self.session_dir}")
+            events = []
+            # a streamed .ndjson capture wins over a legacy .json one
+            for entry in capture_entries(sorted(paths)[-1]):
+                received = received_ns(entry, self.date)
+                if received is None or (start_ns is not None and received < start_ns) \
+                        or (end_ns is not None and received >= end_ns):
+                    self.skipped += 1
+                    continue
+                events.append((received, channel, entry))
+            events.sort(key=lambda event: event[0])
+            streams.append(events)
+        merged = list(heapq.merge(*streams, key=lambda event: event[0]))
+        if merged:
+            self.recorded_span_s = (merged[-1][0] - merged[0][0]) / 1e9
+        return merged
+
+    async def start(self):
+        """Play the session back, returns once every message is delivered or cleanup() was called"""
+        loop = asyncio.get_running_loop()
+        multiple_channels = len(self.channels) > 1
+        self.is_running = True
+        try:
+            events = self.load()
+            logger.info(f"Replaying {len(events)} {self.channel} messages of {self.symbol} "
+                        f"({self.recorded_span_s:.1f}s recorded) at "
+                        f"{f'{self.speed}x' if self.speed else 'full speed'}")
+            self._started = loop.time()
+            first_ns = events[0][0] if events else 0
+            for received, channel, entry in events:
+                if not self.is_running:
+                    break
+                if self.speed is not None:
+                    delay = self._started + (received - first_ns) / 1e9 / self.speed - loop.time()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                    else:
+                        self.schedule_lag.record(-delay * 1e6)
+
+                data = {field: entry.get(field) for field in self.fields} if self.fields is not None else entry
+                if multiple_channels:
+                    data['channel'] = channel
+                data[TIME_RECEIVED_NS] = received
+                data[TIME_RECEIVED_MONO_NS] = time.monotonic_ns()
+                self.events += 1
+
+                if self.on_message is not None:
+                    self.on_message(data)
+                elif self.speed is None:
+                    await self.queue.put(data)
+                else:
+                    self.queue.put_nowait(data)
+                if self.speed is None:
+                    # hand over to the consumer after every message, as a socket read would
+                    await asyncio.sleep(0)
+        finally:
+            self._finished = loop.time() if self._started is not None else None
+            self.is_running = False
+            self.queue.close()
+
+    def record_decision(self, data: Dict[str, Any]):
+        """Record the time from delivery of data until now as one tick-to-decision sample"""
+        self.decision_latency.record((time.monotonic_ns() - data[TIME_RECEIVED_MONO_NS]) // 1000)
+
+    async def get_data(self) -> Dict[str, Any]:
+        """Get latest message from the queue"""
+        try:
+            return self.queue.get_nowait()
+        except asyncio.QueueEmpty:
+            return None
+
+    def __aiter__(self) -> AsyncIterator[Dict[str, Any]]:
+        return self.stream()
+
+    def stream(self, duration: Optional[float] = None) -> AsyncIterator[Dict[str, Any]]:
+        """Replayed messages, ends after duration seconds or once the session is drained"""
+        return self.queue.stream(duration)
+
+    def stats(self) -> Dict[str, Any]:
+        elapsed = None
+        if self._started is not None:
+            end = self._finished if self._finished is not None else asyncio.get_running_loop().time()
+            elapsed = end - self._started
+        schedule_lag = self.schedule_lag.to_dict()
+        schedule_lag.pop("buckets")
+        decision_latency = self.decision_latency.to_dict()
+        decision_latency.pop("buckets")
+        return {
+            "symbol": self.symbol,
+            "channel": self.channel,
+            "speed": self.speed,
+            "events": self.events,
+            "skipped": self.skipped,
+            "elapsed_s": round(elapsed, 3) if elapsed is not None else None,
+            "events_per_second": round(self.events / elapsed) if elapsed else None,
+            "recorded_span_s": round(self.recorded_span_s, 3),
+            "schedule_lag_us": schedule_lag,
+            "decision_latency_us": decision_latency,
+            "buffer": self.queue.metrics()
+        }
+
+    async def cleanup(self):
+        """Stop the replay"""
+        self.is_running = False
+        self.queue.close()
+        logger.info(f"Replay: {self.stats()}")
+
+
+async def main():
+    # python kucoin_replay.py <session dir> [channel[,channel]] [speed, 0 = full speed]
+    #   python kucoin_replay.py kucoin_release_data_initial/2024-11-26_10-00_HSK match,level2 0
+    session_dir = sys.argv[1]
+    channels = tuple(sys.argv[2].split(",")) if len(sys.argv) > 2 else ("match",)
+    speed = float(sys.argv[3]) if len(sys.argv) > 3 else 0
+    replay = KucoinReplayListen(session_dir, channels if len(channels) > 1 else channels[0], speed=speed)
+    run_replay = asyncio.create_task(replay.start())
+    async for market_data in replay.stream():
+        replay.record_decision(market_data)
+    await run_replay
+    await replay.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,45 @@
+import hmac
+import base64
+import hashlib
+from typing import Dict
+
+
+class KucoinRequestSigner:
+    """Pre-keyed HMAC signer for KuCoin REST requests (API key version 2).
+
+    The passphrase HMAC never changes for a given key, so it is computed once
+    here. The secret is loaded into a single `hmac` object whose key schedule
+    is reused via `.copy()` for every request, so signing runs inline on the
+    event loop without any thread hop.
+    """
+
+    def __init__(self, api_key: str, api_secret: str, api_passphrase: str):
+        if not all([api_key, api_secret, api_passphrase]):
+            raise ValueError("API key, secret, and passphrase are required")
+
+        self.api_key = api_key
+        self._keyed_hmac = hmac.new(str(api_secret).encode('utf-8'), digestmod=hashlib.sha256)
+
+        passphrase_hmac = self._keyed_hmac.copy()
+        passphrase_hmac.update(api_passphrase.encode('utf-8'))
+        self.encrypted_passphrase = base64.b64encode(passphrase_hmac.digest()).decode('utf-8')
+
+        self._static_headers = {
+            "KC-API-KEY": self.api_key,
+            "KC-API-KEY-VERSION": "2",
+            "KC-API-PASSPHRASE": self.encrypted_passphrase,
+            "Content-Type": "application/json"
+        }
+
+    def sign(self, timestamp: str, method: str, endpoint: str, body: str = "") -> str:
+        """Return the base64 HMAC-SHA256 of timestamp + method + endpoint + body"""
+        signer = self._keyed_hmac.copy()
+        signer.update(f"{timestamp}{method}{endpoint}{body}".encode('utf-8'))
+        return base64.b64encode(signer.digest()).decode('utf-8')
+
+    def headers(self, timestamp: str, method: str, endpoint: str, body: str = "") -> Dict[str, str]:
+        """Complete authentication headers for one request"""
+        headers = self._static_headers.copy()
+        headers["KC-API-SIGN"] = self.sign(timestamp, method, endpoint, body)
+        headers["KC-API-TIMESTAMP"] = timestamp
+        return headers
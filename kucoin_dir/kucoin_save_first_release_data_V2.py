@@ -11,6 +11,7 @@ import traceback
 import json
 import re
 from kucoin_save_relase_data_class import Kucoin_save_ws_data
+from kucoin_ws_multiplexer import KucoinWebsocketMultiplexer
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -37,7 +38,10 @@ async def main():
         testing = False  
         directory = '/root/trading_systems/kucoin_dir/new_pair_data_kucoin'
         duration_to_run = 60  # time in minutes
+        catalog_path = '/root/trading_systems/sessions.db'  # SQLite index of every recorded session
         start_collect_before_release_sec = 30  # Start collecting data before release time
+        # one socket carries every channel of every pair, extra sockets only past the topic limit
+        multiplexer = KucoinWebsocketMultiplexer()
 
         async def execution(new_pair_dict):
             path_to_save = '/root/trading_systems/kucoin_dir/kucoin_release_data_initial'
@@ -73,7 +77,10 @@ async def main():
                         duration_minutes=duration_to_run,
                         saving_path=path_to_save,
                         channel=channel,
-                        pre_release_seconds=start_collect_before_release_sec
+                        pre_release_seconds=start_collect_before_release_sec,
+                        multiplexer=multiplexer,
+                        catalog_path=catalog_path,
+                        tag=new_pair_dict['tag']
                     )
                     ws_instances.append(ws)
                     try:
@@ -131,6 +138,8 @@ async def main():
             }
             await execution(test_pair_dict)
 
+        await multiplexer.close()
+
     finally:
         release_lock(lock_file)
         print(f'{datetime.now()} script finished ')
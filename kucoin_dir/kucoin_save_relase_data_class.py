@@ -1,3 +1,4 @@
+import sys
 import asyncio
 import aiohttp
 import orjson
@@ -7,6 +8,13 @@ from typing import Dict, Any, Optional
 import os
 import json
 from typing import Dict, Any, Optional, List
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "common"))
+from receive_time import stamp
+from stream_writer import StreamingRecordWriter
+from tick_store import TickStoreWriter
+from trade_archive import open_session_writer
+from session_catalog import ChannelSummary, record_capture
+from ring_buffer import RingBuffer, POLICY_BLOCK
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -33,12 +41,19 @@ class Kucoin_save_ws_data:
                  duration_minutes: float,
                  saving_path: str,
                  channel: str = "ticker" ,
-                 pre_release_seconds: int = 30):
+                 pre_release_seconds: int = 30,
+                 multiplexer=None,
+                 tick_store_root: Optional[str] = None,
+                 trade_archive_root: Optional[str] = None,
+                 catalog_path: Optional[str] = None,
+                 tag: Optional[str] = None):
         
         # Basic configuration
         self.symbol = symbol
         self.channel = channel
         self.api_url = "https://api.kucoin.com"
+        # shared KucoinWebsocketMultiplexer, when set no socket of our own is opened
+        self.multiplexer = multiplexer
         
         # WebSocket state
         self.ws_connection = None
@@ -48,10 +63,17 @@ class Kucoin_save_ws_data:
         self.max_reconnect_attempts = 5
         
         # Data management
-        self.queue = asyncio.Queue()
-        self.stored_data = []
+        # recording keeps every message: when the writer falls behind, reading the socket waits
+        self.queue = RingBuffer(262144, POLICY_BLOCK, name=f"{symbol} {channel} recorder")
         self.messages_processed = 0
         self.saving_path = saving_path
+        # also write typed columns to the parquet tick store when set
+        self.tick_store_root = tick_store_root
+        # trades also go to a fixed-width memory-mappable session file when set
+        self.trade_archive_root = trade_archive_root
+        # every finished capture is added to this SQLite session catalog when set
+        self.catalog_path = catalog_path
+        self.tag = tag
         
         # Timing control
         self.release_time = release_time
@@ -131,6 +153,10 @@ class Kucoin_save_ws_data:
             logger.info(f"Waiting {time_to_start:.2f}s until collection data at {self.get_formatted_time(self.start_time)}")
             await asyncio.sleep(time_to_start)
 
+        if self.multiplexer is not None:
+            await self._collect_multiplexed()
+            return
+
         try:
             ws_url = await self.get_websocket_url()
             if not ws_url:
@@ -179,6 +205,40 @@ class Kucoin_save_ws_data:
                 break
 
 
+    async def _store_message(self, data: dict):
+        """Timestamp a data message and hand it to the saving queue"""
+        # integer receive time, the time_received string is added at export
+        await self.queue.put(stamp(data['data']))
+        self.messages_processed += 1
+
+        if self.messages_processed % 100 == 0:
+            time_remaining = (self.end_time - datetime.now()).total_seconds()
+            logger.debug(f"Processed {self.messages_processed} messages. "
+                      f"Time remaining: {time_remaining:.2f}s. "
+                      f"Queue size: {self.queue.qsize()}")
+
+    async def _collect_multiplexed(self):
+        """Collect over the shared multiplexer socket until end_time"""
+        try:
+            await self.multiplexer.subscribe(self.channel, self.symbol, self._store_message)
+        except Exception as e:
+            logger.error(f"Error subscribing {self.channel} on shared connection: {e}")
+            self.collection_ended = True
+            return
+
+        self.is_running = True
+        self.collection_started = True
+        logger.info(f"Collection of {self.symbol} {self.channel} started on shared connection")
+
+        remaining = (self.end_time - datetime.now()).total_seconds()
+        if remaining > 0:
+            await asyncio.sleep(remaining)
+
+        await self.multiplexer.unsubscribe(self.channel, self.symbol, self._store_message)
+        self.is_running = False
+        self.collection_ended = True
+        logger.info("Message processing completed")
+
 # process initial messsages from websocket 
     async def _process_messages(self):
         """Process incoming WebSocket messages with optimized speed and timing"""
@@ -198,18 +258,7 @@ class Kucoin_save_ws_data:
 
 
                     if data.get('type') == 'message' and 'data' in data:
-                        precise_time = datetime.now()
-                        processed_data = data['data']
-                        processed_data['time_received'] = self.get_formatted_time(precise_time)
-                        
-                        await self.queue.put(processed_data)
-                        self.messages_processed += 1
-                        
-                        if self.messages_processed % 100 == 0:
-                            time_remaining = (self.end_time - datetime.now()).total_seconds()
-                            logger.debug(f"Processed {self.messages_processed} messages. "
-                                      f"Time remaining: {time_remaining:.2f}s. "
-                                      f"Queue size: {self.queue.qsize()}")
+                        await self._store_message(data)
 
                 elif msg.type == aiohttp.WSMsgType.CLOSED:
                     logger.warning("WebSocket connection closed")
@@ -253,125 +302,79 @@ class Kucoin_save_ws_data:
 
 # [... previous logging configuration remains the same ...]
 
-    async def process_for_saving(self):
-        """Process and save data in batches with periodic saving"""
-        batch = []
-        batch_size = 1000  # Increased batch size
-        batch_save_interval = 900  # 15 minutes in seconds
-        last_batch_save_time = datetime.now()
+    def capture_path(self, saving_path: str) -> str:
+        saving_dir = f"{self.release_time.strftime('%Y-%m-%d_%H-%M')}_{self.symbol}"
+        return os.path.join(saving_path, saving_dir, f"{self.symbol}_{self.channel}_data.ndjson")
 
+    def capture_header(self) -> Dict[str, Any]:
+        return {
+            "symbol": self.symbol,
+            "channel": self.channel,
+            "start_time": self.get_formatted_time(self.start_time),
+            "release_time": self.get_formatted_time(self.release_time),
+            "end_time": self.get_formatted_time(self.end_time)
+        }
+
+    def open_writer(self, saving_path: str) -> StreamingRecordWriter:
+        sinks = []
+        if self.tick_store_root:
+            sinks.append(TickStoreWriter(self.tick_store_root, "kucoin", self.symbol, self.channel, self.release_time))
+        if self.trade_archive_root and self.channel == self.CHANNEL_MATCH:
+            sinks.append(open_session_writer(self.trade_archive_root, "kucoin", self.symbol, self.release_time))
+        if self.catalog_path:
+            sinks.append(ChannelSummary(self.release_time))
+        return StreamingRecordWriter(self.capture_path(saving_path), self.capture_header(), sinks=sinks)
+
+    async def process_for_saving(self):
+        """Stream messages to the capture file as they arrive, memory stays flat"""
+        writer = None
         try:
+            writer = self.open_writer(self.saving_path)
             while datetime.now() <= self.end_time or not self.queue.empty():
                 try:
-                    # Wait for data with a timeout
                     data = await asyncio.wait_for(self.queue.get(), timeout=1.0)
-                    batch.append(data)
-
-                    # Check if it's time to save a batch
-                    current_time = datetime.now()
-                    time_since_last_save = (current_time - last_batch_save_time).total_seconds()
-
-                    if (len(batch) >= batch_size or 
-                        time_since_last_save >= batch_save_interval or 
-                        (self.collection_ended and self.queue.empty())):
-                        
-                        # Save the current batch
-                        await self.save_batch_data(batch, last_batch_save_time)
-                        
-                        # Reset batch and update last save time
-                        batch.clear()
-                        last_batch_save_time = current_time
+                    if data is None:
+                        continue
+                    await writer.write(data)
 
                 except asyncio.TimeoutError:
+                    # quiet market: push what we have to disk
+                    await writer.flush()
                     if self.collection_ended and self.queue.empty():
                         break
                     continue
-                
-            # Process any remaining batch
-            if batch:
-                await self.save_batch_data(batch, last_batch_save_time)
-            
-            logger.info(f"Total messages processed: {len(self.stored_data)}")
+
+            logger.info(f"Total messages processed: {writer.records}")
+            logger.info(f"Recorder buffer: {self.queue.metrics()}")
             
         except Exception as e:
             logger.error(f"Error in data processing: {e}")
         finally:
+            if writer is not None:
+                try:
+                    await self.close_writer(writer)
+                except Exception as e:
+                    logger.error(f"Error closing capture file: {e}")
             await self.cleanup()
 
-    async def save_batch_data(self, batch: list, batch_save_time: datetime):
-        """Save a batch of data to a separate file"""
+    async def close_writer(self, writer: StreamingRecordWriter):
+        """Close the capture with the final snapshot as footer, then catalog it"""
+        final_snapshot = None
         try:
-            saving_dir = f"{self.release_time.strftime('%Y-%m-%d_%H-%M')}_{self.symbol}"
-            full_path = os.path.join(self.saving_path, saving_dir)
-            os.makedirs(full_path, exist_ok=True)
-
-            # Create a unique filename based on the batch save time
-            batch_filename = os.path.join(
-                full_path, 
-                f"{self.symbol}_{self.channel}_batch_{batch_save_time.strftime('%H-%M-%S')}.json"
-            )
-            
-            # Prepare metadata for this batch
-            metadata = {
-                "symbol": self.symbol,
-                "channel": self.channel,
-                "batch_save_time": self.get_formatted_time(batch_save_time),
-                "total_messages_in_batch": len(batch),
-                "collection_start_time": self.get_formatted_time(self.start_time),
-                "collection_end_time": self.get_formatted_time(self.end_time)
-            }
-            
-            save_data = {
-                "metadata": metadata,
-                "data": batch
-            }
-
-            # Save the batch
-            with open(batch_filename, "w") as f:
-                json.dump(save_data, f)
-            
-            logger.info(f"Batch data saved successfully to: {batch_filename}")
-            logger.info(f"Batch messages saved: {len(batch)}")
-
-            # Optionally, clear the stored data to free up memory
-            self.stored_data.clear()
-            
+            final_snapshot = await self.get_final_snapshot(self.symbol)
         except Exception as e:
-            logger.error(f"Error saving batch data: {e}")
-
-
-
-    # async def process_for_saving(self):
-    #     """Process and save data to a list with optimized batch processing"""
-    #     batch = []
-    #     batch_size = 100  # Increased batch size for better performance
-
-    #     try:
-    #         while datetime.now() <= self.end_time or not self.queue.empty():
-    #             try:
-    #                 data = await asyncio.wait_for(self.queue.get(), timeout=1.0)
-    #                 batch.append(data)
-
-    #                 if len(batch) >= batch_size:
-    #                     self.stored_data.extend(batch)
-    #                     batch.clear()
-                        
-    #             except asyncio.TimeoutError:
-    #                 if self.collection_ended and self.queue.empty():
-    #                     break
-    #                 continue
-                
-    #         # Process remaining batch
-    #         if batch:
-    #             self.stored_data.extend(batch)
-                
-    #         logger.info(f"Total messages processed and stored: {len(self.stored_data)}")
-            
-    #     except Exception as e:
-    #         logger.error(f"Error in data processing: {e}")
-    #     finally:
-    #         await self.save_data(self.saving_path)
-    #         await self.cleanup()
+            logger.error(f"Error getting final snapshot for {self.symbol}: {e}")
+        finally:
+            # the footer and the sinks' closing (parquet footer) must happen whatever the REST call did
+            await writer.close({"final_snapshot": final_snapshot})
+        if not self.catalog_path:
+            return
+        try:
+            await asyncio.get_running_loop().run_in_executor(
+                None, record_capture, self.catalog_path, "kucoin", self.symbol, self.channel,
+                self.release_time, self.tag, writer, final_snapshot)
+        except Exception as e:
+            logger.error(f"Error adding {writer.path} to the session catalog: {e}")
 
 
 
@@ -410,43 +413,13 @@ class Kucoin_save_ws_data:
                     return None
 
 
-    async def save_data(self, saving_path: str):
-        """Save the stored data with timing information"""
-        try:
-            saving_dir = f"{self.release_time.strftime('%Y-%m-%d_%H-%M')}_{self.symbol}"
-            full_path = os.path.join(saving_path, saving_dir)
-            os.makedirs(full_path, exist_ok=True)
-
-            filename = os.path.join(full_path, f"{self.symbol}_{self.channel}_data.json")
-            
-            # Add collection metadata
-            metadata = {
-                "symbol": self.symbol,
-                "channel": self.channel,
-                "start_time": self.get_formatted_time(self.start_time),
-                "release_time": self.get_formatted_time(self.release_time),
-                "end_time": self.get_formatted_time(self.end_time),
-                "total_messages": len(self.stored_data),
-                "final_snapshot": await self.get_final_snapshot(self.symbol)
-            }
-            
-            save_data = {
-                "metadata": metadata,
-                "data": self.stored_data
-            }
-
-            with open(filename, "w") as f:
-                json.dump(save_data, f)
-            
-            logger.info(f"Data saved successfully to: {filename}")
-            logger.info(f"Total messages saved: {len(self.stored_data)}")
-            
-        except Exception as e:
-            logger.error(f"Error saving data: {e}")
-
     async def cleanup(self):
         """Clean up resources"""
         self.is_running = False
+
+        if self.multiplexer is not None:
+            # the socket is shared, the multiplexer owner closes it
+            return
         
         if self.ws_connection and not self.ws_connection.closed:
             await self.ws_connection.close()
@@ -1,10 +1,17 @@
+import os
+import sys
 import asyncio
 import aiohttp
 import orjson
 import logging
 from datetime import datetime, timedelta
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Callable, AsyncIterator
 import time
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "common"))
+from receive_time import stamp
+from kucoin_frame_decoder import KucoinFrameDecoder, FRAME_PONG
+from ring_buffer import RingBuffer, POLICY_DROP_OLDEST, POLICY_COALESCE_LATEST
+from kucoin_endpoints import API_URL, WS_ENDPOINT
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -15,6 +22,9 @@ console_handler.setFormatter(formatter)
 logger.addHandler(console_handler)
 logger.propagate = False
 
+DEFAULT_WS_ENDPOINT = WS_ENDPOINT
+
+
 class KucoinWebsocketListen:
     # Channel constants
     CHANNEL_TICKER = "ticker"
@@ -23,15 +33,34 @@ class KucoinWebsocketListen:
     CHANNEL_DEPTH5 = "level2Depth5"
     CHANNEL_SNAPSHOT = "snapshot"
     CHANNEL_LEVEL1 = "level1"
+
+    # channels whose messages supersede each other, an unread one is replaced by the next
+    COALESCED_CHANNELS = (CHANNEL_TICKER, CHANNEL_DEPTH5, CHANNEL_SNAPSHOT, CHANNEL_LEVEL1)
     
-    def __init__(self, symbol: str, channel: str = "ticker"):
+    def __init__(self, symbol: str, channel: str = "ticker", multiplexer=None,
+                 on_message: Optional[Callable[[Dict[str, Any]], None]] = None,
+                 fields: Optional[tuple] = None,
+                 buffer_capacity: int = 65536, overflow_policy: Optional[str] = None,
+                 ws_endpoint: Optional[str] = None):
         # Basic configuration
         self.symbol = symbol
         self.channel = channel
-        self.api_url = "https://api.kucoin.com"
+        self.api_url = API_URL
+        # websocket server, e.g. one of the bullet token's instanceServers
+        self.ws_endpoint = ws_endpoint or DEFAULT_WS_ENDPOINT
+        # shared KucoinWebsocketMultiplexer, when set no socket of our own is opened
+        self.multiplexer = multiplexer
+        # called synchronously with every data message as soon as it is decoded,
+        # messages then bypass the queue
+        self.on_message = on_message
+        # data fields the consumer needs, e.g. ('price', 'side', 'makerOrderId'), None keeps all
+        self.fields = tuple(fields) if fields else None
         
         # Performance optimized state management
-        self.queue = asyncio.Queue(maxsize=100000)
+        # preallocated ring, drop-oldest for order-flow channels and coalesce-latest for snapshots
+        if overflow_policy is None:
+            overflow_policy = POLICY_COALESCE_LATEST if channel in self.COALESCED_CHANNELS else POLICY_DROP_OLDEST
+        self.queue = RingBuffer(buffer_capacity, overflow_policy, name=f"{symbol} {channel}")
         self._last_heartbeat = time.monotonic()
         self._connection_ready = asyncio.Event()
         self._warm_up_complete = asyncio.Event()
@@ -50,6 +79,10 @@ class KucoinWebsocketListen:
         # Subscription data (pre-computed)
         self._subscription_data = self._prepare_subscription_data()
 
+        # frames are classified on the raw text, only our topic's data frames are parsed
+        self.decoder = KucoinFrameDecoder()
+        self.decoder.route(self._subscription_data['topic'], self._on_data, self.fields)
+
     def _prepare_subscription_data(self) -> dict:
         """Pre-compute subscription data for faster connection setup"""
         if self.channel == self.CHANNEL_DEPTH5:
@@ -97,7 +130,7 @@ class KucoinWebsocketListen:
                 raise Exception("Failed to obtain valid token during warm-up")
 
             # Test connection establishment
-            ws_url = f"wss://ws-api-spot.kucoin.com/?token={token}"
+            ws_url = f"{self.ws_endpoint}?token={token}"
             async with aiohttp.ClientSession() as session:
                 async with session.ws_connect(ws_url) as ws:
                     # Measure baseline latency
@@ -128,21 +161,25 @@ class KucoinWebsocketListen:
             logger.error(f"Error in direct_message_receive: {e}")
             return None
 
+    def _on_data(self, data: Dict[str, Any]) -> None:
+        """Deliver one decoded data object to the callback or the queue"""
+        # integer receive time, formatted only when exported (receive_time.time_received)
+        stamp(data)
+        if self.on_message is not None:
+            self.on_message(data)
+            return
+        # overflow is handled by the ring's policy and shows up in its metrics
+        self.queue.put_nowait(data)
+
     async def _process_message(self, msg_data: dict) -> None:
-        """Optimized message processing with microsecond precision timing"""
+        """Handle an already parsed frame, as delivered by the multiplexer"""
         try:
-            precise_time = datetime.now()
-            
             # Fast path for data messages
             if msg_data.get('type') == 'message' and 'data' in msg_data:
-                processed_data = msg_data['data']
-                processed_data['time_received'] = precise_time.strftime('%H:%M:%S.%f')[:-3]
-                try:
-                    self.queue.put_nowait(processed_data)
-                except asyncio.QueueFull:
-                    logger.warning("Queue is full, dropping message")
-                
-                
+                data = msg_data['data']
+                if self.fields is not None:
+                    data = {field: data.get(field) for field in self.fields}
+                self._on_data(data)
 
             elif msg_data.get('type') == 'pong':
                 self._last_heartbeat = time.monotonic()
@@ -152,6 +189,14 @@ class KucoinWebsocketListen:
 
     async def start(self):
         """Main entry point with warm-up and optimization"""
+        if self.multiplexer is not None:
+            # messages arrive over the shared socket, nothing to warm up or keep alive
+            await self.multiplexer.subscribe(self.channel, self.symbol, self._process_message)
+            self.is_running = True
+            self._start_time = time.monotonic()
+            self._connection_ready.set()
+            return
+
         try:
             # Perform warm-up if not done
             if not self._warm_up_complete.is_set():
@@ -173,7 +218,7 @@ class KucoinWebsocketListen:
 
             self.ws_session = aiohttp.ClientSession()
             self.ws_connection = await self.ws_session.ws_connect(
-                f"wss://ws-api-spot.kucoin.com/?token={token}",
+                f"{self.ws_endpoint}?token={token}",
                 heartbeat=20,
                 receive_timeout=30
             )
@@ -202,8 +247,10 @@ class KucoinWebsocketListen:
             try:
                 msg = await self.ws_connection.receive(timeout=0.1)
                 
-                if msg.type == aiohttp.WSMsgType.TEXT:
-                    await self._process_message(orjson.loads(msg.data))
+                if msg.type == aiohttp.WSMsgType.TEXT or msg.type == aiohttp.WSMsgType.BINARY:
+                    # raw str/bytes straight into the decoder, no intermediate parse
+                    if self.decoder.feed(msg.data)[0] == FRAME_PONG:
+                        self._last_heartbeat = time.monotonic()
                 elif msg.type in (aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.ERROR):
                     logger.warning(f"WebSocket state changed: {msg.type}")
                     break
@@ -214,6 +261,9 @@ class KucoinWebsocketListen:
                 logger.error(f"Message loop error: {e}")
                 break
 
+        # wake consumers blocked in async iteration
+        self.queue.close()
+
     async def _keep_alive(self):
         """Optimized connection maintenance"""
         while self.is_running:
@@ -229,6 +279,14 @@ class KucoinWebsocketListen:
     async def cleanup(self):
         """Resource cleanup"""
         self.is_running = False
+
+        self.queue.close()
+
+        if self.multiplexer is not None:
+            # the socket is shared, only drop our subscription
+            await self.multiplexer.unsubscribe(self.channel, self.symbol, self._process_message)
+            self._log_performance_metrics()
+            return
         
         if self.ws_connection and not self.ws_connection.closed:
             await self.ws_connection.close()
@@ -245,6 +303,16 @@ class KucoinWebsocketListen:
         except asyncio.QueueEmpty:
             return None
 
+    def __aiter__(self) -> AsyncIterator[Dict[str, Any]]:
+        return self.stream()
+
+    def stream(self, duration: Optional[float] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Yield messages as they arrive, waking up in the loop iteration that decoded them.
+        Ends after duration seconds (if given) or once the connection is closed and drained.
+            async for market_data in listener.stream(duration=300): ...
+        """
+        return self.queue.stream(duration)
 
     def _log_performance_metrics(self):
         """Log performance metrics in debug mode"""
@@ -254,6 +322,7 @@ class KucoinWebsocketListen:
             logger.debug(f"Performance Metrics:")
             logger.debug(f"Average latency: {avg_latency:.2f}ms")
             logger.debug(f"Connection quality: {self._connection_quality:.1f}%")
+        logger.info(f"Feed buffer: {self.queue.metrics()}")
 
 
 async def main():
@@ -265,13 +334,8 @@ async def main():
         asyncio.create_task( ws.start())
         
         # Monitor for 2 minutes
-        end_time = datetime.now() + timedelta(minutes=2)
-        logger.debug(f'{end_time}')
-        while datetime.now() < end_time:
-            get_data = await ws.get_data()
+        async for get_data in ws.stream(duration=120):
             print(json.dumps(get_data,indent=4))
-            
-            await asyncio.sleep(1)
 
 
             
@@ -0,0 +1,320 @@
+import asyncio
+import aiohttp
+import orjson
+import logging
+import itertools
+import time
+import uuid
+from typing import Dict, Any, Optional, List, Callable, Union
+from kucoin_frame_decoder import frame_topic
+from kucoin_endpoints import API_URL
+
+# Configure logging
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+console_handler = logging.StreamHandler()
+formatter = logging.Formatter('%(asctime)s.%(msecs)03d - %(levelname)s - %(message)s - %(funcName)s', datefmt='%H:%M:%S')
+console_handler.setFormatter(formatter)
+logger.addHandler(console_handler)
+logger.propagate = False
+
+# channels published under /spotMarket/, everything else is under /market/
+SPOT_MARKET_CHANNELS = ("level2Depth5", "level1")
+
+
+def market_symbol(symbol: str) -> str:
+    """'XRP' -> 'XRP-USDT', full pairs are kept as they are"""
+    return symbol if '-' in symbol else f"{symbol}-USDT"
+
+
+def topic_for(channel: str, symbols: Union[str, List[str]]) -> str:
+    """KuCoin topic for one channel and one or more symbols"""
+    if isinstance(symbols, str):
+        symbols = [symbols]
+    prefix = "/spotMarket/" if channel in SPOT_MARKET_CHANNELS else "/market/"
+    return f"{prefix}{channel}:{','.join(market_symbol(symbol) for symbol in symbols)}"
+
+
+class _MultiplexedConnection:
+    """One public websocket carrying the subscriptions the multiplexer assigned to it"""
+
+    def __init__(self, owner: 'KucoinWebsocketMultiplexer', index: int):
+        self.owner = owner
+        self.index = index
+        # channel -> symbols subscribed on this socket, replayed after a reconnect
+        self.subscriptions: Dict[str, set] = {}
+
+        self.ws_session = None
+        self.ws_connection = None
+        self.is_running = False
+        self.reconnect_attempts = 0
+        self._ping_interval = 18
+        self._pending_acks: Dict[str, asyncio.Future] = {}
+        self._tasks = []
+
+    @property
+    def topic_count(self) -> int:
+        return sum(len(symbols) for symbols in self.subscriptions.values())
+
+    async def connect(self):
+        token_data = await self.owner.get_token()
+        if not token_data:
+            raise Exception("Failed to obtain WebSocket token")
+        server = token_data['instanceServers'][0]
+        self._ping_interval = server.get('pingInterval', 18000) / 1000
+        ws_url = f"{server['endpoint']}?token={token_data['token']}&connectId={uuid.uuid4()}"
+
+        self.ws_session = aiohttp.ClientSession()
+        self.ws_connection = await self.ws_session.ws_connect(ws_url, receive_timeout=60)
+        self.is_running = True
+        # a reconnect calling connect() stays in the list until it has finished
+        self._tasks = [task for task in self._tasks if not task.done()]
+        self._tasks += [asyncio.create_task(self._message_loop()),
+                        asyncio.create_task(self._keep_alive())]
+        logger.info(f"Multiplexed connection #{self.index} established")
+
+    async def _send_subscription(self, message_type: str, channel: str, symbols: List[str]):
+        request_id = str(next(self.owner._request_ids))
+        ack = asyncio.get_running_loop().create_future()
+        self._pending_acks[request_id] = ack
+        await self.ws_connection.send_str(orjson.dumps({
+            "id": request_id,
+            "type": message_type,
+            "topic": topic_for(channel, symbols),
+            "privateChannel": False,
+            "response": True
+        }).decode('utf-8'))
+        try:
+            await asyncio.wait_for(ack, timeout=5)
+        except asyncio.TimeoutError:
+            logger.warning(f"No ack for {message_type} {topic_for(channel, symbols)}")
+        finally:
+            self._pending_acks.pop(request_id, None)
+
+    async def subscribe(self, channel: str, symbols: List[str]):
+        """Subscribe symbols of one channel in messages of at most MAX_SYMBOLS_PER_TOPIC"""
+        self.subscriptions.setdefault(channel, set()).update(symbols)
+        step = self.owner.MAX_SYMBOLS_PER_TOPIC
+        for start in range(0, len(symbols), step):
+            await self._send_subscription("subscribe", channel, symbols[start:start + step])
+
+    async def unsubscribe(self, channel: str, symbols: List[str]):
+        remaining = self.subscriptions.get(channel, set())
+        remaining.difference_update(symbols)
+        if not remaining:
+            self.subscriptions.pop(channel, None)
+        if self.is_running:
+            step = self.owner.MAX_SYMBOLS_PER_TOPIC
+            for start in range(0, len(symbols), step):
+                await self._send_subscription("unsubscribe", channel, symbols[start:start + step])
+
+    async def _message_loop(self):
+        while self.is_running:
+            try:
+                msg = await self.ws_connection.receive()
+                if msg.type == aiohttp.WSMsgType.TEXT or msg.type == aiohttp.WSMsgType.BINARY:
+                    # data frames are routed on the raw text, topics nobody consumes are never parsed
+                    topic = frame_topic(msg.data)
+                    if topic is not None:
+                        if topic in self.owner._consumers:
+                            await self.owner._dispatch(orjson.loads(msg.data))
+                        else:
+                            self.owner.messages_unrouted += 1
+                        continue
+                    data = orjson.loads(msg.data)
+                    if data.get('topic') is not None:
+                        # a data frame the raw text check missed (spacing, key order), routed or counted unrouted
+                        await self.owner._dispatch(data)
+                        continue
+                    msg_type = data.get('type')
+                    if msg_type == 'ack' or msg_type == 'error':
+                        ack = self._pending_acks.get(data.get('id'))
+                        if ack and not ack.done():
+                            ack.set_result(data)
+                        if msg_type == 'error':
+                            logger.error(f"Connection #{self.index} error message: {data}")
+                elif msg.type in (aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.CLOSING, aiohttp.WSMsgType.ERROR):
+                    logger.warning(f"Connection #{self.index} state changed: {msg.type}")
+                    break
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Connection #{self.index} message loop error: {e}")
+                break
+
+        if self.is_running and not self.owner.closed:
+            # kept with the connection's tasks so close() cancels a reconnect in progress
+            self._tasks.append(asyncio.create_task(self._reconnect()))
+
+    async def _keep_alive(self):
+        while self.is_running:
+            try:
+                await asyncio.sleep(self._ping_interval)
+                await self.ws_connection.send_str(orjson.dumps({"id": str(int(time.time() * 1000)), "type": "ping"}).decode('utf-8'))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Connection #{self.index} keep-alive error: {e}")
+                break
+
+    async def _reconnect(self):
+        """Reopen the socket and replay its subscriptions, exponential backoff"""
+        await self.close()
+        while not self.owner.closed and self.reconnect_attempts < self.owner.max_reconnect_attempts:
+            self.reconnect_attempts += 1
+            await asyncio.sleep(2 ** self.reconnect_attempts)
+            try:
+                await self.connect()
+                for channel, symbols in list(self.subscriptions.items()):
+                    await self.subscribe(channel, sorted(symbols))
+                self.reconnect_attempts = 0
+                logger.info(f"Connection #{self.index} restored with {self.topic_count} topics")
+                return
+            except Exception as e:
+                logger.error(f"Connection #{self.index} reconnect {self.reconnect_attempts} failed: {e}")
+                await self.close()
+        logger.error(f"Connection #{self.index} gave up reconnecting")
+
+    async def close(self):
+        self.is_running = False
+        current = asyncio.current_task()
+        for task in self._tasks:
+            if task is not current:
+                task.cancel()
+        if self.ws_connection and not self.ws_connection.closed:
+            await self.ws_connection.close()
+        if self.ws_session and not self.ws_session.closed:
+            await self.ws_session.close()
+
+
+class KucoinWebsocketMultiplexer:
+    """
+    Shares public websocket connections between every channel and symbol of a process.
+
+    Consumers register a callback per (channel, symbol). Messages are routed by
+    their `topic`, and the full message envelope is passed on. Symbols of one channel
+    are subscribed together (up to MAX_SYMBOLS_PER_TOPIC per message). A new
+    socket is opened only when MAX_TOPICS_PER_CONNECTION is reached on the
+    existing ones.
+    """
+    MAX_SYMBOLS_PER_TOPIC = 100
+    MAX_TOPICS_PER_CONNECTION = 300
+
+    def __init__(self, api_url: str = API_URL,
+                 max_topics_per_connection: int = None):
+        self.api_url = api_url
+        self.max_topics_per_connection = max_topics_per_connection or self.MAX_TOPICS_PER_CONNECTION
+        self.max_reconnect_attempts = 5
+
+        self.connections: List[_MultiplexedConnection] = []
+        # topic (single symbol) -> consumer callbacks and the connection carrying it
+        self._consumers: Dict[str, List[Callable]] = {}
+        self._topic_connection: Dict[str, _MultiplexedConnection] = {}
+        self._lock = asyncio.Lock()
+        self._request_ids = itertools.count(int(time.time() * 1000))
+        self.closed = False
+
+        self.messages_dispatched = 0
+        self.messages_unrouted = 0
+
+    async def get_token(self) -> Optional[Dict[str, Any]]:
+        """Public bullet token and instance servers"""
+        try:
+            async with aiohttp.ClientSession() as session:
+                async with session.post(f"{self.api_url}/api/v1/bullet-public",
+                                        timeout=aiohttp.ClientTimeout(total=5)) as response:
+                    if response.status == 200:
+                        data = await response.json(loads=orjson.loads)
+                        return data['data']
+                    logger.error(f"Token retrieval failed with status: {response.status}")
+                    return None
+        except Exception as e:
+            logger.error(f"Token retrieval error: {e}")
+            return None
+
+    async def _connection_with_capacity(self) -> _MultiplexedConnection:
+        for connection in self.connections:
+            if connection.is_running and connection.topic_count < self.max_topics_per_connection:
+                return connection
+        connection = _MultiplexedConnection(self, len(self.connections))
+        await connection.connect()
+        self.connections.append(connection)
+        if len(self.connections) > 1:
+            logger.info(f"Topic limit reached, opened fallback connection #{connection.index}")
+        return connection
+
+    async def subscribe(self, channel: str, symbols: Union[str, List[str]], callback: Callable):
+        """
+        Route messages of channel/symbols to callback(message).
+        callback may be a plain function or a coroutine function.
+        Topics already carried by a connection only get the extra consumer.
+        """
+        if isinstance(symbols, str):
+            symbols = [symbols]
+        async with self._lock:
+            new_symbols = []
+            for symbol in symbols:
+                topic = topic_for(channel, symbol)
+                self._consumers.setdefault(topic, []).append(callback)
+                if topic not in self._topic_connection:
+                    new_symbols.append(symbol)
+
+            while new_symbols:
+                connection = await self._connection_with_capacity()
+                room = self.max_topics_per_connection - connection.topic_count
+                chunk, new_symbols = new_symbols[:room], new_symbols[room:]
+                for symbol in chunk:
+                    self._topic_connection[topic_for(channel, symbol)] = connection
+                await connection.subscribe(channel, chunk)
+
+    async def unsubscribe(self, channel: str, symbols: Union[str, List[str]], callback: Callable):
+        """Remove a consumer, topics without consumers are unsubscribed on their socket"""
+        if isinstance(symbols, str):
+            symbols = [symbols]
+        async with self._lock:
+            released: Dict[_MultiplexedConnection, List[str]] = {}
+            for symbol in symbols:
+                topic = topic_for(channel, symbol)
+                consumers = self._consumers.get(topic, [])
+                if callback in consumers:
+                    consumers.remove(callback)
+                if not consumers:
+                    self._consumers.pop(topic, None)
+                    connection = self._topic_connection.pop(topic, None)
+                    if connection:
+                        released.setdefault(connection, []).append(symbol)
+            for connection, released_symbols in released.items():
+                try:
+                    await connection.unsubscribe(channel, released_symbols)
+                except Exception as e:
+                    logger.error(f"Unsubscribe {channel} {released_symbols} failed: {e}")
+
+    async def _dispatch(self, message: Dict[str, Any]):
+        consumers = self._consumers.get(message.get('topic'))
+        if not consumers:
+            self.messages_unrouted += 1
+            return
+        self.messages_dispatched += 1
+        for callback in consumers:
+            try:
+                result = callback(message)
+                if asyncio.iscoroutine(result):
+                    await result
+            except Exception as e:
+                logger.error(f"Consumer error on {message.get('topic')}: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "connections": len(self.connections),
+            "topics": len(self._topic_connection),
+            "topics_per_connection": [connection.topic_count for connection in self.connections],
+            "messages_dispatched": self.messages_dispatched,
+            "messages_unrouted": self.messages_unrouted
+        }
+
+    async def close(self):
+        """Close every socket, consumers are not notified"""
+        self.closed = True
+        for connection in self.connections:
+            await connection.close()
+        logger.info(f"Multiplexer closed: {self.stats()}")
@@ -5,6 +5,7 @@ import logging
 from datetime import datetime, timedelta
 import time
 from kucoin_websocket_listen_DEV import KucoinWebsocketListen
+from kucoin_order_book import SequencedOrderBook
 # Assume existing imports and KucoinWebsocketListen class...
 
 # OrderBook class to maintain the order book state
@@ -50,8 +51,8 @@ class OrderBook:
 async def main():
     ws = KucoinWebsocketListen(symbol="BTC", channel=KucoinWebsocketListen.CHANNEL_LEVEL2)
 
-    # Create an instance of OrderBook
-    order_book = OrderBook()
+    # sequence-checked book, synced from a REST snapshot and resynced on gaps
+    order_book = SequencedOrderBook("BTC")
 
     depth = 5  # Adjustable depth variable
 
@@ -59,26 +60,25 @@ async def main():
         asyncio.create_task(ws.start())
 
         # Continuously process incoming data and update the order book
-        while True:
-            data = await ws.get_data()
-            if data:
-                # Update the order book with the new data
-                order_book.update(data)
-                # print(data)
+        async for data in ws:
+            # Update the order book with the new data
+            if not order_book.update(data):
+                continue
+            # print(data)
 
-                # Get the top N bids and asks
-                top_bids, top_asks = order_book.get_top_levels(depth=depth)
+            # Get the top N bids and asks
+            top_bids, top_asks = order_book.get_top_levels(depth=depth)
 
-                print(f"\nTop {depth} Bids:")
-                for price, size in top_bids:
-                    print(f"Price: {price}, Size: {size}")
+            print(f"\nTop {depth} Bids:")
+            for price, size in top_bids:
+                print(f"Price: {price}, Size: {size}")
 
-                print(f"\nTop {depth} Asks:")
-                for price, size in top_asks:
-                    print(f"Price: {price}, Size: {size}")
-
-            await asyncio.sleep(1)
+            print(f"\nTop {depth} Asks:")
+            for price, size in top_asks:
+                print(f"Price: {price}, Size: {size}")
     finally:
+        print(order_book.stats())
+        await order_book.close()
         await ws.cleanup()
 
 if __name__ == "__main__":
@@ -0,0 +1,154 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from typing import Dict, Optional
+
+# Configure logging
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+console_handler = logging.StreamHandler()
+formatter = logging.Formatter('%(asctime)s.%(msecs)03d - %(levelname)s - %(message)s - %(funcName)s', datefmt='%H:%M:%S')
+console_handler.setFormatter(formatter)
+logger.addHandler(console_handler)
+logger.propagate = False
+
+# priority classes, lower value is served first
+PRIORITY_ENTRY = 0
+PRIORITY_CANCEL = 1
+PRIORITY_STATUS = 2
+PRIORITY_NAMES = {PRIORITY_ENTRY: "entry", PRIORITY_CANCEL: "cancel", PRIORITY_STATUS: "status"}
+
+
+class RateLimitScheduler:
+    """
+    Weighted token bucket shared by every order manager of one exchange.
+
+    Callers await acquire(weight, priority) for a permit. Waiters are served
+    strictly by priority class (entry orders, then cancels, then status
+    queries) and FIFO within a class. Queue time is recorded per class.
+    """
+
+    def __init__(self, name: str, capacity: int, interval: float):
+        self.name = name
+        self.capacity = capacity
+        self.refill_rate = capacity / interval  # weight per second
+        self.tokens = float(capacity)
+        self._last_refill = time.monotonic()
+
+        self._waiters = []  # heap of (priority, seq, weight, future)
+        self._sequence = itertools.count()
+        self._timer = None
+
+        self._metrics = {
+            priority: {"granted": 0, "weight": 0, "queued": 0, "total_wait_ms": 0.0, "max_wait_ms": 0.0}
+            for priority in PRIORITY_NAMES
+        }
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._last_refill) * self.refill_rate)
+        self._last_refill = now
+
+    def _take(self, weight: float) -> bool:
+        self._refill()
+        if self.tokens >= weight:
+            self.tokens -= weight
+            return True
+        return False
+
+    def _record(self, priority: int, weight: float, wait_seconds: float, queued: bool):
+        stats = self._metrics[priority]
+        wait_ms = wait_seconds * 1000
+        stats["granted"] += 1
+        stats["weight"] += weight
+        stats["queued"] += int(queued)
+        stats["total_wait_ms"] += wait_ms
+        if wait_ms > stats["max_wait_ms"]:
+            stats["max_wait_ms"] = wait_ms
+
+    async def acquire(self, weight: float = 1, priority: int = PRIORITY_STATUS):
+        """Wait until `weight` tokens are available for this priority class"""
+        weight = min(weight, self.capacity)
+        start = time.monotonic()
+        if not self._waiters and self._take(weight):
+            self._record(priority, weight, 0.0, queued=False)
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._sequence), weight, future))
+        self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            # a cancelled waiter is skipped by _dispatch, hand back a permit it may already hold
+            if future.done() and not future.cancelled():
+                self.tokens = min(self.capacity, self.tokens + weight)
+                # the refunded tokens may let the next waiters through right away
+                self._dispatch()
+            raise
+        self._record(priority, weight, time.monotonic() - start, queued=True)
+
+    def _dispatch(self):
+        """Grant permits in priority order while tokens last, then sleep until the head fits"""
+        while self._waiters:
+            priority, _, weight, future = self._waiters[0]
+            if future.done():
+                heapq.heappop(self._waiters)
+                continue
+            if not self._take(weight):
+                break
+            heapq.heappop(self._waiters)
+            future.set_result(None)
+
+        if self._waiters and self._timer is None:
+            weight = self._waiters[0][2]
+            delay = max((weight - self.tokens) / self.refill_rate, 0.001)
+            self._timer = asyncio.get_running_loop().call_later(delay, self._on_timer)
+
+    def _on_timer(self):
+        self._timer = None
+        self._dispatch()
+
+    def sync(self, remaining: Optional[float], reset_seconds: Optional[float] = None):
+        """
+        Align the local bucket with the exchange's own counters (e.g. gw-ratelimit-remaining).
+        Only ever lowers the local estimate, so another process sharing the key is respected.
+        """
+        if remaining is None:
+            return
+        self._refill()
+        if remaining < self.tokens:
+            self.tokens = float(remaining)
+        if remaining <= 0 and reset_seconds:
+            # pool is exhausted until the reset, hold everyone back until then
+            self.tokens = -self.refill_rate * reset_seconds
+            logger.warning(f"{self.name} rate limit exhausted, holding requests for {reset_seconds:.2f}s")
+
+    def metrics(self) -> Dict:
+        """Granted permits and queue time per priority class"""
+        self._refill()
+        result = {"exchange": self.name, "tokens": round(self.tokens, 2), "queue_depth": len(self._waiters)}
+        for priority, stats in self._metrics.items():
+            granted = stats["granted"]
+            result[PRIORITY_NAMES[priority]] = {
+                "granted": granted,
+                "weight": stats["weight"],
+                "queued": stats["queued"],
+                "avg_wait_ms": round(stats["total_wait_ms"] / granted, 3) if granted else 0.0,
+                "max_wait_ms": round(stats["max_wait_ms"], 3)
+            }
+        return result
+
+
+# one scheduler per exchange, shared by all order managers in the process
+_schedulers: Dict[str, RateLimitScheduler] = {}
+
+
+def get_scheduler(exchange: str, capacity: int, interval: float) -> RateLimitScheduler:
+    """Return the process-wide scheduler for an exchange, created on first use"""
+    scheduler = _schedulers.get(exchange)
+    if scheduler is None:
+        scheduler = _schedulers[exchange] = RateLimitScheduler(exchange, capacity, interval)
+    return scheduler
@@ -0,0 +1,243 @@
+import os
+import sys
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Callable, Dict, Hashable, Optional
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "common"))
+from receive_time import TIME_RECEIVED_MONO_NS
+
+# Configure logging
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+console_handler = logging.StreamHandler()
+formatter = logging.Formatter('%(asctime)s.%(msecs)03d - %(levelname)s - %(message)s - %(funcName)s', datefmt='%H:%M:%S')
+console_handler.setFormatter(formatter)
+logger.addHandler(console_handler)
+logger.propagate = False
+
+# overflow policies
+POLICY_DROP_OLDEST = "drop_oldest"          # trading: the newest message matters, old ones are stale
+POLICY_BLOCK = "block"                      # recording: every message is kept, the producer waits
+POLICY_COALESCE_LATEST = "coalesce_latest"  # ticker: an unread message is replaced by its successor
+POLICIES = (POLICY_DROP_OLDEST, POLICY_BLOCK, POLICY_COALESCE_LATEST)
+
+
+class RingBuffer:
+    """
+    Fixed-capacity event buffer between a websocket producer and its consumer.
+
+    Slots are preallocated and addressed by ever-increasing read/write
+    sequence numbers, so a hand-off is a slot store and an index increment.
+    Producer and consumer run on the same event loop, no locks are involved.
+    Capacity is rounded up to a power of two.
+
+    When full, POLICY_DROP_OLDEST overwrites the oldest unread message,
+    POLICY_BLOCK makes put() wait (put_nowait() then rejects the message) and
+    POLICY_COALESCE_LATEST first replaces the unread message with the same
+    coalesce_key (all messages share one key when no key function is given),
+    then drops the oldest.
+
+    get() returns None when the consumer is woken without a message, after
+    wake() or close(). Messages stamped by receive_time.stamp also give the
+    consumer lag in time, not only in messages.
+    """
+
+    def __init__(self, capacity: int = 65536, policy: str = POLICY_DROP_OLDEST,
+                 coalesce_key: Optional[Callable[[Any], Hashable]] = None, name: str = "ring"):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown overflow policy {policy}, expected one of {POLICIES}")
+        size = 1
+        while size < capacity:
+            size <<= 1
+        self.capacity = size
+        self.policy = policy
+        self.name = name
+        self._mask = size - 1
+        self._slots = [None] * size
+        self._read = 0
+        self._write = 0
+
+        self._coalesce_key = coalesce_key
+        self._latest: Dict[Hashable, int] = {}  # coalesce key -> sequence of its newest message
+
+        self._getters = deque()
+        self._putters = deque()
+        self.closed = False
+
+        # metrics
+        self.puts = 0
+        self.gets = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.blocked_puts = 0
+        self.high_water = 0
+        self.max_lag_ns = 0
+
+    def __len__(self) -> int:
+        return self._write - self._read
+
+    def qsize(self) -> int:
+        return self._write - self._read
+
+    def empty(self) -> bool:
+        return self._write == self._read
+
+    def full(self) -> bool:
+        return self._write - self._read >= self.capacity
+
+    def put_nowait(self, item: Any) -> bool:
+        """Store item according to the overflow policy, False if it was rejected"""
+        if self.closed:
+            return False
+        if self.policy == POLICY_COALESCE_LATEST:
+            key = self._coalesce_key(item) if self._coalesce_key is not None else None
+            sequence = self._latest.get(key)
+            if sequence is not None and sequence >= self._read:
+                self._slots[sequence & self._mask] = item
+                self.puts += 1
+                self.coalesced += 1
+                return True
+            self._latest[key] = self._write
+
+        if self._write - self._read >= self.capacity:
+            if self.policy == POLICY_BLOCK:
+                self.dropped += 1
+                return False
+            self._slots[self._read & self._mask] = None
+            self._read += 1
+            self.dropped += 1
+            if self.dropped == 1:
+                logger.warning(f"{self.name}: consumer fell behind, dropping oldest messages")
+
+        self._slots[self._write & self._mask] = item
+        self._write += 1
+        self.puts += 1
+        depth = self._write - self._read
+        if depth > self.high_water:
+            self.high_water = depth
+        if self._getters:
+            self._wake(self._getters, single=True)
+        return True
+
+    async def put(self, item: Any) -> bool:
+        """put_nowait, except that POLICY_BLOCK waits for room instead of rejecting"""
+        if self.policy == POLICY_BLOCK and self._write - self._read >= self.capacity:
+            self.blocked_puts += 1
+            while self._write - self._read >= self.capacity and not self.closed:
+                waiter = asyncio.get_running_loop().create_future()
+                self._putters.append(waiter)
+                try:
+                    await waiter
+                except asyncio.CancelledError:
+                    self._discard(self._putters, waiter)
+                    raise
+        return self.put_nowait(item)
+
+    def get_nowait(self) -> Any:
+        if self._write == self._read:
+            raise asyncio.QueueEmpty
+        index = self._read & self._mask
+        item = self._slots[index]
+        self._slots[index] = None
+        self._read += 1
+        self.gets += 1
+        if type(item) is dict:
+            received_ns = item.get(TIME_RECEIVED_MONO_NS)
+            if received_ns is not None:
+                lag_ns = time.monotonic_ns() - received_ns
+                if lag_ns > self.max_lag_ns:
+                    self.max_lag_ns = lag_ns
+        if self._putters:
+            self._wake(self._putters, single=True)
+        return item
+
+    async def get(self) -> Any:
+        """Next message, waits while empty; None when woken without one"""
+        if self._write == self._read:
+            if self.closed:
+                return None
+            waiter = asyncio.get_running_loop().create_future()
+            self._getters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                self._discard(self._getters, waiter)
+                raise
+            if self._write == self._read:
+                return None
+        return self.get_nowait()
+
+    async def stream(self, duration: Optional[float] = None) -> AsyncIterator[Any]:
+        """Yield messages until duration seconds have passed or the buffer is closed and drained"""
+        loop = asyncio.get_running_loop()
+        deadline = timer = None
+        if duration is not None:
+            deadline = loop.time() + duration
+            timer = loop.call_later(duration, self.wake)
+        try:
+            while True:
+                item = await self.get()
+                if item is None:
+                    # woken by the deadline or by close()
+                    if self.closed and self._write == self._read:
+                        return
+                else:
+                    yield item
+                if deadline is not None and loop.time() >= deadline:
+                    return
+        finally:
+            if timer is not None:
+                timer.cancel()
+
+    def wake(self):
+        """Wake every waiting consumer, e.g. when an iteration deadline has passed"""
+        self._wake(self._getters)
+
+    def close(self):
+        """Reject further messages; consumers drain what is left, then get None"""
+        self.closed = True
+        self._wake(self._getters)
+        self._wake(self._putters)
+
+    @staticmethod
+    def _wake(waiters: deque, single: bool = False):
+        while waiters:
+            waiter = waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                if single:
+                    return
+
+    @staticmethod
+    def _discard(waiters: deque, waiter: asyncio.Future):
+        try:
+            waiters.remove(waiter)
+        except ValueError:
+            pass
+
+    def lag_ns(self) -> int:
+        """Age of the oldest unread message, 0 when empty or not stamped"""
+        if self._write == self._read:
+            return 0
+        item = self._slots[self._read & self._mask]
+        if type(item) is dict and TIME_RECEIVED_MONO_NS in item:
+            return time.monotonic_ns() - item[TIME_RECEIVED_MONO_NS]
+        return 0
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "policy": self.policy,
+            "capacity": self.capacity,
+            "depth": self._write - self._read,
+            "high_water": self.high_water,
+            "puts": self.puts,
+            "gets": self.gets,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced,
+            "blocked_puts": self.blocked_puts,
+            "lag_ms": round(self.lag_ns() / 1e6, 3),
+            "max_lag_ms": round(self.max_lag_ns / 1e6, 3)
+        }